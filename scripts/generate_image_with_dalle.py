@@ -1,35 +1,96 @@
-import openai
-import requests
 import os
-import time
 import sys
 import argparse
-from PIL import Image
 import io
 from typing import Literal
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# openai, requests, PIL and dotenv are imported on first use: this script is
+# spawned once per job, so module import time is paid on every generation.
 
 # --- CONFIG ---
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 IMAGE_PATH = os.path.join(os.path.dirname(__file__), '../assets/images/image.png')
 DEFAULT_PROMPT = "A professional golf ball label design with elegant typography, clean white background, landscape orientation, suitable for 3D model texturing"
 
-# Initialize OpenAI client
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables. Please set it in your .env file.")
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+_client = None
 
-def generate_image_with_dalle(prompt=DEFAULT_PROMPT, size: Literal["1024x1024", "1792x1024", "1024x1792"] = "1792x1024"):
+def get_client():
+    """Create the OpenAI client on first use and reuse it afterwards."""
+    global _client
+    if _client is None:
+        import openai
+        from dotenv import load_dotenv
+
+        # Load environment variables
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables. Please set it in your .env file.")
+        _client = openai.OpenAI(api_key=api_key)
+    return _client
+
+def process_image_bytes(data, size="1792x1024"):
+    """
+    Decode a downloaded image, crop it to landscape if needed and encode it as PNG.
+    
+    This is the CPU-bound part of generation; the web app runs it in a process pool.
+    
+    Args:
+        data (bytes): Encoded image as downloaded from DALL-E
+        size (str): Requested image size, used to decide whether to crop
+    
+    Returns:
+        bytes: PNG-encoded image
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    
+    # Convert to landscape if needed (DALL-E 3 doesn't support custom aspect ratios)
+    if size == "1024x1024":
+        # Crop to landscape aspect ratio (16:9)
+        width, height = image.size
+        target_width = int(height * 16 / 9)
+        left = (width - target_width) // 2
+        right = left + target_width
+        image = image.crop((left, 0, right, height))
+    
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+class GenerationCancelled(Exception):
+    """Raised when a caller cancels generation between network or processing steps."""
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled("Generation cancelled")
+
+def download_image(image_url, cancel_event=None, chunk_size=256 * 1024):
+    """Download an image, aborting the connection as soon as cancel_event is set."""
+    import requests
+
+    with requests.get(image_url, stream=True, timeout=(10, 60)) as image_response:
+        image_response.raise_for_status()
+        chunks = []
+        for chunk in image_response.iter_content(chunk_size):
+            _check_cancelled(cancel_event)
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+def generate_image_with_dalle(prompt=DEFAULT_PROMPT, size: Literal["1024x1024", "1792x1024", "1024x1792"] = "1792x1024", processor=None, image_path=None, cancel_event=None):
     """
     Generate an image using DALL-E 3 and save it to the specified path.
     
     Args:
         prompt (str): The text prompt for image generation
         size (str): Image size (1024x1024, 1792x1024, 1024x1792)
+        processor (callable): Optional replacement for process_image_bytes(data, size),
+            e.g. a process-pool backed one
+        image_path (str): Where to save the image (defaults to IMAGE_PATH)
+        cancel_event (threading.Event): Checked between steps; when set, the
+            download is aborted and nothing is written
     """
+    image_path = image_path or IMAGE_PATH
     try:
         print(f"[INFO] Generating image with prompt: {prompt}")
         print(f"[INFO] Using size: {size}")
@@ -39,7 +100,7 @@ def generate_image_with_dalle(prompt=DEFAULT_PROMPT, size: Literal["1024x1024",
         enhanced_prompt = f"{system_prompt} {prompt}"
         
         # Generate image with DALL-E 3
-        response = client.images.generate(
+        response = get_client().images.generate(
             model="dall-e-3",
             prompt=enhanced_prompt,
             size=size,
@@ -47,6 +108,8 @@ def generate_image_with_dalle(prompt=DEFAULT_PROMPT, size: Literal["1024x1024",
             n=1,
         )
         
+        _check_cancelled(cancel_event)
+        
         # Get the image URL
         if not response.data or len(response.data) == 0:
             raise ValueError("No image data received from DALL-E")
@@ -57,32 +120,27 @@ def generate_image_with_dalle(prompt=DEFAULT_PROMPT, size: Literal["1024x1024",
         
         # Download the image
         print("[INFO] Downloading generated image...")
-        image_response = requests.get(image_url)
-        image_response.raise_for_status()
+        image_data = download_image(image_url, cancel_event)
         
         # Open and process the image
-        image = Image.open(io.BytesIO(image_response.content))
-        
-        # Convert to landscape if needed (DALL-E 3 doesn't support custom aspect ratios)
-        if size == "1024x1024":
-            # Crop to landscape aspect ratio (16:9)
-            width, height = image.size
-            target_width = int(height * 16 / 9)
-            left = (width - target_width) // 2
-            right = left + target_width
-            image = image.crop((left, 0, right, height))
+        png_bytes = (processor or process_image_bytes)(image_data, size)
+        _check_cancelled(cancel_event)
         
         # Save the image
-        image.save(IMAGE_PATH, "PNG")
-        print(f"[INFO] Image saved to: {IMAGE_PATH}")
+        with open(image_path, "wb") as f:
+            f.write(png_bytes)
+        print(f"[INFO] Image saved to: {image_path}")
         
         return True
         
+    except GenerationCancelled:
+        print("[INFO] Image generation cancelled")
+        return False
     except Exception as e:
         print(f"[ERROR] Failed to generate image: {str(e)}")
         return False
 
-def generate_custom_label(prompt=None):
+def generate_custom_label(prompt=None, processor=None, image_path=None, cancel_event=None):
     """
     Generate a custom golf ball label with user-provided prompt.
     """
@@ -95,7 +153,34 @@ def generate_custom_label(prompt=None):
     if "landscape" not in prompt.lower():
         prompt += ", landscape orientation"
     
-    return generate_image_with_dalle(prompt, "1792x1024")
+    return generate_image_with_dalle(prompt, "1792x1024", processor=processor, image_path=image_path, cancel_event=cancel_event)
+
+def generate_label_variants(prompt, image_paths, processor=None, cancel_event=None, on_variant=None):
+    """
+    Generate several candidate labels for one prompt concurrently.
+    
+    DALL-E 3 returns one image per request (n=1), so each variant is its own
+    request on a worker thread; on_variant(index, success) is called from that
+    thread as soon as the variant is saved, so callers can show it before the
+    others finish.
+    
+    Returns:
+        list: Success flag per variant, in image_paths order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if "landscape" not in prompt.lower():
+        prompt += ", landscape orientation"
+
+    def generate(index):
+        success = generate_image_with_dalle(prompt, "1792x1024", processor=processor,
+                                            image_path=image_paths[index], cancel_event=cancel_event)
+        if on_variant is not None:
+            on_variant(index, success)
+        return success
+
+    with ThreadPoolExecutor(max_workers=len(image_paths)) as executor:
+        return list(executor.map(generate, range(len(image_paths))))
 
 def parse_arguments():
     """Parse command line arguments."""
@@ -1,5 +1,14 @@
 import os
+import sys
+import json
+import time
 import asyncio
+import hashlib
+import argparse
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../pipeline'))
+from env_probe import get_probe
 
 # --- Config ---
 WATCHED_IMAGE = os.path.join(os.path.dirname(__file__), '../../assets/images/label.png')
@@ -9,6 +18,16 @@ GLB_OUTPUT = os.path.join(os.path.dirname(__file__), '../../assets/models/output
 BLENDER_DIR = r"C:\Program Files\Blender Foundation\Blender 4.4"
 BLENDER_EXE = os.path.join(BLENDER_DIR, "blender.exe")
 
+# --- Directory mode ---
+WATCHED_DIR = os.path.join(os.path.dirname(__file__), '../../assets/images/labels')
+GLB_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '../../assets/models/labels')
+MANIFEST_NAME = '.async_blend_manifest.json'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+POLL_INTERVAL = 2.0
+SETTLE_SECONDS = 1.0       # Files modified more recently than this are picked up on the next scan
+REPORT_INTERVAL = 10.0
+THROUGHPUT_WINDOW = 60.0
+
 last_mtime = None
 
 async def watch_file():
@@ -26,17 +45,242 @@ async def watch_file():
             print("[WARN] Watched file not found.")
         await asyncio.sleep(2)
 
-async def run_blender_export():
+async def run_blender_export(image_path=WATCHED_IMAGE, output_path=GLB_OUTPUT, capture=False):
+    """Run the Blender export for one image. Returns (returncode, output); output is None unless captured."""
+    blender_exe = get_probe().tool("blender", BLENDER_EXE).path or BLENDER_EXE
     command = [
-        BLENDER_EXE, BLEND_FILE,
+        blender_exe, BLEND_FILE,
         "--background",
         "--python", GEN_SCRIPT,
-        "--", WATCHED_IMAGE, GLB_OUTPUT
+        "--", image_path, output_path
     ]
-    process = await asyncio.create_subprocess_exec(*command, cwd=BLENDER_DIR)
-    await process.communicate()
-    print("[INFO] Blender export complete.")
+    pipe = asyncio.subprocess.PIPE if capture else None
+    process = await asyncio.create_subprocess_exec(*command, cwd=os.path.dirname(blender_exe) or None,
+                                                   stdout=pipe, stderr=asyncio.subprocess.STDOUT if capture else None)
+    stdout, _ = await process.communicate()
+    if not capture:
+        print("[INFO] Blender export complete.")
+    return process.returncode, stdout.decode(errors='replace') if stdout else None
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DirectoryWatcher:
+    """Watches a directory tree of label images and rebuilds one GLB per image.
+
+    Changed images are exported concurrently (at most `jobs` Blender processes),
+    newest first. A manifest in the output directory records the hash each GLB
+    was built from, so unchanged images are not rebuilt after a restart.
+    """
+
+    def __init__(self, source_dir=WATCHED_DIR, output_dir=GLB_OUTPUT_DIR, jobs=None, interval=POLL_INTERVAL):
+        self.source_dir = os.path.abspath(source_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.interval = interval
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self.seen = {}          # relative path -> (mtime, size) at the last scan
+        self.pending = {}       # relative path -> (mtime, sha256)
+        self.in_flight = set()
+        self.built = 0
+        self.failed = 0
+        self.finished_at = deque()
+        self.semaphore = None
+        self.wakeup = None
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def output_path(self, relative):
+        """GLB path for an image: label.png (or .PNG) -> label.glb, other extensions kept (label.jpg -> label.jpg.glb).
+
+        Keeping the extension stops label.png and label.jpg from overwriting each other's GLB.
+        """
+        stem, ext = os.path.splitext(relative)
+        return os.path.join(self.output_dir, (stem if ext.lower() == '.png' else relative) + '.glb')
+
+    def _list_images(self):
+        """{relative path: (mtime, size)} for every image under the source directory."""
+        images = {}
+        for root, dirs, files in os.walk(self.source_dir):
+            # Never treat our own output as input when it lives inside the watched tree
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.output_dir]
+            for name in files:
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                images[os.path.relpath(path, self.source_dir)] = (stat.st_mtime, stat.st_size)
+        return images
+
+    def _is_current(self, relative, digest):
+        entry = self.manifest.get(relative)
+        return entry is not None and entry['sha256'] == digest and os.path.exists(self.output_path(relative))
+
+    def _forget_deleted(self, images):
+        """Drop manifest entries and queued rebuilds of images that no longer exist (their GLBs are kept)."""
+        deleted = [relative for relative in self.manifest if relative not in images]
+        for relative in deleted:
+            del self.manifest[relative]
+        for relative in [relative for relative in self.pending if relative not in images]:
+            del self.pending[relative]
+        for relative in [relative for relative in self.seen if relative not in images]:
+            del self.seen[relative]
+        if deleted:
+            self._save_manifest()
+            print(f"[INFO] Forgot {len(deleted)} deleted image(s)")
+
+    async def scan(self):
+        """Queue every image whose contents differ from what its GLB was built from."""
+        now = time.time()
+        images = await asyncio.to_thread(self._list_images)
+        self._forget_deleted(images)
+        # Hash newest first: exports start while the scan is still running, so this sets the build order
+        for relative, (mtime, size) in sorted(images.items(), key=lambda item: -item[1][0]):
+            if self.seen.get(relative) == (mtime, size) or now - mtime < SETTLE_SECONDS:
+                continue
+            entry = self.manifest.get(relative)
+            if (entry and (entry.get('mtime'), entry.get('size')) == (mtime, size)
+                    and os.path.exists(self.output_path(relative))):
+                self.seen[relative] = (mtime, size)
+                continue
+            try:
+                digest = await asyncio.to_thread(file_sha256, os.path.join(self.source_dir, relative))
+            except FileNotFoundError:
+                continue
+            self.seen[relative] = (mtime, size)
+            if self._is_current(relative, digest):
+                # Touched or re-copied without changing: refresh the stat so the next restart skips hashing
+                self.manifest[relative].update(mtime=mtime, size=size)
+                self._save_manifest()
+                continue
+            self.pending[relative] = (mtime, digest)
+            self.wakeup.set()
+
+    def _next_job(self):
+        """Newest pending image that isn't already being exported."""
+        ready = [relative for relative in self.pending if relative not in self.in_flight]
+        if not ready:
+            return None
+        return max(ready, key=lambda relative: self.pending[relative][0])
+
+    async def dispatch(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while True:
+                await self.semaphore.acquire()
+                relative = self._next_job()
+                if relative is None:
+                    self.semaphore.release()
+                    break
+                mtime, digest = self.pending.pop(relative)
+                self.in_flight.add(relative)
+                asyncio.create_task(self.rebuild(relative, mtime, digest))
+
+    async def rebuild(self, relative, mtime, digest):
+        image_path = os.path.join(self.source_dir, relative)
+        output_path = self.output_path(relative)
+        # Export next to the target and swap it in, so viewers never load a half-written GLB
+        partial_path = output_path[:-len('.glb')] + '.partial.glb'
+        start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            returncode, output = await run_blender_export(image_path, partial_path, capture=True)
+            if returncode == 0 and os.path.exists(partial_path):
+                os.replace(partial_path, output_path)
+                size = self.seen.get(relative, (mtime, None))[1]
+                self.manifest[relative] = {'sha256': digest, 'mtime': mtime, 'size': size,
+                                           'glb': os.path.relpath(output_path, self.output_dir),
+                                           'built_at': time.time()}
+                self._save_manifest()
+                self.built += 1
+                self.finished_at.append(time.monotonic())
+                print(f"[INFO] Rebuilt {relative} -> {os.path.relpath(output_path, self.output_dir)} "
+                      f"in {time.perf_counter() - start:.1f}s")
+            else:
+                self.failed += 1
+                tail = '\n'.join((output or '').strip().splitlines()[-5:])
+                print(f"[ERROR] Export failed for {relative} (exit code {returncode})" + (f":\n{tail}" if tail else ""))
+        except Exception as e:
+            self.failed += 1
+            print(f"[ERROR] Export failed for {relative}: {e}")
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            self.in_flight.discard(relative)
+            self.semaphore.release()
+            # A newer version of this image may have been queued while it was exporting
+            self.wakeup.set()
+
+    def throughput(self):
+        """Completed exports per minute over the last THROUGHPUT_WINDOW seconds."""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self.finished_at and self.finished_at[0] < cutoff:
+            self.finished_at.popleft()
+        return len(self.finished_at) * 60.0 / THROUGHPUT_WINDOW
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            if self.pending or self.in_flight or self.finished_at:
+                print(f"[INFO] Queue depth: {len(self.pending)} pending, {len(self.in_flight)} exporting | "
+                      f"built {self.built}, failed {self.failed} | {self.throughput():.1f} GLBs/min")
+
+    async def run(self):
+        self.semaphore = asyncio.Semaphore(self.jobs)
+        self.wakeup = asyncio.Event()
+        os.makedirs(self.output_dir, exist_ok=True)
+        asyncio.create_task(self.dispatch())
+        asyncio.create_task(self.report())
+        while True:
+            # os.walk() yields nothing for a missing directory rather than raising
+            if os.path.isdir(self.source_dir):
+                await self.scan()
+            else:
+                print(f"[WARN] Watched directory not found: {self.source_dir}")
+            await asyncio.sleep(self.interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild label GLBs when their images change")
+    parser.add_argument("--dir", dest="source_dir", nargs="?", const=WATCHED_DIR,
+                        help="Watch a directory tree instead of the single label image")
+    parser.add_argument("--out", dest="output_dir", default=GLB_OUTPUT_DIR,
+                        help="Where directory mode writes one GLB per image")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Concurrent Blender exports in directory mode (default: CPU count)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between scans")
+    args = parser.parse_args()
+
+    if args.source_dir is None:
+        print(f"[INFO] Watching {WATCHED_IMAGE} for changes...")
+        asyncio.run(watch_file())
+        return
+
+    watcher = DirectoryWatcher(args.source_dir, args.output_dir, args.jobs, args.interval)
+    print(f"[INFO] Watching {watcher.source_dir} -> {watcher.output_dir} ({watcher.jobs} concurrent exports)")
+    asyncio.run(watcher.run())
 
 if __name__ == "__main__":
-    print(f"[INFO] Watching {WATCHED_IMAGE} for changes...")
-    asyncio.run(watch_file())
+    main()
@@ -7,32 +7,124 @@ NEW_IMAGE_PATH = "C:/Users/Shriansh/Desktop/SPT/Golf Image/3D/image.png"  # Chan
 OUTPUT_GLB_PATH = "C:/Users/Shriansh/Desktop/SPT/Golf Image/3D/exported_label.glb" # Change this
 TARGET_MATERIAL_NAME = "Material.002"  # Change if your material name is different
 TARGET_OBJECT_NAME = "Cylinder"        # The name of the label object
+PROFILE_DIR = os.environ.get("LABEL_PROFILE_DIR")  # Set to time and cProfile the steps below
+PREVIEW_GLB_PATH = None                # Also export a fast preview here, before the full-quality GLB
+PREVIEW_TEXTURE_SIZE = 512             # Longest side of the preview's label texture
+PREVIEW_MAX_TRIANGLES = 20000          # The preview's meshes are decimated to about this many triangles
+
+# Paths passed after "--" on the Blender command line override the defaults:
+#   blender Golf.blend --background --python generate_label_glb.py -- <image> <output.glb> [<preview.glb>]
+if "--" in sys.argv:
+    script_args = sys.argv[sys.argv.index("--") + 1:]
+    if len(script_args) >= 1:
+        NEW_IMAGE_PATH = script_args[0]
+    if len(script_args) >= 2:
+        OUTPUT_GLB_PATH = script_args[1]
+    if len(script_args) >= 3:
+        PREVIEW_GLB_PATH = script_args[2]
 
 # --- LOAD IMAGE ---
-def update_material_image():
+def label_texture_node():
     mat = bpy.data.materials.get(TARGET_MATERIAL_NAME)
     if not mat:
         raise ValueError(f"Material '{TARGET_MATERIAL_NAME}' not found.")
 
     # Go into node tree
-    nodes = mat.node_tree.nodes
-    for node in nodes:
+    for node in mat.node_tree.nodes:
         if node.type == 'TEX_IMAGE':
-            # Load or reuse the image
-            if node.image:
-                bpy.data.images.remove(node.image)
-            img = bpy.data.images.load(NEW_IMAGE_PATH)
-            node.image = img
-            print(f"[INFO] Updated image texture to: {NEW_IMAGE_PATH}")
-            return
+            return node
     raise RuntimeError("No image texture node found in material.")
 
+def update_material_image():
+    node = label_texture_node()
+    # Load or reuse the image
+    if node.image:
+        bpy.data.images.remove(node.image)
+    img = bpy.data.images.load(NEW_IMAGE_PATH)
+    node.image = img
+    print(f"[INFO] Updated image texture to: {NEW_IMAGE_PATH}")
+
+# --- EXPORT PREVIEW ---
+def export_preview():
+    """Export a low-poly GLB with a downscaled label, then restore the scene for the full export.
+
+    Written to a temporary name and renamed, so the preview path only ever
+    holds a complete file.
+    """
+    node = label_texture_node()
+    full_image = node.image
+    preview_image = full_image.copy()
+    width, height = full_image.size
+    scale = PREVIEW_TEXTURE_SIZE / max(width, height, 1)
+    if scale < 1:
+        preview_image.scale(max(1, round(width * scale)), max(1, round(height * scale)))
+    node.image = preview_image
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    meshes = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH' and obj.visible_get()]
+    triangles = sum(len(polygon.vertices) - 2 for obj in meshes
+                    for polygon in obj.evaluated_get(depsgraph).data.polygons)
+    ratio = PREVIEW_MAX_TRIANGLES / triangles if triangles > PREVIEW_MAX_TRIANGLES else 1.0
+    decimated = []
+    if ratio < 1.0:
+        for obj in meshes:
+            modifier = obj.modifiers.new(name="PreviewDecimate", type='DECIMATE')
+            modifier.ratio = ratio
+            decimated.append((obj, modifier))
+
+    tmp_path = f"{PREVIEW_GLB_PATH}.tmp.glb"
+    try:
+        bpy.ops.export_scene.gltf(filepath=tmp_path, export_format='GLB', export_apply=True,
+                                  export_draco_mesh_compression_enable=False)
+        os.replace(tmp_path, PREVIEW_GLB_PATH)
+    finally:
+        for obj, modifier in decimated:
+            obj.modifiers.remove(modifier)
+        node.image = full_image
+        bpy.data.images.remove(preview_image)
+    print(f"[INFO] Exported preview .glb to {PREVIEW_GLB_PATH} "
+          f"({min(triangles, PREVIEW_MAX_TRIANGLES)} of {triangles} triangles)")
+
 # --- EXPORT TO GLB ---
 def export_glb():
     bpy.ops.export_scene.gltf(filepath=OUTPUT_GLB_PATH, export_format='GLB')
     print(f"[INFO] Exported .glb to {OUTPUT_GLB_PATH}")
 
+# --- PROFILING ---
+def profiled(step):
+    """Run a step; with PROFILE_DIR set, also time it and save a cProfile dump and summary there."""
+    if not PROFILE_DIR:
+        return step()
+    import json
+    import time
+    import pstats
+    import cProfile
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profile.runcall(step)
+    finally:
+        elapsed = time.perf_counter() - start
+        path_base = os.path.join(PROFILE_DIR, f"blender_{step.__name__}")
+        profile.dump_stats(f"{path_base}.prof")
+        with open(f"{path_base}.txt", "w") as f:
+            f.write(f"Blender step '{step.__name__}': {elapsed:.3f}s wall\n\n")
+            pstats.Stats(profile, stream=f).sort_stats("cumulative").print_stats(40)
+        timings_path = os.path.join(PROFILE_DIR, "blender_timings.json")
+        timings = {}
+        if os.path.exists(timings_path):
+            with open(timings_path) as f:
+                timings = json.load(f)
+        timings[step.__name__] = round(elapsed, 4)
+        with open(timings_path, "w") as f:
+            json.dump(timings, f, indent=2)
+        print(f"[INFO] {step.__name__} took {elapsed:.3f}s")
+
 # --- MAIN ---
 if __name__ == "__main__":
-    update_material_image()
-    export_glb()
+    profiled(update_material_image)
+    if PREVIEW_GLB_PATH:
+        profiled(export_preview)
+    profiled(export_glb)
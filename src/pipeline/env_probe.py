@@ -0,0 +1,220 @@
+"""
+Shared toolchain and environment probing.
+
+Finds Blender, node and npm by PATH lookup (plus TOOL_SEARCH_PATH and a few
+well-known install locations per platform), checks the files the pipeline
+needs, and runs the probes concurrently. Tool results are cached in memory
+and re-probed only when the TTL runs out or when the executable, or for a
+missing tool any of the searched directories, changes on disk, so repeated
+dependency checks cost a few stat() calls instead of subprocess launches.
+"""
+
+import os
+import glob
+import time
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_TTL_SECONDS = 300
+VERSION_TIMEOUT_SECONDS = 30
+
+# Extra directories searched after PATH, os.pathsep-separated
+SEARCH_PATH_ENV = "TOOL_SEARCH_PATH"
+
+if os.name == "nt":
+    FALLBACK_LOCATIONS = {
+        "npm": [
+            r"C:\Program Files\nodejs\npm.cmd",
+            r"C:\Program Files (x86)\nodejs\npm.cmd",
+            os.path.expanduser(r"~\AppData\Roaming\npm\npm.cmd"),
+            os.path.expanduser(r"~\AppData\Local\Microsoft\WindowsApps\npm.exe"),
+            r"C:\Program Files\nodejs\npm.exe",
+            r"C:\Program Files (x86)\nodejs\npm.exe",
+        ],
+        "node": [r"C:\Program Files\nodejs\node.exe", r"C:\Program Files (x86)\nodejs\node.exe"],
+        "blender": [r"C:\Program Files\Blender Foundation\Blender*\blender.exe"],
+    }
+    EXTRA_SEARCH_DIRS = []
+else:
+    FALLBACK_LOCATIONS = {
+        "npm": [],
+        "node": [],
+        "blender": ["/opt/blender*/blender", "/Applications/Blender.app/Contents/MacOS/Blender"],
+    }
+    EXTRA_SEARCH_DIRS = ["/usr/local/bin", "/snap/bin", os.path.expanduser("~/.local/bin"),
+                         os.path.expanduser("~/bin")]
+
+class ProbeResult:
+    """Outcome of one probe."""
+
+    def __init__(self, name, ok, path=None, version=None, detail=None, elapsed=0.0):
+        self.name = name
+        self.ok = ok
+        self.path = path
+        self.version = version
+        self.detail = detail
+        self.elapsed = elapsed
+        self.checked_at = time.time()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "ok": self.ok,
+            "path": self.path,
+            "version": self.version,
+            "detail": self.detail,
+            "elapsed": round(self.elapsed, 4),
+            "checked_at": self.checked_at,
+        }
+
+def search_dirs():
+    """Directories searched for tools, in order."""
+    extra = [d for d in os.environ.get(SEARCH_PATH_ENV, "").split(os.pathsep) if d]
+    path = [d for d in os.environ.get("PATH", "").split(os.pathsep) if d]
+    seen, ordered = set(), []
+    for directory in path + extra + EXTRA_SEARCH_DIRS:
+        if directory not in seen:
+            seen.add(directory)
+            ordered.append(directory)
+    return ordered
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def find_tool(name, explicit=None):
+    """Path of a tool: an explicit path if it exists, else PATH/search dirs, else known locations."""
+    if explicit and os.path.isfile(explicit):
+        return explicit
+    found = shutil.which(name, path=os.pathsep.join(search_dirs()))
+    if found:
+        return found
+    for pattern in FALLBACK_LOCATIONS.get(name, []):
+        # Newest version first for globbed install dirs such as "Blender 4.4"
+        for candidate in sorted(glob.glob(pattern), reverse=True):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+def check_file(label, path):
+    """Probe for a required file or directory (a stat, never cached)."""
+    start = time.perf_counter()
+    exists = os.path.exists(path)
+    return ProbeResult(label, exists, path=os.path.abspath(path),
+                       detail=None if exists else f"Not found: {path}", elapsed=time.perf_counter() - start)
+
+class EnvironmentProbe:
+    """Cached, concurrent tool probes."""
+
+    def __init__(self, ttl=PROBE_TTL_SECONDS, max_workers=4):
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _stamp(self, path):
+        """What must stay unchanged for a cached result to remain valid."""
+        if path:
+            return ("file", path, _mtime(path))
+        return ("dirs", tuple((d, _mtime(d)) for d in search_dirs()))
+
+    def _cached(self, key):
+        """(result, expired) for a cached entry whose files are unchanged, else (None, True)."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None, True
+        result, stamp, expires = entry
+        if self._stamp(result.path) != stamp:
+            return None, True
+        return result, time.monotonic() >= expires
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = (result, self._stamp(result.path), time.monotonic() + self.ttl)
+
+    def tool(self, name, explicit=None, version_args=("--version",)):
+        """Locate a tool and read its version, reusing a cached result while still valid.
+
+        A result past its TTL is still returned (and refreshed in the
+        background) unless the files it depends on changed, so callers on a
+        request path never wait on a version subprocess after the first probe.
+        """
+        key = (name, explicit)
+        with self._lock:
+            result, expired = self._cached(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if result is not None:
+            if expired and key_lock.acquire(blocking=False):
+                def refresh():
+                    try:
+                        self._store(key, self._probe_tool(name, explicit, version_args))
+                    finally:
+                        key_lock.release()
+                threading.Thread(target=refresh, daemon=True).start()
+            return result
+        # One probe per tool at a time; concurrent callers wait for it and share the result
+        with key_lock:
+            with self._lock:
+                result, _ = self._cached(key)
+            if result is None:
+                result = self._probe_tool(name, explicit, version_args)
+                self._store(key, result)
+            return result
+
+    def _probe_tool(self, name, explicit, version_args):
+        start = time.perf_counter()
+        path = find_tool(name, explicit)
+        if path is None:
+            where = f"{explicit}, " if explicit else ""
+            return ProbeResult(name, False, detail=f"{name} not found ({where}PATH or {SEARCH_PATH_ENV})",
+                               elapsed=time.perf_counter() - start)
+        if not version_args:
+            return ProbeResult(name, True, path=path, elapsed=time.perf_counter() - start)
+        try:
+            completed = subprocess.run([path, *version_args], capture_output=True, text=True,
+                                       timeout=VERSION_TIMEOUT_SECONDS)
+        except (OSError, subprocess.SubprocessError) as e:
+            return ProbeResult(name, False, path=path, detail=f"{name} failed to run: {e}",
+                               elapsed=time.perf_counter() - start)
+        output = (completed.stdout or completed.stderr).strip()
+        version = output.splitlines()[0] if output else None
+        if completed.returncode != 0:
+            return ProbeResult(name, False, path=path, version=version,
+                               detail=f"{name} --version exited with {completed.returncode}",
+                               elapsed=time.perf_counter() - start)
+        return ProbeResult(name, True, path=path, version=version, elapsed=time.perf_counter() - start)
+
+    def check(self, tools=None, files=None):
+        """Run tool and file probes concurrently.
+
+        tools maps a tool name to an explicit path (or None); files maps a
+        label to a path. Returns {name: ProbeResult} in the order given.
+        """
+        tools = tools or {}
+        files = files or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {name: executor.submit(self.tool, name, explicit) for name, explicit in tools.items()}
+            futures.update({label: executor.submit(check_file, label, path) for label, path in files.items()})
+            return {name: future.result() for name, future in futures.items()}
+
+    def invalidate(self, name=None):
+        """Forget cached results (for one tool, or all)."""
+        with self._lock:
+            for key in [key for key in self._cache if name is None or key[0] == name]:
+                del self._cache[key]
+
+_default_probe = None
+_default_lock = threading.Lock()
+
+def get_probe():
+    """The process-wide probe instance."""
+    global _default_probe
+    with _default_lock:
+        if _default_probe is None:
+            _default_probe = EnvironmentProbe()
+        return _default_probe
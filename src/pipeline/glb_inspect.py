@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+GLB inspection and budget checks for exported labels.
+
+Reads the GLB header and JSON chunk, then seeks into the BIN chunk only for
+the few header bytes needed to size each embedded image, so large files are
+inspected without loading their geometry or texture data. Reports triangle
+counts, texture dimensions/formats and bytes per bufferView, and checks them
+against per-profile budgets.
+"""
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+from glb_utils import GLB_MAGIC, CHUNK_JSON, CHUNK_BIN, GLBError
+
+# Budgets per export profile. "action" decides whether a violation fails the job or only flags it.
+EXPORT_PROFILES = {
+    "default": {
+        "action": "flag",
+        "max_file_bytes": 12 * 1024 * 1024,
+        "max_triangles": 300_000,
+        "max_texture_dimension": 2048,
+        "max_texture_bytes": 6 * 1024 * 1024,
+    },
+    "strict": {
+        "action": "fail",
+        "max_file_bytes": 6 * 1024 * 1024,
+        "max_triangles": 150_000,
+        "max_texture_dimension": 2048,
+        "max_texture_bytes": 4 * 1024 * 1024,
+    },
+    "preview": {
+        "action": "fail",
+        "max_file_bytes": 1024 * 1024,
+        "max_triangles": 20_000,
+        "max_texture_dimension": 512,
+        "max_texture_bytes": 512 * 1024,
+    },
+}
+
+MODE_TRIANGLES, MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN = 4, 5, 6
+
+def _image_size_png(head):
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+def _image_size_jpeg(f, start, length):
+    """Walk JPEG markers with seeks until a SOFn segment gives the dimensions."""
+    offset = start + 2
+    end = start + length
+    while offset + 9 <= end:
+        f.seek(offset)
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        code, segment_length = marker[1], struct.unpack(">H", marker[2:4])[0]
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", f.read(5)[1:5])
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+def _image_size_webp(head):
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", head[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return (int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1)
+    return None
+
+def _read_chunks(f):
+    """Return (gltf_json, bin_offset, bin_length, file_length) reading only the JSON chunk."""
+    header = f.read(12)
+    if len(header) < 12:
+        raise GLBError("File too short for a GLB header")
+    magic, version, length = struct.unpack("<III", header)
+    if magic != GLB_MAGIC:
+        raise GLBError("Not a GLB file (bad magic)")
+    if version != 2:
+        raise GLBError(f"Unsupported GLB version: {version}")
+
+    gltf, bin_offset, bin_length = None, None, 0
+    offset = 12
+    while offset + 8 <= length:
+        f.seek(offset)
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise GLBError(f"GLB truncated at byte {offset} of {length}")
+        chunk_length, chunk_type = struct.unpack("<II", chunk_header)
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(f.read(chunk_length).decode("utf-8"))
+        elif chunk_type == CHUNK_BIN:
+            bin_offset, bin_length = offset + 8, chunk_length
+        offset += 8 + chunk_length
+    if gltf is None:
+        raise GLBError("GLB has no JSON chunk")
+    return gltf, bin_offset, bin_length, length
+
+def _primitive_triangles(gltf, primitive):
+    accessors = gltf.get("accessors", [])
+    mode = primitive.get("mode", MODE_TRIANGLES)
+    if "indices" in primitive:
+        count = accessors[primitive["indices"]]["count"]
+    elif "POSITION" in primitive.get("attributes", {}):
+        count = accessors[primitive["attributes"]["POSITION"]]["count"]
+    else:
+        return 0
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0
+
+def _scene_mesh_uses(gltf):
+    """How many times each mesh is instanced by the default scene's node tree."""
+    nodes = gltf.get("nodes", [])
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        roots = list(range(len(nodes)))
+    uses = {}
+    stack = list(roots)
+    while stack:
+        node = nodes[stack.pop()]
+        if "mesh" in node:
+            uses[node["mesh"]] = uses.get(node["mesh"], 0) + 1
+        stack.extend(node.get("children", []))
+    return uses
+
+def inspect_glb(path):
+    """Inspect a GLB file and return a JSON-serializable report.
+
+    A truncated or malformed file raises GLBError (a ValueError).
+    """
+    try:
+        return _inspect(path)
+    except (struct.error, KeyError, IndexError, TypeError) as e:
+        raise GLBError(f"Malformed GLB {path}: {type(e).__name__}: {e}") from e
+
+def _inspect(path):
+    with open(path, "rb") as f:
+        gltf, bin_offset, bin_length, file_length = _read_chunks(f)
+        views = gltf.get("bufferViews", [])
+
+        images = []
+        for index, image in enumerate(gltf.get("images", [])):
+            entry = {"index": index, "name": image.get("name"), "mime_type": image.get("mimeType"),
+                     "bytes": None, "width": None, "height": None}
+            if "bufferView" in image and bin_offset is not None:
+                view = views[image["bufferView"]]
+                start = bin_offset + view.get("byteOffset", 0)
+                entry["bytes"] = view["byteLength"]
+                f.seek(start)
+                head = f.read(32)
+                size = _image_size_png(head) or _image_size_webp(head)
+                if size is None and head[:2] == b"\xff\xd8":
+                    size = _image_size_jpeg(f, start, view["byteLength"])
+                if size:
+                    entry["width"], entry["height"] = size
+            elif "uri" in image:
+                entry["uri"] = image["uri"] if not image["uri"].startswith("data:") else "data:..."
+            images.append(entry)
+
+    # Label bufferViews by what uses them
+    view_usage = {}
+    for accessor in gltf.get("accessors", []):
+        if "bufferView" in accessor:
+            view_usage.setdefault(accessor["bufferView"], set()).add(f"accessor:{accessor.get('type', '?')}")
+    for image in gltf.get("images", []):
+        if "bufferView" in image:
+            view_usage.setdefault(image["bufferView"], set()).add("image")
+    buffer_views = [
+        {"index": index, "bytes": view["byteLength"], "target": view.get("target"),
+         "usage": sorted(view_usage.get(index, []))}
+        for index, view in enumerate(views)
+    ]
+
+    meshes = []
+    for index, mesh in enumerate(gltf.get("meshes", [])):
+        triangles = sum(_primitive_triangles(gltf, primitive) for primitive in mesh.get("primitives", []))
+        meshes.append({"index": index, "name": mesh.get("name"), "primitives": len(mesh.get("primitives", [])),
+                       "triangles": triangles})
+    uses = _scene_mesh_uses(gltf)
+
+    image_bytes = sum(view["bytes"] for view in buffer_views if "image" in view["usage"])
+    return {
+        "path": os.path.abspath(path),
+        "file_bytes": file_length,
+        "json_bytes": len(json.dumps(gltf, separators=(",", ":"))),
+        "bin_bytes": bin_length,
+        "generator": gltf.get("asset", {}).get("generator"),
+        "counts": {key: len(gltf.get(key, [])) for key in
+                   ("nodes", "meshes", "materials", "textures", "images", "accessors", "bufferViews")},
+        "triangles": sum(mesh["triangles"] for mesh in meshes),
+        "scene_triangles": sum(meshes[mesh]["triangles"] * count for mesh, count in uses.items()),
+        "meshes": meshes,
+        "images": images,
+        "image_bytes": image_bytes,
+        "geometry_bytes": sum(view["bytes"] for view in buffer_views) - image_bytes,
+        "buffer_views": buffer_views,
+    }
+
+def check_budgets(report, profile="default"):
+    """Compare a report against a profile's budgets. Returns a list of violation messages."""
+    budget = EXPORT_PROFILES[profile]
+    violations = []
+    if report["file_bytes"] > budget["max_file_bytes"]:
+        violations.append(f"File is {report['file_bytes']} bytes (budget {budget['max_file_bytes']})")
+    if report["scene_triangles"] > budget["max_triangles"]:
+        violations.append(f"Scene has {report['scene_triangles']} triangles (budget {budget['max_triangles']})")
+    for image in report["images"]:
+        label = image["name"] or f"image {image['index']}"
+        if image["width"] and max(image["width"], image["height"]) > budget["max_texture_dimension"]:
+            violations.append(f"Texture '{label}' is {image['width']}x{image['height']} "
+                              f"(budget {budget['max_texture_dimension']}px)")
+        if image["bytes"] and image["bytes"] > budget["max_texture_bytes"]:
+            violations.append(f"Texture '{label}' is {image['bytes']} bytes (budget {budget['max_texture_bytes']})")
+    return violations
+
+def print_report(report, violations=()):
+    """Print a human-readable summary of an inspection report."""
+    print(f"[INFO] GLB: {report['path']}")
+    print(f"[INFO] File size: {report['file_bytes'] / 1024:.1f} KB "
+          f"(geometry {report['geometry_bytes'] / 1024:.1f} KB, images {report['image_bytes'] / 1024:.1f} KB)")
+    print(f"[INFO] Triangles: {report['scene_triangles']} in scene ({report['triangles']} unique)")
+    for image in report["images"]:
+        size = f"{image['width']}x{image['height']}" if image["width"] else "unknown size"
+        print(f"[INFO] Texture {image['index']} ({image['name']}): {image['mime_type']}, {size}, "
+              f"{(image['bytes'] or 0) / 1024:.1f} KB")
+    for violation in violations:
+        print(f"[WARN] Budget exceeded: {violation}")
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Inspect a GLB file and check it against export budgets")
+    parser.add_argument("glb", help="Path to the GLB file")
+    parser.add_argument("--profile", choices=sorted(EXPORT_PROFILES), default="default", help="Budget profile")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    report = inspect_glb(args.glb)
+    violations = check_budgets(report, args.profile)
+    if args.json:
+        print(json.dumps({"report": report, "violations": violations}, indent=2))
+    else:
+        print_report(report, violations)
+    if violations and EXPORT_PROFILES[args.profile]["action"] == "fail":
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Minimal GLB (binary glTF 2.0) reading and writing helpers.
+
+Pure Python, no dependencies (numpy only for node_matrix): enough to inspect
+the exporter's output and to rewrite embedded images without going back
+through Blender.
+"""
+
+import os
+import json
+import uuid
+import struct
+
+GLB_MAGIC = 0x46546C67  # b"glTF"
+CHUNK_JSON = 0x4E4F534A  # b"JSON"
+CHUNK_BIN = 0x004E4942   # b"BIN\0"
+
+class GLBError(ValueError):
+    """Raised for files that are not valid GLB 2.0."""
+
+def _pad(data, multiple=4, fill=b"\x00"):
+    return data + fill * (-len(data) % multiple)
+
+def read_glb(path):
+    """Read a GLB file and return (gltf_json, bin_bytes)."""
+    with open(path, "rb") as f:
+        return parse_glb(f.read())
+
+def parse_glb(data):
+    """Parse GLB bytes into (gltf_json, bin_bytes)."""
+    if len(data) < 12:
+        raise GLBError("File too short for a GLB header")
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != GLB_MAGIC:
+        raise GLBError("Not a GLB file (bad magic)")
+    if version != 2:
+        raise GLBError(f"Unsupported GLB version: {version}")
+
+    gltf, binary = None, b""
+    offset = 12
+    while offset + 8 <= min(length, len(data)):
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(chunk.decode("utf-8"))
+        elif chunk_type == CHUNK_BIN:
+            binary = bytes(chunk)
+        offset += 8 + chunk_length
+    if gltf is None:
+        raise GLBError("GLB has no JSON chunk")
+    return gltf, binary
+
+def build_glb(gltf, binary=b""):
+    """Serialize (gltf_json, bin_bytes) to GLB bytes."""
+    json_chunk = _pad(json.dumps(gltf, separators=(",", ":"), sort_keys=True).encode("utf-8"), fill=b" ")
+    chunks = struct.pack("<II", len(json_chunk), CHUNK_JSON) + json_chunk
+    if binary:
+        bin_chunk = _pad(binary)
+        chunks += struct.pack("<II", len(bin_chunk), CHUNK_BIN) + bin_chunk
+    return struct.pack("<III", GLB_MAGIC, 2, 12 + len(chunks)) + chunks
+
+def write_glb(path, gltf, binary=b""):
+    """Write (gltf_json, bin_bytes) as a GLB file."""
+    with open(path, "wb") as f:
+        f.write(build_glb(gltf, binary))
+
+def write_once(path, data):
+    """Write a content-addressed file unless it already exists."""
+    if os.path.exists(path):
+        return
+    # Jobs publishing identical assets at once each write their own temporary file
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def node_matrix(node):
+    """A node's local transform as a 4x4 column-vector matrix, from `matrix` or its TRS properties."""
+    import numpy as np
+
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    tx, ty, tz = node.get("translation", (0, 0, 0))
+    qx, qy, qz, qw = node.get("rotation", (0, 0, 0, 1))
+    sx, sy, sz = node.get("scale", (1, 1, 1))
+    rotation = np.array([
+        [1 - 2 * (qy * qy + qz * qz), 2 * (qx * qy - qz * qw), 2 * (qx * qz + qy * qw)],
+        [2 * (qx * qy + qz * qw), 1 - 2 * (qx * qx + qz * qz), 2 * (qy * qz - qx * qw)],
+        [2 * (qx * qz - qy * qw), 2 * (qy * qz + qx * qw), 1 - 2 * (qx * qx + qy * qy)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array([sx, sy, sz])
+    matrix[:3, 3] = (tx, ty, tz)
+    return matrix
+
+def buffer_view_bytes(gltf, binary, view_index):
+    """Bytes of one bufferView in the GLB's embedded buffer."""
+    view = gltf["bufferViews"][view_index]
+    start = view.get("byteOffset", 0)
+    return binary[start:start + view["byteLength"]]
+
+def replace_buffer_views(gltf, binary, replacements):
+    """Return (gltf, binary) with some bufferViews' contents replaced.
+
+    replacements maps bufferView index -> new bytes. All views of buffer 0
+    are repacked in their original order at 4-byte alignment, and byte
+    offsets and the buffer length are updated. The input JSON is not modified.
+    """
+    gltf = json.loads(json.dumps(gltf))
+    views = gltf.get("bufferViews", [])
+    order = sorted(
+        (index for index, view in enumerate(views) if view.get("buffer", 0) == 0),
+        key=lambda index: views[index].get("byteOffset", 0)
+    )
+    packed = bytearray()
+    for index in order:
+        data = replacements.get(index)
+        if data is None:
+            data = buffer_view_bytes(gltf, binary, index)
+        packed += b"\x00" * (-len(packed) % 4)
+        views[index]["byteOffset"] = len(packed)
+        views[index]["byteLength"] = len(data)
+        packed += data
+    packed = bytes(_pad(bytes(packed)))
+    if gltf.get("buffers"):
+        gltf["buffers"][0]["byteLength"] = len(packed)
+    return gltf, packed
+
+def material_base_color_image(gltf, material_name):
+    """Index of the image used as baseColorTexture by a named material, or None."""
+    for material in gltf.get("materials", []):
+        if material.get("name") != material_name:
+            continue
+        texture_info = material.get("pbrMetallicRoughness", {}).get("baseColorTexture")
+        if texture_info is None:
+            return None
+        return gltf["textures"][texture_info["index"]].get("source")
+    return None
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Combine many labels into one instanced catalog GLB.
+
+The ball from an exported label GLB is written once. Every mesh node is
+given EXT_mesh_gpu_instancing attributes that place one copy per label on a
+grid, and the label images are packed into a single texture atlas. The
+label material's KHR_texture_transform selects the first cell, and a custom
+per-instance _UV_OFFSET attribute moves each copy to its own cell. Viewers
+without instancing support show a single ball with the first label; the
+web viewer expands the instances into InstancedMeshes (one draw call per
+primitive for the whole catalog).
+"""
+
+import io
+import os
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from glb_utils import read_glb, build_glb, replace_buffer_views, material_base_color_image, write_once, node_matrix
+from label_delivery import TARGET_MATERIAL_NAME, content_hash
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DEFAULT_CELL_WIDTH = 512
+MAX_ATLAS_SIZE = 8192        # Largest texture size WebGL implementations commonly accept
+GUTTER = 4                   # Pixels of edge padding per cell, so mipmaps don't bleed between labels
+MAX_COLUMNS = MAX_ATLAS_SIZE // (2 * GUTTER + 1)  # Beyond this a cell has no room inside its gutter
+ATLAS_JPEG_QUALITY = 90
+SPACING = 1.25               # Grid pitch as a multiple of the ball's largest dimension
+INSTANCING_EXTENSION = "EXT_mesh_gpu_instancing"
+TEXTURE_TRANSFORM_EXTENSION = "KHR_texture_transform"
+FLOAT = 5126
+
+def build_atlas(image_paths, cell_width=DEFAULT_CELL_WIDTH, columns=None):
+    """Pack label images into a grid. Returns (bytes, mime_type, columns, rows, cells).
+
+    Cells share the first label's aspect ratio; cells[i] is the (offset, scale)
+    in UV space of label i's area inside its gutter.
+    """
+    from PIL import Image
+
+    count = len(image_paths)
+    columns = columns or math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    with Image.open(image_paths[0]) as first:
+        aspect = first.height / first.width
+    cell_width = min(cell_width, MAX_ATLAS_SIZE // columns, int(MAX_ATLAS_SIZE / rows / aspect))
+    cell_height = round(cell_width * aspect)
+    if cell_width <= 2 * GUTTER or cell_height <= 2 * GUTTER:
+        raise ValueError(f"Too many labels for one {MAX_ATLAS_SIZE}px atlas: {count}")
+    inner = (cell_width - 2 * GUTTER, cell_height - 2 * GUTTER)
+    atlas_size = (columns * cell_width, rows * cell_height)
+
+    def load_cell(path):
+        with Image.open(path) as image:
+            alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            return image.convert("RGBA" if alpha else "RGB").resize(inner, Image.LANCZOS, reducing_gap=3.0)
+
+    # Decoding and resizing release the GIL, so labels are prepared on all cores
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        cells_images = list(executor.map(load_cell, image_paths))
+    has_alpha = any(image.mode == "RGBA" for image in cells_images)
+    atlas = Image.new("RGBA" if has_alpha else "RGB", atlas_size, (255, 255, 255, 0) if has_alpha else "white")
+    cells = []
+    for index, image in enumerate(cells_images):
+        x = (index % columns) * cell_width
+        y = (index // columns) * cell_height
+        # The label stretched over the whole cell fills the gutter with (nearly) its edge colors
+        atlas.paste(image.resize((cell_width, cell_height), Image.BILINEAR), (x, y))
+        atlas.paste(image, (x + GUTTER, y + GUTTER))
+        cells.append(((x + GUTTER) / atlas_size[0], (y + GUTTER) / atlas_size[1]))
+
+    output = io.BytesIO()
+    if has_alpha:
+        atlas.save(output, "PNG", optimize=True)
+        mime_type = "image/png"
+    else:
+        atlas.convert("RGB").save(output, "JPEG", quality=ATLAS_JPEG_QUALITY, optimize=True)
+        mime_type = "image/jpeg"
+    scale = (inner[0] / atlas_size[0], inner[1] / atlas_size[1])
+    return output.getvalue(), mime_type, columns, rows, [(offset, scale) for offset in cells]
+
+def _world_matrices(gltf):
+    """{node index: 4x4 world matrix} for every node of the default scene."""
+    import numpy as np
+
+    matrices = {}
+    nodes = gltf.get("nodes", [])
+    scene = gltf["scenes"][gltf.get("scene", 0)]
+    stack = [(index, np.eye(4)) for index in scene.get("nodes", [])]
+    while stack:
+        index, parent = stack.pop()
+        world = parent @ node_matrix(nodes[index])
+        matrices[index] = world
+        stack.extend((child, world) for child in nodes[index].get("children", []))
+    return matrices
+
+def _scene_bounds(gltf, mesh_nodes):
+    """(min, max) corners of the scene from the POSITION accessors' bounds."""
+    import numpy as np
+
+    corners = []
+    for node, world in mesh_nodes:
+        for primitive in gltf["meshes"][node["mesh"]]["primitives"]:
+            accessor = gltf["accessors"][primitive["attributes"]["POSITION"]]
+            low, high = accessor["min"], accessor["max"]
+            box = np.array([[x, y, z, 1.0] for x in (low[0], high[0]) for y in (low[1], high[1])
+                            for z in (low[2], high[2])])
+            corners.append((world @ box.T).T[:, :3])
+    corners = np.concatenate(corners)
+    return corners.min(axis=0), corners.max(axis=0)
+
+def build_catalog(base_glb_path, image_paths, labels=None, columns=None, cell_width=DEFAULT_CELL_WIDTH,
+                  material_name=TARGET_MATERIAL_NAME):
+    """Return catalog GLB bytes: the base GLB's ball instanced once per label image on a grid."""
+    import numpy as np
+
+    if not image_paths:
+        raise ValueError("A catalog needs at least one label image")
+    gltf, binary = read_glb(base_glb_path)
+    image_index = material_base_color_image(gltf, material_name)
+    if image_index is None:
+        raise ValueError(f"Material '{material_name}' has no base color texture in {base_glb_path}")
+    image = gltf["images"][image_index]
+    if "bufferView" not in image:
+        raise ValueError("Label image is not embedded in the GLB")
+
+    atlas, mime_type, columns, rows, cells = build_atlas(image_paths, cell_width, columns)
+    gltf, binary = replace_buffer_views(gltf, binary, {image["bufferView"]: atlas})
+    gltf["images"][image_index]["mimeType"] = mime_type
+    first_offset, scale = cells[0]
+    for material in gltf["materials"]:
+        if material.get("name") == material_name:
+            texture_info = material["pbrMetallicRoughness"]["baseColorTexture"]
+            texture_info.setdefault("extensions", {})[TEXTURE_TRANSFORM_EXTENSION] = {
+                "offset": list(first_offset), "scale": list(scale)}
+
+    # Flatten the scene to one node per mesh, each carrying its world transform
+    matrices = _world_matrices(gltf)
+    mesh_nodes = [(gltf["nodes"][index], matrices[index]) for index in sorted(matrices)
+                  if "mesh" in gltf["nodes"][index]]
+    if not mesh_nodes:
+        raise ValueError(f"No meshes in the default scene of {base_glb_path}")
+    low, high = _scene_bounds(gltf, mesh_nodes)
+    pitch = SPACING * float((high - low).max())
+    count = len(image_paths)
+    grid = np.array([[(index % columns - (columns - 1) / 2) * pitch, ((rows - 1) / 2 - index // columns) * pitch, 0]
+                     for index in range(count)], dtype=np.float64)
+    uv_offsets = np.array([[offset[0] - first_offset[0], offset[1] - first_offset[1]] for offset, _ in cells],
+                          dtype=np.float32)
+
+    gltf.setdefault("bufferViews", [])
+    gltf.setdefault("accessors", [])
+    packed = bytearray(binary)
+
+    def add_accessor(array, accessor_type):
+        packed.extend(b"\x00" * (-len(packed) % 4))
+        data = np.ascontiguousarray(array, dtype="<f4").tobytes()
+        gltf["bufferViews"].append({"buffer": 0, "byteOffset": len(packed), "byteLength": len(data)})
+        packed.extend(data)
+        gltf["accessors"].append({"bufferView": len(gltf["bufferViews"]) - 1, "componentType": FLOAT,
+                                  "count": len(array), "type": accessor_type})
+        return len(gltf["accessors"]) - 1
+
+    uv_accessor = add_accessor(uv_offsets, "VEC2")
+    nodes = []
+    for node, world in mesh_nodes:
+        # Instance transforms apply before the node's own, so move each copy in the node's local space
+        translations = np.linalg.solve(world[:3, :3], grid.T).T
+        nodes.append({
+            "name": node.get("name", f"mesh_{node['mesh']}"),
+            "mesh": node["mesh"],
+            "matrix": world.T.ravel().tolist(),
+            "extensions": {INSTANCING_EXTENSION: {"attributes": {
+                "TRANSLATION": add_accessor(translations, "VEC3"),
+                "_UV_OFFSET": uv_accessor
+            }}}
+        })
+    gltf["nodes"] = nodes
+    labels = labels or [os.path.splitext(os.path.basename(path))[0] for path in image_paths]
+    gltf["scenes"] = [{"name": "Catalog", "nodes": list(range(len(nodes))), "extras": {"catalog": {
+        "labels": labels, "columns": columns, "rows": rows, "material": material_name}}}]
+    gltf["scene"] = 0
+    for key in ("animations", "skins", "cameras"):
+        gltf.pop(key, None)
+    used = gltf.setdefault("extensionsUsed", [])
+    used.extend(name for name in (INSTANCING_EXTENSION, TEXTURE_TRANSFORM_EXTENSION) if name not in used)
+    packed.extend(b"\x00" * (-len(packed) % 4))
+    gltf.setdefault("buffers", [{}])[0]["byteLength"] = len(packed)
+    return build_glb(gltf, bytes(packed))
+
+def publish_catalog(base_glb_path, image_paths, models_dir, **options):
+    """Write the catalog as models_dir/catalog-<hash>.glb and return the file name."""
+    data = build_catalog(base_glb_path, image_paths, **options)
+    name = f"catalog-{content_hash(data)}.glb"
+    write_once(os.path.join(models_dir, name), data)
+    return name
+
+def expand_images(paths):
+    """Image files from a mix of files and directories (directories sorted by name)."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                          if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            images.append(path)
+    return images
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Combine label images into one instanced catalog GLB")
+    parser.add_argument("base", help="An exported label GLB providing the ball geometry")
+    parser.add_argument("images", nargs="+", help="Label images, or directories of them")
+    parser.add_argument("-o", "--output", default="catalog.glb", help="Output GLB")
+    parser.add_argument("--columns", type=int, help="Balls per row (default: square grid)")
+    parser.add_argument("--cell-width", type=int, default=DEFAULT_CELL_WIDTH, help="Atlas pixels per label")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    import time
+
+    args = parse_arguments()
+    images = expand_images(args.images)
+    start = time.perf_counter()
+    data = build_catalog(args.base, images, columns=args.columns, cell_width=args.cell_width)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"[INFO] Catalog of {len(images)} labels saved to: {args.output} "
+          f"({len(data) / 1e6:.1f} MB, {time.perf_counter() - start:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Split a label GLB into a shared geometry asset and a per-label texture.
+
+The ball geometry exported from Golf.blend is the same for every label; only
+the label image changes. publish_split_assets() swaps the embedded label
+image for a 1x1 placeholder so the remaining GLB is byte-identical across
+labels, stores it and the label texture under content-hashed (immutable)
+names, and writes a small manifest the viewer polls.
+
+The texture is also published as a pyramid of smaller levels (power-of-two
+sized, so they mipmap in WebGL 1) that the viewer shows first and upgrades
+from as larger levels arrive.
+
+A fast preview export can be published the same way with stage="preview"
+(its texture taken from the GLB itself); the final publish replaces it, and
+retract_preview() puts the earlier manifest back if the final never comes.
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+
+from glb_utils import (read_glb, build_glb, buffer_view_bytes, replace_buffer_views, material_base_color_image,
+                       write_once)
+
+MANIFEST_NAME = "label_manifest.json"
+TEXTURES_SUBDIR = "textures"
+TARGET_MATERIAL_NAME = "Material.002"
+# Widths of the downscaled texture levels; the full-resolution texture is always the top level
+TEXTURE_LEVEL_WIDTHS = (256, 512)
+TEXTURE_LEVEL_JPEG_QUALITY = 85
+LEVEL_EXTENSIONS = (".jpg", ".png")  # What build_texture_levels() writes
+
+# 1x1 white PNG stand-in for the label image inside the shared geometry GLB
+PLACEHOLDER_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
+)
+
+_manifest_lock = threading.Lock()
+
+def content_hash(data):
+    """Short content hash used in immutable asset names."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def build_geometry_glb(glb_path, material_name=TARGET_MATERIAL_NAME):
+    """Return GLB bytes with the material's label image replaced by a placeholder."""
+    gltf, binary = read_glb(glb_path)
+    image_index = material_base_color_image(gltf, material_name)
+    if image_index is None:
+        raise ValueError(f"Material '{material_name}' has no base color texture in {glb_path}")
+    image = gltf["images"][image_index]
+    if "bufferView" not in image:
+        raise ValueError("Label image is not embedded in the GLB")
+    gltf, binary = replace_buffer_views(gltf, binary, {image["bufferView"]: PLACEHOLDER_PNG})
+    gltf["images"][image_index]["mimeType"] = "image/png"
+    return build_glb(gltf, binary)
+
+def embedded_label_texture(glb_path, material_name=TARGET_MATERIAL_NAME):
+    """(bytes, extension) of the label image embedded in a GLB."""
+    gltf, binary = read_glb(glb_path)
+    image_index = material_base_color_image(gltf, material_name)
+    if image_index is None or "bufferView" not in gltf["images"][image_index]:
+        raise ValueError(f"Material '{material_name}' has no embedded base color texture in {glb_path}")
+    image = gltf["images"][image_index]
+    extension = ".jpg" if image.get("mimeType") == "image/jpeg" else ".png"
+    return buffer_view_bytes(gltf, binary, image["bufferView"]), extension
+
+def _power_of_two_floor(value):
+    return 1 << (max(1, value).bit_length() - 1)
+
+def build_texture_levels(texture):
+    """Downscaled copies of a label texture, smallest first, as (width, height, bytes, extension).
+
+    Heights are rounded down to a power of two; the UVs span the whole image,
+    so the change in aspect ratio doesn't show. Opaque labels are stored as
+    progressive JPEG, labels with transparency as PNG.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(texture))
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    levels = []
+    for width in TEXTURE_LEVEL_WIDTHS:
+        if width >= image.width:
+            break
+        height = _power_of_two_floor(round(width * image.height / image.width))
+        output = io.BytesIO()
+        level = image.resize((width, height), Image.LANCZOS)
+        if has_alpha:
+            level.save(output, "PNG", optimize=True)
+            levels.append((width, height, output.getvalue(), ".png"))
+        else:
+            level.save(output, "JPEG", quality=TEXTURE_LEVEL_JPEG_QUALITY, progressive=True, optimize=True)
+            levels.append((width, height, output.getvalue(), ".jpg"))
+    return levels
+
+def _published_levels(texture_hash, textures_dir, full_width):
+    """Manifest entries for levels already written for this texture, or None if any is missing."""
+    from PIL import Image
+
+    entries = []
+    for width in TEXTURE_LEVEL_WIDTHS:
+        if width >= full_width:
+            break
+        # Only finished levels: another job's temporary file for the same level may sit next to them
+        matches = [path for path in (os.path.join(textures_dir, f"label-w{width}-{texture_hash}{ext}")
+                                     for ext in LEVEL_EXTENSIONS) if os.path.exists(path)]
+        if not matches:
+            return None
+        with Image.open(matches[0]) as level:
+            height = level.height
+        entries.append({"url": f"/models/{TEXTURES_SUBDIR}/{os.path.basename(matches[0])}", "width": width,
+                        "height": height, "bytes": os.path.getsize(matches[0])})
+    return entries
+
+def publish_texture_levels(texture, texture_hash, textures_dir, full_width):
+    """Write the texture's downscaled levels (once per texture) and return their manifest entries."""
+    existing = _published_levels(texture_hash, textures_dir, full_width)
+    if existing is not None:
+        return existing
+    entries = []
+    for width, height, data, ext in build_texture_levels(texture):
+        # Named after the full texture's hash so republishing the same label skips the resize
+        name = f"label-w{width}-{texture_hash}{ext}"
+        write_once(os.path.join(textures_dir, name), data)
+        entries.append({"url": f"/models/{TEXTURES_SUBDIR}/{name}", "width": width, "height": height,
+                        "bytes": len(data)})
+    return entries
+
+def _image_size(texture):
+    from PIL import Image
+    return Image.open(io.BytesIO(texture)).size
+
+def publish_split_assets(glb_path, texture_path, models_dir, job_id=None, material_name=TARGET_MATERIAL_NAME,
+                         stage="final"):
+    """Publish hashed geometry/texture assets for a label and rewrite the manifest.
+
+    With texture_path None, the label image embedded in the GLB is used.
+    Returns the manifest dict. URLs are relative to the viewer's /models route.
+    """
+    geometry = build_geometry_glb(glb_path, material_name)
+    geometry_name = f"geometry-{content_hash(geometry)}.glb"
+    write_once(os.path.join(models_dir, geometry_name), geometry)
+
+    if texture_path is None:
+        texture, texture_ext = embedded_label_texture(glb_path, material_name)
+    else:
+        with open(texture_path, "rb") as f:
+            texture = f.read()
+        texture_ext = os.path.splitext(texture_path)[1] or ".png"
+    texture_hash = content_hash(texture)
+    texture_name = f"label-{texture_hash}{texture_ext}"
+    textures_dir = os.path.join(models_dir, TEXTURES_SUBDIR)
+    os.makedirs(textures_dir, exist_ok=True)
+    write_once(os.path.join(textures_dir, texture_name), texture)
+    width, height = _image_size(texture)
+    levels = publish_texture_levels(texture, texture_hash, textures_dir, width)
+    levels.append({"url": f"/models/{TEXTURES_SUBDIR}/{texture_name}", "width": width, "height": height,
+                   "bytes": len(texture)})
+
+    manifest = {
+        "geometry": f"/models/{geometry_name}",
+        "geometry_bytes": len(geometry),
+        "texture": f"/models/{TEXTURES_SUBDIR}/{texture_name}",
+        "texture_bytes": len(texture),
+        "textures": levels,
+        "material": material_name,
+        "job_id": job_id,
+        "stage": stage,
+        "updated_at": time.time(),
+    }
+    with _manifest_lock:
+        _write_manifest(models_dir, manifest)
+    return manifest
+
+def _write_manifest(models_dir, manifest):
+    manifest_path = os.path.join(models_dir, MANIFEST_NAME)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def read_manifest(models_dir):
+    """The published manifest, or None if there is none (or it is unreadable)."""
+    try:
+        with open(os.path.join(models_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def retract_preview(models_dir, job_id, previous):
+    """Put back the manifest a job's preview replaced, unless something newer was published since.
+
+    previous is the manifest read before the preview went out (None if there
+    was none). Returns True if the preview was withdrawn.
+    """
+    with _manifest_lock:
+        current = read_manifest(models_dir)
+        if not current or current.get("job_id") != job_id or current.get("stage") != "preview":
+            return False
+        if previous is None:
+            os.remove(os.path.join(models_dir, MANIFEST_NAME))
+        else:
+            _write_manifest(models_dir, previous)
+    return True
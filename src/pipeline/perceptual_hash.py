@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Perceptual hashing of label images, to reuse exports of near-duplicates.
+
+A regenerated or re-saved label is often visually identical to one exported
+before while differing in bytes (encoder settings, metadata), so content
+hashes miss it. dhash() reduces an image to a 64-bit difference hash of its
+downscaled grayscale version; images that look the same have hashes a few
+bits apart. dHash only sees brightness gradients, so a label recolored
+without changing its layout would hash the same; a coarse color grid is kept
+alongside and must also agree. Neither can tell apart two labels with the
+same layout but different text, so every candidate is confirmed against a
+128x128 downscale of the image it was exported from. ExportIndex keeps the
+GLB and that downscale for each fingerprinted image and finds the closest
+previous export by Hamming distance with a BK-tree.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+
+HASH_SIZE = 8                # dHash grid: 8x8 comparisons -> 64 bits
+DEFAULT_MAX_DISTANCE = 0     # Bits out of 64 that may differ for a candidate match
+DEFAULT_MAX_ENTRIES = 500
+COLOR_GRID = 4               # Mean colors of a 4x4 grid must agree too
+COLOR_TOLERANCE = 12         # Largest per-channel difference (0-255) between matching grid cells
+DETAIL_SIZE = 128            # Candidates are confirmed on a 128x128 RGB downscale...
+DETAIL_TOLERANCE = 24        # ...in which no pixel may differ by more than this per channel
+INDEX_NAME = "index.json"
+GLB_SUBDIR = "glbs"
+SOURCE_SUBDIR = "sources"
+# Nearest distances are recorded up to this far for the tuning histogram; anything further counts as "far"
+HISTOGRAM_RADIUS = 16
+
+def fingerprint(image_path, hash_size=HASH_SIZE):
+    """(hash, colors) of an image: its 64-bit difference hash and the hex mean colors of a coarse grid.
+
+    The hash bit for each cell of a (size+1)xsize grayscale downscale says
+    whether it is brighter than its right neighbour.
+    """
+    import numpy as np
+    from PIL import Image
+
+    image = _visible_rgb(image_path, hash_size * 32)
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    colors = image.resize((COLOR_GRID, COLOR_GRID), Image.BOX)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big"), np.asarray(colors, dtype=np.uint8).tobytes().hex()
+
+def _visible_rgb(image_path, draft_size):
+    """An image as RGB, with transparency composited onto white so only what is visible is compared."""
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        image.draft("RGB", (draft_size, draft_size))  # JPEGs decode straight at a reduced size
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image)
+        return image.convert("RGB")
+
+def detail_image(image_path, size=DETAIL_SIZE):
+    """size x size RGB downscale of an image, fine enough to tell labels with different text apart."""
+    from PIL import Image
+
+    return _visible_rgb(image_path, size * 4).resize((size, size), Image.BOX)
+
+def details_match(a, b, tolerance=DETAIL_TOLERANCE):
+    """True if two detail images agree within tolerance in every pixel and channel."""
+    import numpy as np
+
+    if a.size != b.size:
+        return False
+    difference = np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16))
+    return int(difference.max(initial=0)) <= tolerance
+
+def dhash(image_path, hash_size=HASH_SIZE):
+    """64-bit difference hash of an image."""
+    return fingerprint(image_path, hash_size)[0]
+
+def colors_match(a, b, tolerance=COLOR_TOLERANCE):
+    """True if two fingerprints' color grids agree within tolerance in every cell and channel."""
+    import numpy as np
+
+    if len(a) != len(b):
+        return False
+    difference = np.abs(np.frombuffer(bytes.fromhex(a), np.uint8).astype(np.int16)
+                        - np.frombuffer(bytes.fromhex(b), np.uint8))
+    return int(difference.max(initial=0)) <= tolerance
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Each node keeps its children by distance, so a radius search only visits
+    children whose distance to the node is within radius of the query's.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, item)] for every item within radius of value, nearest first."""
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                matches.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+class ExportIndex:
+    """GLBs exported from previous label images, looked up by perceptual hash.
+
+    Entries are only matched against the same build key (the scene and export
+    script they were produced with), and a hash match only counts once the
+    image's detail downscale agrees with the one stored for the entry. GLBs
+    are stored once per content hash. The oldest entries are dropped beyond
+    max_entries.
+    """
+
+    def __init__(self, directory, max_distance=DEFAULT_MAX_DISTANCE, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.glb_dir = os.path.join(directory, GLB_SUBDIR)
+        self.source_dir = os.path.join(directory, SOURCE_SUBDIR)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.nearest_distances = {}
+        os.makedirs(self.glb_dir, exist_ok=True)
+        os.makedirs(self.source_dir, exist_ok=True)
+        self.entries = self._load()
+        self._rebuild()
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable export index {self.index_path}: {e}")
+            return []
+        # Entries without a stored detail image cannot be confirmed, so they are dropped too
+        return [entry for entry in entries
+                if os.path.exists(os.path.join(self.glb_dir, entry["glb"]))
+                and entry.get("source") and os.path.exists(os.path.join(self.source_dir, entry["source"]))]
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _rebuild(self):
+        self.tree = BKTree()
+        for entry in self.entries:
+            self.tree.add(int(entry["hash"], 16), entry)
+
+    def lookup(self, image_hash, colors, build, image_path):
+        """(entry, distance) of the closest confirmed export within max_distance for this build, or None.
+
+        Candidates are checked nearest first against the detail image stored
+        with them; ones that look different up close count as rejected.
+        """
+        from PIL import Image
+
+        with self._lock:
+            matches = [(distance, entry) for distance, entry in self.tree.search(image_hash, HISTOGRAM_RADIUS)
+                       if entry["build"] == build and colors_match(entry["colors"], colors)]
+            nearest = str(matches[0][0]) if matches else "far"
+            self.nearest_distances[nearest] = self.nearest_distances.get(nearest, 0) + 1
+        candidates = [(distance, entry) for distance, entry in matches if distance <= self.max_distance]
+        detail = detail_image(image_path) if candidates else None
+        for distance, entry in candidates:
+            try:
+                with Image.open(os.path.join(self.source_dir, entry["source"])) as stored:
+                    confirmed = details_match(detail, stored.convert("RGB"))
+            except OSError:
+                continue  # Evicted since the search
+            if confirmed:
+                with self._lock:
+                    self.hits += 1
+                return dict(entry, path=os.path.join(self.glb_dir, entry["glb"])), distance
+            with self._lock:
+                self.rejected += 1
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def add(self, image_hash, colors, glb_path, build, image_path, **details):
+        """Store a copy of an exported GLB and the detail image of its source under the image's hash."""
+        name = f"{_file_digest(glb_path)}.glb"
+        path = os.path.join(self.glb_dir, name)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(glb_path, tmp_path)
+            os.replace(tmp_path, path)
+        detail = detail_image(image_path)
+        source = f"{hashlib.sha256(detail.tobytes()).hexdigest()[:16]}.png"
+        source_path = os.path.join(self.source_dir, source)
+        if not os.path.exists(source_path):
+            tmp_path = f"{source_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            detail.save(tmp_path, format="PNG")
+            os.replace(tmp_path, source_path)
+        entry = dict(details, hash=f"{image_hash:016x}", colors=colors, build=build, glb=name, source=source,
+                     added_at=time.time())
+        with self._lock:
+            self.entries.append(entry)
+            if len(self.entries) > self.max_entries:
+                dropped = self.entries[:-self.max_entries]
+                self.entries = self.entries[-self.max_entries:]
+                self._rebuild()
+                kept = {entry["glb"] for entry in self.entries} | {entry["source"] for entry in self.entries}
+                for old in dropped:
+                    for directory, name in ((self.glb_dir, old["glb"]), (self.source_dir, old["source"])):
+                        if name not in kept and os.path.exists(os.path.join(directory, name)):
+                            os.remove(os.path.join(directory, name))
+            else:
+                self.tree.add(image_hash, entry)
+            self._save()
+        return entry
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "max_distance": self.max_distance,
+                    "hits": self.hits, "misses": self.misses, "rejected": self.rejected,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "nearest_distances": dict(self.nearest_distances)}
+
+def _file_digest(path):
+    """First 16 hex digits of a file's SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Print perceptual hashes of images and their pairwise distances")
+    parser.add_argument("images", nargs="+", help="Image files to hash")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    prints = [fingerprint(path) for path in args.images]
+    details = [detail_image(path) for path in args.images]
+    for path, (value, _) in zip(args.images, prints):
+        print(f"{value:016x}  {path}")
+    for i in range(len(prints)):
+        for j in range(i + 1, len(prints)):
+            colors = "colors match" if colors_match(prints[i][1], prints[j][1]) else "colors differ"
+            detail = "details match" if details_match(details[i], details[j]) else "details differ"
+            print(f"[INFO] {args.images[i]} <-> {args.images[j]}: "
+                  f"{hamming(prints[i][0], prints[j][0])} bits, {colors}, {detail}")
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,8 @@ import subprocess
 import time
 import os
 import sys
-import asyncio
-import threading
-from pathlib import Path
+
+from env_probe import get_probe
 
 # --- CONFIG ---
 IMAGE_PATH = os.path.join(os.path.dirname(__file__), '../../assets/images/image.png')
@@ -12,6 +11,11 @@ GLB_OUTPUT_PATH = os.path.join(os.path.dirname(__file__), '../../assets/models/e
 BLEND_FILE = os.path.join(os.path.dirname(__file__), '../../assets/blend_files/Golf.blend')
 BLENDER_DIR = r"C:\Program Files\Blender Foundation\Blender 4.4"
 BLENDER_EXE = os.path.join(BLENDER_DIR, "blender.exe")
+# Per-stage deadlines in seconds
+DALLE_TIMEOUT = 180
+BLENDER_TIMEOUT = 600
+# GLB budget profile reported after export (see glb_inspect.py)
+EXPORT_PROFILE = "default"
 
 def check_dependencies():
     """Check if all required files and dependencies exist."""
@@ -22,11 +26,14 @@ def check_dependencies():
         print("[ERROR] .env file not found! Please create it with your OpenAI API key.")
         return False
     
-    # Check if Blender exists
-    if not os.path.exists(BLENDER_EXE):
+    # Check if Blender exists (falls back to PATH/TOOL_SEARCH_PATH; the probe is cached)
+    blender = get_probe().tool("blender", BLENDER_EXE)
+    if not blender.path:
         print(f"[ERROR] Blender not found at: {BLENDER_EXE}")
-        print("Please update BLENDER_DIR in the script to your Blender installation path.")
+        print("Please update BLENDER_DIR in the script to your Blender installation path, or put blender on PATH.")
         return False
+    if blender.path != BLENDER_EXE:
+        print(f"[INFO] Using Blender from: {blender.path}")
     
     # Check if .blend file exists
     if not os.path.exists(BLEND_FILE):
@@ -66,16 +73,19 @@ def run_dalle_generation(prompt=None):
             # Run with custom prompt
             result = subprocess.run([
                 sys.executable, os.path.join(os.path.dirname(__file__), '../../scripts/generate_image_with_dalle.py'), '--prompt', prompt
-            ], capture_output=True, text=True, check=True)
+            ], capture_output=True, text=True, check=True, timeout=DALLE_TIMEOUT)
         else:
             # Run with interactive prompt
             result = subprocess.run([
                 sys.executable, os.path.join(os.path.dirname(__file__), '../../scripts/generate_image_with_dalle.py')
-            ], capture_output=True, text=True, check=True)
+            ], capture_output=True, text=True, check=True, timeout=DALLE_TIMEOUT)
         
         print("[SUCCESS] Image generated successfully!")
         return True
         
+    except subprocess.TimeoutExpired:
+        print(f"[ERROR] DALL-E generation timed out after {DALLE_TIMEOUT}s")
+        return False
     except subprocess.CalledProcessError as e:
         print(f"[ERROR] DALL-E generation failed: {e}")
         print(f"Error output: {e.stderr}")
@@ -87,16 +97,19 @@ def run_blender_export():
     
     try:
         command = [
-            BLENDER_EXE, BLEND_FILE,
+            get_probe().tool("blender", BLENDER_EXE).path or BLENDER_EXE, BLEND_FILE,
             "--background",
             "--python", os.path.join(os.path.dirname(__file__), '../blender/generate_label_glb.py'),
             "--", IMAGE_PATH, GLB_OUTPUT_PATH
         ]
         
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=BLENDER_TIMEOUT)
         print("[SUCCESS] 3D model updated and exported!")
         return True
         
+    except subprocess.TimeoutExpired:
+        print(f"[ERROR] Blender export timed out after {BLENDER_TIMEOUT}s")
+        return False
     except subprocess.CalledProcessError as e:
         print(f"[ERROR] Blender export failed: {e}")
         print(f"Error output: {e.stderr}")
@@ -111,7 +124,13 @@ def display_glb_file():
         return False
     
     print(f"[INFO] GLB file generated: {GLB_OUTPUT_PATH}")
-    print(f"[INFO] File size: {os.path.getsize(GLB_OUTPUT_PATH) / 1024:.1f} KB")
+    try:
+        from glb_inspect import inspect_glb, check_budgets, print_report
+        report = inspect_glb(GLB_OUTPUT_PATH)
+        print_report(report, check_budgets(report, EXPORT_PROFILE))
+    except ValueError as e:
+        print(f"[WARN] Could not inspect GLB: {e}")
+        print(f"[INFO] File size: {os.path.getsize(GLB_OUTPUT_PATH) / 1024:.1f} KB")
     
     # Start the web app server
     try:
@@ -125,12 +144,16 @@ def display_glb_file():
             print(f"[ERROR] Web app directory not found: {web_app_dir}")
             return False
         
+        # Resolve npm/node once (PATH first, then common install locations)
+        npm_path = get_probe().tool("npm").path or "npm"
+        node_path = get_probe().tool("node").path or "node"
+        
         # Check if node_modules exists, if not install dependencies
         node_modules_path = os.path.join(web_app_dir, "node_modules")
         if not os.path.exists(node_modules_path):
             print("[INFO] Installing web app dependencies...")
             try:
-                subprocess.run(["npm", "install"], cwd=web_app_dir, check=True, capture_output=True)
+                subprocess.run([npm_path, "install"], cwd=web_app_dir, check=True, capture_output=True)
                 print("[SUCCESS] Dependencies installed!")
             except subprocess.CalledProcessError as e:
                 print(f"[ERROR] Failed to install dependencies: {e}")
@@ -141,7 +164,7 @@ def display_glb_file():
         try:
             # Try using npm start first
             server_process = subprocess.Popen(
-                ["npm", "start"], 
+                [npm_path, "start"], 
                 cwd=web_app_dir, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE
@@ -150,7 +173,7 @@ def display_glb_file():
             # Fallback to direct node execution
             print("[INFO] npm not found, trying direct node execution...")
             server_process = subprocess.Popen(
-                ["node", "server.js"], 
+                [node_path, "server.js"], 
                 cwd=web_app_dir, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE
@@ -225,6 +248,14 @@ def main():
         print("\n[ERROR] Pipeline failed at 3D model update step.")
         return
     
+    # Publish shared geometry + label texture for the viewer's incremental updates
+    try:
+        from label_delivery import publish_split_assets
+        manifest = publish_split_assets(GLB_OUTPUT_PATH, IMAGE_PATH, os.path.dirname(GLB_OUTPUT_PATH))
+        print(f"[INFO] Label texture published: {manifest['texture']} ({manifest['texture_bytes'] / 1024:.1f} KB)")
+    except ValueError as e:
+        print(f"[WARN] Could not split label assets: {e}")
+    
     # Step 3: Display result
     display_glb_file()
     
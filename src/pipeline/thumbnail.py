@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Headless CPU thumbnail renderer for exported GLBs.
+
+A small NumPy software rasterizer: triangles from every mesh in the default
+scene are transformed and set up in bulk, bucketed by screen-space bounding
+box size so each bucket is rasterized with one set of array operations,
+resolved against a z-buffer and shaded with the material's base color
+texture and a simple key/fill light. Rendering is supersampled and
+downscaled for anti-aliasing. Thumbnails are cached by GLB content hash.
+"""
+
+import io
+import os
+import math
+import argparse
+import hashlib
+
+from glb_utils import read_glb, buffer_view_bytes, node_matrix
+
+BACKGROUND = (0x1a, 0x1a, 0x2e)  # matches the web viewer
+DEFAULT_SIZE = 256
+SUPERSAMPLE = 2
+# Camera direction (towards the eye) and light setup, roughly as in the viewer
+VIEW_DIRECTION = (1.0, 0.8, 1.0)
+LIGHT_DIRECTION = (0.8, 1.0, 0.4)
+AMBIENT = 0.35
+DIFFUSE = 0.75
+FOV_DEGREES = 30.0
+# Bounding-box buckets (pixels per side) rasterized fully vectorized; bigger triangles go one by one
+BBOX_BUCKETS = (1, 2, 4, 8, 16)
+CHUNK_FRAGMENTS = 2_000_000
+
+COMPONENT_DTYPES = {5120: "i1", 5121: "u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+def read_accessor(gltf, binary, index):
+    """Return an accessor's data as a (count, components) float32 array."""
+    import numpy as np
+
+    accessor = gltf["accessors"][index]
+    dtype = np.dtype(COMPONENT_DTYPES[accessor["componentType"]])
+    components = TYPE_SIZES[accessor["type"]]
+    count = accessor["count"]
+    if "bufferView" not in accessor:
+        return np.zeros((count, components), dtype=np.float32)
+
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    stride = view.get("byteStride") or dtype.itemsize * components
+    data = np.ndarray((count, components), dtype=dtype, buffer=binary, offset=offset,
+                      strides=(stride, dtype.itemsize))
+    data = data.astype(np.float32)
+    if accessor.get("normalized"):
+        data /= float(np.iinfo(dtype).max)
+    return data
+
+def _decode_image(gltf, binary, image_index):
+    """Decode an embedded image to a float32 RGB array in [0, 1]."""
+    import numpy as np
+    from PIL import Image
+
+    image = gltf["images"][image_index]
+    if "bufferView" not in image:
+        return None
+    data = buffer_view_bytes(gltf, binary, image["bufferView"])
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"), dtype=np.float32) / 255.0
+
+def load_scene(path):
+    """Flatten the GLB's default scene into world-space triangle arrays.
+
+    Returns (positions[T,3,3], normals[T,3,3], uvs[T,3,2], material_ids[T], materials)
+    where materials is a list of (base_color_rgb, texture_or_None).
+    """
+    import numpy as np
+
+    gltf, binary = read_glb(path)
+    nodes = gltf.get("nodes", [])
+    scenes = gltf.get("scenes", [])
+    roots = scenes[gltf.get("scene", 0)].get("nodes", []) if scenes else list(range(len(nodes)))
+
+    textures = {}
+    materials = []
+    for material in gltf.get("materials", []):
+        pbr = material.get("pbrMetallicRoughness", {})
+        color = np.array(pbr.get("baseColorFactor", (1, 1, 1, 1))[:3], dtype=np.float32)
+        texture = None
+        if "baseColorTexture" in pbr:
+            source = gltf["textures"][pbr["baseColorTexture"]["index"]].get("source")
+            if source is not None:
+                if source not in textures:
+                    textures[source] = _decode_image(gltf, binary, source)
+                texture = textures[source]
+        materials.append((color, texture))
+    default_material = len(materials)
+    materials.append((np.array((0.8, 0.8, 0.8), dtype=np.float32), None))
+
+    parts = {"positions": [], "normals": [], "uvs": [], "materials": []}
+    stack = [(root, np.eye(4)) for root in roots]
+    while stack:
+        index, parent = stack.pop()
+        node = nodes[index]
+        world = parent @ node_matrix(node)
+        stack.extend((child, world) for child in node.get("children", []))
+        if "mesh" not in node:
+            continue
+        normal_matrix = np.linalg.inv(world[:3, :3]).T
+        for primitive in gltf["meshes"][node["mesh"]].get("primitives", []):
+            if primitive.get("mode", 4) != 4 or "POSITION" not in primitive.get("attributes", {}):
+                continue
+            attributes = primitive["attributes"]
+            positions = read_accessor(gltf, binary, attributes["POSITION"])[:, :3]
+            if "indices" in primitive:
+                indices = read_accessor(gltf, binary, primitive["indices"])[:, 0].astype(np.int64)
+            else:
+                indices = np.arange(len(positions))
+            indices = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+
+            world_positions = positions @ world[:3, :3].T + world[:3, 3]
+            triangles = world_positions[indices]
+            if "NORMAL" in attributes:
+                normals = read_accessor(gltf, binary, attributes["NORMAL"])[:, :3] @ normal_matrix.T
+                normals = normals[indices]
+            else:
+                face = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+                normals = np.repeat(face[:, None, :], 3, axis=1)
+            if "TEXCOORD_0" in attributes:
+                uvs = read_accessor(gltf, binary, attributes["TEXCOORD_0"])[:, :2][indices]
+            else:
+                uvs = np.zeros((len(indices), 3, 2), dtype=np.float32)
+
+            parts["positions"].append(triangles)
+            parts["normals"].append(normals)
+            parts["uvs"].append(uvs)
+            parts["materials"].append(np.full(len(indices), primitive.get("material", default_material)))
+
+    if not parts["positions"]:
+        raise ValueError(f"No triangle meshes in {path}")
+    return (np.concatenate(parts["positions"]), np.concatenate(parts["normals"]),
+            np.concatenate(parts["uvs"]), np.concatenate(parts["materials"]), materials)
+
+def _camera(positions, width, height):
+    """View-projection matrix framing the scene's bounding sphere."""
+    import numpy as np
+
+    points = positions.reshape(-1, 3)
+    center = (points.min(axis=0) + points.max(axis=0)) / 2
+    radius = np.linalg.norm(points - center, axis=1).max() or 1.0
+    fov = math.radians(FOV_DEGREES)
+    direction = np.array(VIEW_DIRECTION) / np.linalg.norm(VIEW_DIRECTION)
+    distance = radius / math.sin(fov / 2) * 1.05
+    eye = center + direction * distance
+
+    forward = (center - eye) / np.linalg.norm(center - eye)
+    right = np.cross(forward, (0, 1, 0))
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    view = np.eye(4)
+    view[0, :3], view[1, :3], view[2, :3] = right, up, -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+
+    near, far = max(distance - radius * 1.5, 1e-3), distance + radius * 1.5
+    f = 1 / math.tan(fov / 2)
+    projection = np.zeros((4, 4))
+    projection[0, 0] = f * height / width
+    projection[1, 1] = f
+    projection[2, 2] = (far + near) / (near - far)
+    projection[2, 3] = 2 * far * near / (near - far)
+    projection[3, 2] = -1
+    return projection @ view
+
+def _fragments(tri, px, py, sx, sy, inv_area):
+    """Barycentric coverage test for candidate (triangle, pixel) pairs. Returns inside-only arrays."""
+    import numpy as np
+
+    cx, cy = px + 0.5, py + 0.5
+    x0, x1, x2 = sx[tri, 0], sx[tri, 1], sx[tri, 2]
+    y0, y1, y2 = sy[tri, 0], sy[tri, 1], sy[tri, 2]
+    b0 = ((x1 - cx) * (y2 - cy) - (x2 - cx) * (y1 - cy)) * inv_area[tri]
+    b1 = ((x2 - cx) * (y0 - cy) - (x0 - cx) * (y2 - cy)) * inv_area[tri]
+    b2 = 1 - b0 - b1
+    inside = (b0 >= -1e-6) & (b1 >= -1e-6) & (b2 >= -1e-6)
+    return tri[inside], px[inside], py[inside], np.stack((b0[inside], b1[inside], b2[inside]), axis=1)
+
+def render(path, size=DEFAULT_SIZE):
+    """Render a GLB to a size x size PIL image."""
+    import numpy as np
+    from PIL import Image
+
+    positions, normals, uvs, material_ids, materials = load_scene(path)
+    width = height = size * SUPERSAMPLE
+
+    # Triangle setup for all triangles at once
+    clip = np.concatenate((positions, np.ones(positions.shape[:2] + (1,))), axis=2) @ _camera(positions, width, height).T
+    w = clip[..., 3]
+    keep = (w > 1e-6).all(axis=1)
+    ndc = clip[..., :3] / w[..., None]
+    sx = (ndc[..., 0] + 1) * 0.5 * width
+    sy = (1 - ndc[..., 1]) * 0.5 * height
+    area = (sx[:, 1] - sx[:, 0]) * (sy[:, 2] - sy[:, 0]) - (sx[:, 2] - sx[:, 0]) * (sy[:, 1] - sy[:, 0])
+    keep &= np.abs(area) > 1e-9
+    inv_area = np.where(keep, 1 / np.where(keep, area, 1), 0)
+
+    x_min = np.clip(np.ceil(sx.min(axis=1) - 0.5), 0, width).astype(np.int64)
+    x_max = np.clip(np.floor(sx.max(axis=1) - 0.5), -1, width - 1).astype(np.int64)
+    y_min = np.clip(np.ceil(sy.min(axis=1) - 0.5), 0, height).astype(np.int64)
+    y_max = np.clip(np.floor(sy.max(axis=1) - 0.5), -1, height - 1).astype(np.int64)
+    extent = np.maximum(x_max - x_min, y_max - y_min) + 1
+    keep &= (x_max >= x_min) & (y_max >= y_min)
+
+    # Rasterize bucket by bucket: each bucket tests a fixed k x k block of candidate pixels per triangle
+    pieces = []
+    remaining = keep.copy()
+    for k in BBOX_BUCKETS:
+        bucket = np.nonzero(remaining & (extent <= k))[0]
+        remaining[bucket] = False
+        offsets_y, offsets_x = np.divmod(np.arange(k * k), k)
+        step = max(1, CHUNK_FRAGMENTS // (k * k))
+        for start in range(0, len(bucket), step):
+            tri = np.repeat(bucket[start:start + step], k * k)
+            px = x_min[tri] + np.tile(offsets_x, len(tri) // (k * k))
+            py = y_min[tri] + np.tile(offsets_y, len(tri) // (k * k))
+            valid = (px <= x_max[tri]) & (py <= y_max[tri])
+            pieces.append(_fragments(tri[valid], px[valid], py[valid], sx, sy, inv_area))
+    for index in np.nonzero(remaining)[0]:
+        ys, xs = np.mgrid[y_min[index]:y_max[index] + 1, x_min[index]:x_max[index] + 1]
+        pieces.append(_fragments(np.full(xs.size, index), xs.ravel(), ys.ravel(), sx, sy, inv_area))
+    if not pieces:
+        # Every triangle was culled (behind the camera, degenerate or off-screen): only the background shows
+        return Image.new("RGB", (size, size), tuple(BACKGROUND))
+
+    tri = np.concatenate([piece[0] for piece in pieces])
+    px = np.concatenate([piece[1] for piece in pieces])
+    py = np.concatenate([piece[2] for piece in pieces])
+    bary = np.concatenate([piece[3] for piece in pieces])
+
+    # Z-buffer: keep the nearest fragment per pixel
+    depth = (bary * ndc[tri, :, 2]).sum(axis=1)
+    pixel = py * width + px
+    order = np.lexsort((depth, pixel))
+    _, first = np.unique(pixel[order], return_index=True)
+    winner = order[first]
+    tri, pixel, bary = tri[winner], pixel[winner], bary[winner]
+
+    # Perspective-correct attribute interpolation
+    weights = bary / w[tri]
+    weights /= weights.sum(axis=1, keepdims=True)
+    normal = (weights[..., None] * normals[tri]).sum(axis=1)
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True) + 1e-12
+    uv = (weights[..., None] * uvs[tri]).sum(axis=1)
+
+    # Shade: base color (texture * factor) with ambient + two-sided Lambert key light
+    color = np.empty((len(tri), 3), dtype=np.float32)
+    for material_id in np.unique(material_ids[tri]):
+        selected = material_ids[tri] == material_id
+        base_color, texture = materials[material_id]
+        if texture is None:
+            color[selected] = base_color
+        else:
+            tex_height, tex_width = texture.shape[:2]
+            u = np.mod(uv[selected, 0], 1.0) * (tex_width - 1)
+            v = np.mod(uv[selected, 1], 1.0) * (tex_height - 1)
+            color[selected] = texture[np.round(v).astype(np.int64), np.round(u).astype(np.int64)] * base_color
+    light = np.array(LIGHT_DIRECTION) / np.linalg.norm(LIGHT_DIRECTION)
+    lambert = np.abs(normal @ light)
+    color *= (AMBIENT + DIFFUSE * lambert)[:, None]
+
+    frame = np.empty((height * width, 3), dtype=np.float32)
+    frame[:] = np.array(BACKGROUND, dtype=np.float32) / 255.0
+    frame[pixel] = np.clip(color, 0, 1)
+    image = Image.fromarray((frame.reshape(height, width, 3) * 255 + 0.5).astype(np.uint8), "RGB")
+    return image.resize((size, size), Image.LANCZOS)
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, streamed."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def render_thumbnail_cached(glb_path, cache_dir, size=DEFAULT_SIZE):
+    """Render (or reuse) the thumbnail for a GLB. Returns the cached PNG's file name."""
+    name = f"{file_hash(glb_path)[:16]}-{size}.png"
+    output_path = os.path.join(cache_dir, name)
+    if not os.path.exists(output_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        render(glb_path, size).save(tmp_path, "PNG", optimize=True)
+        os.replace(tmp_path, output_path)
+    return name
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Render a PNG thumbnail of a GLB file on the CPU")
+    parser.add_argument("glb", help="Path to the GLB file")
+    parser.add_argument("-o", "--output", help="Output PNG (default: next to the GLB)")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="Thumbnail size in pixels")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    import time
+
+    args = parse_arguments()
+    output = args.output or os.path.splitext(args.glb)[0] + "_thumb.png"
+    start = time.perf_counter()
+    render(args.glb, args.size).save(output, "PNG", optimize=True)
+    print(f"[INFO] Thumbnail saved to: {output} ({time.perf_counter() - start:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the image post-processing pool.
+
+Processes several large synthetic labels either inline or through the
+process pool while a background thread plays the role of the HTTP/socket
+threads, and reports how late that thread's 10 ms ticks ran.
+"""
+
+import os
+import sys
+import io
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../web_app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../scripts'))
+
+def make_test_image(width, height):
+    """Encode a noisy RGB test image so PNG encoding does real work."""
+    from PIL import Image
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+def measure_tick_lag(stop, lags, tick=0.01):
+    """Record how late a periodic tick fires while image work runs."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(tick)
+        lags.append(time.perf_counter() - start - tick)
+
+def run(label, process, images, size):
+    """Process all images on worker threads and report tick lag."""
+    stop = threading.Event()
+    lags = []
+    ticker = threading.Thread(target=measure_tick_lag, args=(stop, lags))
+    ticker.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=process, args=(data, size)) for data in images]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    ticker.join()
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if lags_ms else 0.0
+    print(f"{label:>8}: {elapsed:.2f}s total, tick lag median {statistics.median(lags_ms):.1f} ms, "
+          f"p99 {p99:.1f} ms, max {lags_ms[-1]:.1f} ms")
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare inline and pooled image post-processing")
+    parser.add_argument("--images", type=int, default=4, help="Number of labels to process concurrently")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: cores - 1, max 4)")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    from generate_image_with_dalle import process_image_bytes
+    from image_pool import ImageProcessingPool
+
+    print("=== Image Post-processing Pool Benchmark ===")
+    images = [make_test_image(1024, 1024) for _ in range(args.images)]
+
+    run("inline", process_image_bytes, images, "1024x1024")
+
+    pool = ImageProcessingPool(max_workers=args.workers)
+    print(f"[INFO] Pre-forked workers: {pool.prefork()}")
+    run("pool", pool.process, images, "1024x1024")
+    pool.shutdown()
+
+if __name__ == "__main__":
+    main()
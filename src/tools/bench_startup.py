@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the pipeline entry points.
+
+Measures cold-start wall time and the `-X importtime` breakdown of each
+entry point, and exits non-zero when a median exceeds its budget so it can
+gate changes that pull heavy imports back onto the startup path.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+import json
+import argparse
+import statistics
+
+# --- CONFIG ---
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+ENTRY_POINTS = {
+    "web_app": os.path.join(ROOT_DIR, 'src/web_app/web_app.py'),
+    "run_pipeline": os.path.join(ROOT_DIR, 'src/pipeline/run_pipeline.py'),
+    "generate_image_with_dalle": os.path.join(ROOT_DIR, 'scripts/generate_image_with_dalle.py'),
+}
+# Startup budgets in milliseconds (median wall time, interpreter included)
+DEFAULT_BUDGETS_MS = {
+    "web_app": 600,
+    "run_pipeline": 150,
+    "generate_image_with_dalle": 150,
+}
+
+# Loads the entry point as a module (not __main__) so only import cost is measured
+LOADER = (
+    "import importlib.util, sys; "
+    "sys.path.insert(0, sys.argv[2]); "
+    "spec = importlib.util.spec_from_file_location(sys.argv[1], sys.argv[3]); "
+    "module = importlib.util.module_from_spec(spec); "
+    "spec.loader.exec_module(module)"
+)
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def spawn(name, path, importtime=False):
+    """Start a fresh interpreter that imports one entry point and return (seconds, stderr)."""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", LOADER, f"bench_{name}", os.path.dirname(path), path]
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, cwd=ROOT_DIR)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return elapsed, result.stderr
+
+def parse_importtime(stderr, top=10):
+    """Return the top-level imports with the highest cumulative time, in microseconds."""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        # Only direct imports of the entry point (indent of one level)
+        if len(indent) <= 1:
+            entries.append({"module": module, "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    entries.sort(key=lambda entry: entry["cumulative_us"], reverse=True)
+    return entries[:top]
+
+def bench_entry_point(name, path, runs):
+    """Benchmark one entry point and return its result dict."""
+    # Warm the OS file cache so the first sample is not an outlier
+    spawn(name, path)
+    samples = [spawn(name, path)[0] for _ in range(runs)]
+    _, stderr = spawn(name, path, importtime=True)
+    return {
+        "name": name,
+        "path": path,
+        "runs": runs,
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "top_imports": parse_importtime(stderr),
+    }
+
+def bench_interpreter(runs):
+    """Median wall time of a bare interpreter start, for reference."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Measure startup time of the pipeline entry points")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per entry point")
+    parser.add_argument("--only", choices=sorted(ENTRY_POINTS), action="append", help="Benchmark only these entry points")
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=MS", help="Override a startup budget")
+    parser.add_argument("--json", type=str, help="Write results to this JSON file")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for override in args.budget:
+        name, _, value = override.partition("=")
+        budgets[name] = float(value)
+
+    print("=== Entry Point Startup Benchmark ===")
+    baseline_ms = bench_interpreter(args.runs)
+    print(f"[INFO] Bare interpreter: {baseline_ms:.1f} ms")
+
+    results = []
+    failures = []
+    for name in args.only or sorted(ENTRY_POINTS):
+        path = ENTRY_POINTS[name]
+        try:
+            result = bench_entry_point(name, path, args.runs)
+        except RuntimeError as e:
+            print(f"\n[ERROR] {name}: could not import ({e})")
+            failures.append(name)
+            continue
+
+        budget = budgets.get(name)
+        result["budget_ms"] = budget
+        result["within_budget"] = budget is None or result["median_ms"] <= budget
+        results.append(result)
+
+        print(f"\n--- {name} ---")
+        print(f"  median {result['median_ms']:.1f} ms (min {result['min_ms']:.1f}, max {result['max_ms']:.1f}), budget {budget} ms")
+        for entry in result["top_imports"]:
+            print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+        if not result["within_budget"]:
+            print(f"[ERROR] {name} startup exceeds budget")
+            failures.append(name)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"interpreter_ms": baseline_ms, "results": results}, f, indent=2)
+        print(f"\n[INFO] Results written to {args.json}")
+
+    if failures:
+        print(f"\n[ERROR] Startup budget check failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n[SUCCESS] All entry points within budget")
+
+if __name__ == "__main__":
+    main()
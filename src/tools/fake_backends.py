@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the pipeline's external backends, for load testing.
+
+    python fake_backends.py image-api --port 5055 --latency 2.0
+        Serves POST /v1/images/generations like the OpenAI Images API (point
+        the client at it with OPENAI_BASE_URL) and the generated PNGs, with a
+        configurable latency and error rate.
+
+    python fake_backends.py blender <blend> --background --python <script> -- <image> <output.glb> [<preview.glb>]
+        Accepts Blender's command line, sleeps FAKE_BLENDER_SECONDS and writes
+        a small but valid GLB whose Material.002 embeds the label image, so
+        inspection, split delivery and thumbnails run on real data. Given a
+        preview path, a GLB with a downscaled label is written there after a
+        quarter of the time.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../pipeline'))
+
+PALETTE_SIZE = 16
+
+class _ImageAPIHandler(BaseHTTPRequestHandler):
+    # Set by serve_image_api()
+    latency = 2.0
+    error_rate = 0.0
+    image_size = (1792, 1024)
+    _images = {}
+    _images_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        # Jitter around the mean, like a real API
+        time.sleep(max(0.0, random.uniform(0.75, 1.25) * self.latency))
+        if self.path.rstrip("/") != "/v1/images/generations":
+            self._send(404, b'{"error": {"message": "Not found"}}', "application/json")
+            return
+        if random.random() < self.error_rate:
+            self._send(500, b'{"error": {"message": "Injected failure", "type": "server_error"}}',
+                       "application/json")
+            return
+        color = int(hashlib.sha256(request.get("prompt", "").encode()).hexdigest(), 16) % PALETTE_SIZE
+        host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+        body = json.dumps({"created": int(time.time()),
+                           "data": [{"url": f"http://{host}/images/{color}.png",
+                                     "revised_prompt": request.get("prompt")}]}).encode()
+        self._send(200, body, "application/json")
+
+    def do_GET(self):
+        name = os.path.basename(self.path)
+        if not (self.path.startswith("/images/") and name.endswith(".png") and name[:-4].isdigit()):
+            self._send(404, b"Not found", "text/plain")
+            return
+        self._send(200, self._image(int(name[:-4]) % PALETTE_SIZE), "image/png")
+
+    @classmethod
+    def _image(cls, color):
+        with cls._images_lock:
+            if color not in cls._images:
+                from PIL import Image, ImageDraw
+                hue = color / PALETTE_SIZE
+                rgb = tuple(int(255 * (0.5 + 0.5 * math.sin(6.283 * (hue + shift))))
+                            for shift in (0, 1 / 3, 2 / 3))
+                image = Image.new("RGB", cls.image_size, rgb)
+                ImageDraw.Draw(image).rectangle((cls.image_size[0] // 4, cls.image_size[1] // 3,
+                                                 cls.image_size[0] * 3 // 4, cls.image_size[1] * 2 // 3),
+                                                fill=(255, 255, 255))
+                output = io.BytesIO()
+                image.save(output, "PNG")
+                cls._images[color] = output.getvalue()
+            return cls._images[color]
+
+def serve_image_api(port=0, latency=2.0, error_rate=0.0, host="127.0.0.1"):
+    """Start the fake image API on a background thread. Returns the server (server_port is the bound port)."""
+    handler = type("ImageAPIHandler", (_ImageAPIHandler,), {"latency": latency, "error_rate": error_rate})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def build_label_glb(image_bytes, mime_type="image/png"):
+    """A textured quad using Material.002, shaped like the exporter's output."""
+    from glb_utils import build_glb
+
+    positions = struct.pack("<12f", -1, -0.5, 0, 1, -0.5, 0, 1, 0.5, 0, -1, 0.5, 0)
+    normals = struct.pack("<12f", *(0, 0, 1) * 4)
+    uvs = struct.pack("<8f", 0, 1, 1, 1, 1, 0, 0, 0)
+    indices = struct.pack("<6H", 0, 1, 2, 0, 2, 3)
+    binary, views = b"", []
+    for data in (positions, normals, uvs, indices, image_bytes):
+        binary += b"\x00" * (-len(binary) % 4)
+        views.append({"buffer": 0, "byteOffset": len(binary), "byteLength": len(data)})
+        binary += data
+    gltf = {
+        "asset": {"version": "2.0", "generator": "fake_backends.py"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": "Label"}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1, "TEXCOORD_0": 2},
+                                    "indices": 3, "material": 0}]}],
+        "materials": [{"name": "Material.002", "pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}}],
+        "textures": [{"source": 0}],
+        "images": [{"bufferView": 4, "mimeType": mime_type}],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": 4, "type": "VEC3",
+             "min": [-1, -0.5, 0], "max": [1, 0.5, 0]},
+            {"bufferView": 1, "componentType": 5126, "count": 4, "type": "VEC3"},
+            {"bufferView": 2, "componentType": 5126, "count": 4, "type": "VEC2"},
+            {"bufferView": 3, "componentType": 5123, "count": 6, "type": "SCALAR"},
+        ],
+        "bufferViews": views,
+        "buffers": [{"byteLength": len(binary)}],
+    }
+    return build_glb(gltf, binary)
+
+def fake_blender(argv):
+    """Behave like `blender ... -- <image> <output.glb>`."""
+    if argv[:1] == ["--version"]:
+        print("Blender 4.4.0 (fake_backends.py)")
+        return 0
+    if "--" not in argv or len(argv) < argv.index("--") + 3:
+        print("[ERROR] Expected: -- <image> <output.glb>")
+        return 1
+    image_path, output_path = argv[argv.index("--") + 1:argv.index("--") + 3]
+    preview_path = argv[argv.index("--") + 3] if len(argv) > argv.index("--") + 3 else None
+    seconds = float(os.environ.get("FAKE_BLENDER_SECONDS", "3.0"))
+    if preview_path:
+        from PIL import Image
+
+        time.sleep(seconds / 4)
+        seconds -= seconds / 4
+        with Image.open(image_path) as image:
+            image.thumbnail((512, 512))
+            preview = io.BytesIO()
+            image.convert("RGB").save(preview, "JPEG", quality=80)
+        with open(f"{preview_path}.tmp", "wb") as f:
+            f.write(build_label_glb(preview.getvalue(), "image/jpeg"))
+        os.replace(f"{preview_path}.tmp", preview_path)
+    time.sleep(seconds)
+    with open(image_path, "rb") as f:
+        glb = build_label_glb(f.read())
+    with open(output_path, "wb") as f:
+        f.write(glb)
+    print(f"[INFO] Fake export written to: {output_path}")
+    return 0
+
+def main():
+    """Main function."""
+    if len(sys.argv) > 1 and sys.argv[1] == "blender":
+        sys.exit(fake_blender(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description="Fake backends for load testing")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    image_api = subparsers.add_parser("image-api", help="Serve a fake OpenAI Images API")
+    image_api.add_argument("--port", type=int, default=5055)
+    image_api.add_argument("--latency", type=float, default=2.0, help="Mean seconds per generation")
+    image_api.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    subparsers.add_parser("blender", help="Stand in for the Blender executable")
+    args = parser.parse_args()
+
+    server = serve_image_api(args.port, args.latency, args.error_rate)
+    print(f"[INFO] Fake image API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
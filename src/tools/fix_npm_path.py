@@ -4,22 +4,17 @@ Script to help fix npm PATH issues on Windows
 """
 
 import os
-import subprocess
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../pipeline'))
+from env_probe import FALLBACK_LOCATIONS, get_probe, search_dirs
+
 def find_npm():
     """Find where npm is installed."""
     print("=== Finding npm installation ===")
     
-    # Common npm locations on Windows
-    possible_paths = [
-        r"C:\Program Files\nodejs\npm.cmd",
-        r"C:\Program Files (x86)\nodejs\npm.cmd",
-        os.path.expanduser(r"~\AppData\Roaming\npm\npm.cmd"),
-        os.path.expanduser(r"~\AppData\Local\Microsoft\WindowsApps\npm.exe"),
-        r"C:\Program Files\nodejs\npm.exe",
-        r"C:\Program Files (x86)\nodejs\npm.exe"
-    ]
+    # Common npm install locations (shared with the web app's dependency checks)
+    possible_paths = FALLBACK_LOCATIONS["npm"]
     
     found_paths = []
     for path in possible_paths:
@@ -35,13 +30,11 @@ def check_path():
     """Check current PATH for npm."""
     print("\n=== Checking PATH ===")
     
-    path_dirs = os.environ.get('PATH', '').split(os.pathsep)
+    npm_names = ['npm.cmd', 'npm.exe'] if os.name == 'nt' else ['npm']
     
     npm_in_path = False
-    for directory in path_dirs:
-        npm_path = os.path.join(directory, 'npm.cmd')
-        npm_exe = os.path.join(directory, 'npm.exe')
-        if os.path.exists(npm_path) or os.path.exists(npm_exe):
+    for directory in search_dirs():
+        if any(os.path.exists(os.path.join(directory, name)) for name in npm_names):
             print(f"✓ npm found in PATH: {directory}")
             npm_in_path = True
     
@@ -54,13 +47,12 @@ def test_npm_commands():
     """Test npm commands."""
     print("\n=== Testing npm commands ===")
     
-    try:
-        result = subprocess.run(["npm", "--version"], capture_output=True, text=True, check=True)
-        print(f"✓ npm --version works: {result.stdout.strip()}")
+    npm = get_probe().tool("npm")
+    if npm.ok:
+        print(f"✓ npm --version works: {npm.version} ({npm.path})")
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("✗ npm --version failed")
-        return False
+    print(f"✗ npm --version failed: {npm.detail}")
+    return False
 
 def suggest_fix():
     """Suggest how to fix the PATH issue."""
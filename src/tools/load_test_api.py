@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Load generator for the web app's HTTP and Socket.IO API.
+
+Starts the web app against local fake backends (see fake_backends.py) unless
+--url points at a running one, then simulates users arriving as a Poisson
+process: each connects a Socket.IO client, POSTs /api/generate, subscribes
+to its job and waits for it to finish, while pollers hit /api/status.
+Prompts are a mix of repeats from a small pool and unique ones. Reports
+throughput, queueing delay, end-to-end latency percentiles and error rates,
+and saves everything as JSON; --compare prints the change against an
+earlier run.
+
+Requires aiohttp and python-socketio[asyncio_client] in addition to the app's own dependencies.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import argparse
+import shutil
+import tempfile
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_APP_DIR = os.path.join(TOOLS_DIR, '../web_app')
+REPO_ROOT = os.path.join(TOOLS_DIR, '../..')
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test the web app's HTTP and Socket.IO API")
+    parser.add_argument("--url", help="Test a running web app instead of starting one with fake backends")
+    parser.add_argument("--rate", type=float, default=1.0, help="New users (jobs) per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds during which users arrive")
+    parser.add_argument("--repeat-fraction", type=float, default=0.5,
+                        help="Fraction of prompts drawn from a small pool of repeated prompts")
+    parser.add_argument("--repeat-pool", type=int, default=5, help="Number of distinct repeated prompts")
+    parser.add_argument("--status-rate", type=float, default=5.0, help="GET /api/status requests per second")
+    parser.add_argument("--job-timeout", type=float, default=300.0, help="Seconds to wait for a job to finish")
+    parser.add_argument("--image-latency", type=float, default=2.0, help="Fake image API mean latency (s)")
+    parser.add_argument("--image-error-rate", type=float, default=0.0, help="Fake image API failure fraction")
+    parser.add_argument("--blender-seconds", type=float, default=3.0, help="Fake Blender export time (s)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for arrivals and prompt mix")
+    parser.add_argument("--output", help="Results JSON (default: load_test_api_<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="Keep the scratch directory (job files, published outputs) for debugging")
+    parser.add_argument("--serve-app", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_blender_shim(workdir):
+    """An executable that forwards Blender's command line to fake_backends.py."""
+    fake = os.path.join(TOOLS_DIR, 'fake_backends.py')
+    if os.name == 'nt':
+        path = os.path.join(workdir, 'blender.cmd')
+        with open(path, 'w') as f:
+            f.write(f'@"{sys.executable}" "{fake}" blender %*\r\n')
+    else:
+        path = os.path.join(workdir, 'blender')
+        with open(path, 'w') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{fake}" blender "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+def serve_app(port):
+    """Run the web app with its outputs in a scratch directory and the fake Blender (subprocess mode)."""
+    sys.path.insert(0, WEB_APP_DIR)
+    import web_app
+
+    workdir = os.environ['LOAD_TEST_WORKDIR']
+    web_app.DEBUG = False
+    web_app.LAUNCH_VIEWER = False
+    web_app.JOBS_DIR = os.path.join(workdir, 'jobs')
+    web_app.IMAGE_PATH = os.path.join(workdir, 'images', 'image.png')
+    web_app.GLB_OUTPUT_PATH = os.path.join(workdir, 'models', 'exported_label.glb')
+    web_app.THUMBNAILS_DIR = os.path.join(workdir, 'thumbnails')
+    web_app.RESULT_CACHE_DIR = os.path.join(workdir, 'result_cache')
+    web_app.PROMPT_INDEX_PATH = os.path.join(workdir, 'prompt_index.jsonl')
+    web_app.EXPORT_INDEX_DIR = os.path.join(workdir, 'export_index')
+    for path in (web_app.JOBS_DIR, os.path.dirname(web_app.IMAGE_PATH), os.path.dirname(web_app.GLB_OUTPUT_PATH)):
+        os.makedirs(path, exist_ok=True)
+    web_app.BLENDER_EXE = write_blender_shim(workdir)
+    web_app.get_image_pool().prefork()
+    web_app.get_socketio().run(web_app.app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True)
+
+def start_backends(args, workdir):
+    """Start the fake image API and the web app. Returns (base_url, processes)."""
+    api_port, app_port = free_port(), free_port()
+    image_api = subprocess.Popen([
+        sys.executable, os.path.join(TOOLS_DIR, 'fake_backends.py'), 'image-api', '--port', str(api_port),
+        '--latency', str(args.image_latency), '--error-rate', str(args.image_error_rate)
+    ])
+    env = dict(os.environ,
+               OPENAI_BASE_URL=f"http://127.0.0.1:{api_port}/v1",
+               OPENAI_API_KEY="load-test",
+               FAKE_BLENDER_SECONDS=str(args.blender_seconds),
+               LOAD_TEST_WORKDIR=workdir)
+    app = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-app', str(app_port)],
+                           env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return f"http://127.0.0.1:{app_port}", [image_api, app]
+
+async def wait_until_up(session, base_url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/status") as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Web app at {base_url} did not come up within {timeout:.0f}s")
+
+async def run_user(session, base_url, prompt, kind, args, records):
+    """One user: connect, submit a job, follow it over Socket.IO until it finishes."""
+    import socketio
+
+    loop = asyncio.get_running_loop()
+    record = {'kind': kind, 'error': None, 'stage': 'connect'}
+    records.append(record)
+    state = {}
+    finished = asyncio.Event()
+    job = {'id': None, 'seq': 0}
+    client = socketio.AsyncClient(reconnection=False)
+
+    def apply(changes):
+        state.update(changes)
+        if 'first_progress' not in record and state.get('progress', 0) > 0:
+            record['first_progress'] = loop.time() - record['t0']
+        if state.get('is_running') is False:
+            finished.set()
+
+    @client.on('job_snapshot')
+    def on_snapshot(data):
+        if data.get('job_id') == job['id']:
+            job['seq'] = data['seq']
+            apply(data['state'])
+
+    @client.on('job_update')
+    def on_update(data):
+        if data.get('job_id') == job['id'] and data['seq'] > job['seq']:
+            if data['base_seq'] != job['seq']:
+                record['seq_gaps'] = record.get('seq_gaps', 0) + 1
+            job['seq'] = data['seq']
+            apply(data['delta'])
+
+    session_id = uuid.uuid4().hex
+    try:
+        await client.connect(base_url, auth={'session_id': session_id}, transports=['websocket'], wait_timeout=10)
+        record['stage'] = 'generate'
+        record['t0'] = loop.time()
+        async with session.post(f"{base_url}/api/generate",
+                                json={'prompt': prompt, 'session_id': session_id}) as response:
+            record['generate_request'] = loop.time() - record['t0']
+            body = await response.json(content_type=None)
+            if response.status != 200:
+                record['error'] = f"HTTP {response.status}: {body.get('error')}"
+                return
+        job['id'] = body['job_id']
+        record['stage'] = 'job'
+        await client.emit('subscribe', {'job_id': job['id']})
+        await asyncio.wait_for(finished.wait(), timeout=args.job_timeout)
+        record['end_to_end'] = loop.time() - record['t0']
+        record['queue_wait'] = state.get('queue_wait')
+        if state.get('error'):
+            record['error'] = f"Job error: {state['error']}"
+        elif state.get('cancelled'):
+            record['error'] = "Job cancelled"
+    except asyncio.TimeoutError:
+        record['error'] = f"Timed out after {args.job_timeout:g}s"
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        record['finished_at'] = loop.time()
+        if client.connected:
+            await client.disconnect()
+
+async def poll_status(session, base_url, rate, stop, latencies, errors):
+    """Hit /api/status at a fixed rate without waiting for earlier requests."""
+    async def one():
+        start = time.perf_counter()
+        try:
+            async with session.get(f"{base_url}/api/status") as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    return
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+
+    tasks = []
+    while not stop.is_set() and rate > 0:
+        tasks.append(asyncio.create_task(one()))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0 / rate)
+        except asyncio.TimeoutError:
+            pass
+    await asyncio.gather(*tasks)
+
+def percentiles(values):
+    """count/mean/p50/p95/p99/max of a list of seconds (nearest rank)."""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return {'count': 0}
+    def rank(p):
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))]
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4),
+        'p50': round(rank(50), 4),
+        'p95': round(rank(95), 4),
+        'p99': round(rank(99), 4),
+        'max': round(values[-1], 4),
+    }
+
+async def run_load(args, base_url):
+    """Drive the app and return the results dict."""
+    import aiohttp
+
+    rng = random.Random(args.seed)
+    pool = [f"Load test label {index}: bold golf text" for index in range(args.repeat_pool)]
+    records, status_latencies, status_errors = [], [], []
+    stop_polling = asyncio.Event()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        await wait_until_up(session, base_url)
+        poller = asyncio.create_task(
+            poll_status(session, base_url, args.status_rate, stop_polling, status_latencies, status_errors))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        users = []
+        arrival = rng.expovariate(args.rate)
+        while arrival < args.duration:
+            await asyncio.sleep(max(0.0, start + arrival - loop.time()))
+            if rng.random() < args.repeat_fraction:
+                prompt, kind = rng.choice(pool), 'repeat'
+            else:
+                prompt, kind = f"Unique label {uuid.uuid4().hex[:8]}", 'unique'
+            users.append(asyncio.create_task(run_user(session, base_url, prompt, kind, args, records)))
+            arrival += rng.expovariate(args.rate)
+        print(f"[INFO] {len(users)} users started; waiting for their jobs")
+        await asyncio.gather(*users)
+        stop_polling.set()
+        await poller
+        elapsed = loop.time() - start
+        try:
+            async with session.get(f"{base_url}/api/admission") as response:
+                admission = await response.json(content_type=None)
+        except Exception:
+            admission = None
+
+    completed = [record for record in records if record['error'] is None and 'end_to_end' in record]
+    errors = {}
+    for record in records:
+        if record['error']:
+            key = record['error'].split(':')[0]
+            errors[key] = errors.get(key, 0) + 1
+    first_submit = min((record['t0'] for record in records if 't0' in record), default=0)
+    last_finish = max((record['finished_at'] for record in completed), default=first_submit)
+    busy = last_finish - first_submit
+    return {
+        'users': len(records),
+        'completed': len(completed),
+        'failed': len(records) - len(completed),
+        'error_rate': round((len(records) - len(completed)) / len(records), 4) if records else 0.0,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_jobs_per_second': round(len(completed) / busy, 4) if busy > 0 else 0.0,
+        'latency_seconds': {
+            'end_to_end': percentiles(record['end_to_end'] for record in completed),
+            'queue_wait': percentiles(record.get('queue_wait') for record in completed),
+            'first_progress': percentiles(record.get('first_progress') for record in completed),
+            'generate_request': percentiles(record.get('generate_request') for record in records),
+            'status_request': percentiles(status_latencies),
+        },
+        'end_to_end_by_prompt_kind': {
+            kind: percentiles(record['end_to_end'] for record in completed if record['kind'] == kind)
+            for kind in ('repeat', 'unique')
+        },
+        'status_requests': len(status_latencies) + len(status_errors),
+        'status_error_rate': round(len(status_errors) / (len(status_latencies) + len(status_errors)), 4)
+        if status_latencies or status_errors else 0.0,
+        'sequence_gaps': sum(record.get('seq_gaps', 0) for record in records),
+        'admission': admission,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_results(results):
+    print("\n=== Results ===")
+    print(f"Users: {results['users']}  completed: {results['completed']}  "
+          f"error rate: {results['error_rate']:.1%}  throughput: {results['throughput_jobs_per_second']:.3f} jobs/s")
+    for name, stats in results['latency_seconds'].items():
+        if stats['count']:
+            print(f"  {name:<17} p50 {stats['p50']:8.3f}s  p95 {stats['p95']:8.3f}s  "
+                  f"p99 {stats['p99']:8.3f}s  (n={stats['count']})")
+    for error, count in results['errors'].items():
+        print(f"  error: {error} x{count}")
+
+def compare(previous, current):
+    """Print key metrics side by side with an earlier run."""
+    rows = [('throughput_jobs_per_second', previous['results']['throughput_jobs_per_second'],
+             current['results']['throughput_jobs_per_second']),
+            ('error_rate', previous['results']['error_rate'], current['results']['error_rate'])]
+    for name in ('end_to_end', 'queue_wait', 'generate_request', 'status_request'):
+        for p in ('p50', 'p95', 'p99'):
+            rows.append((f"{name}.{p}", previous['results']['latency_seconds'][name].get(p),
+                         current['results']['latency_seconds'][name].get(p)))
+    print(f"\n=== Compared with {previous.get('revision')} ({previous.get('started_at')}) ===")
+    for name, before, after in rows:
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        print(f"  {name:<30} {before:>10.4f} -> {after:>10.4f}  {change}")
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    if args.serve_app:
+        serve_app(args.serve_app)
+        return
+
+    print("=== Web App API Load Test ===")
+    print(f"[INFO] {args.rate:g} users/s for {args.duration:g}s, {args.repeat_fraction:.0%} repeated prompts, "
+          f"{args.status_rate:g} status polls/s")
+    processes = []
+    workdir = tempfile.mkdtemp(prefix='golf_load_')
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            base_url, processes = start_backends(args, workdir)
+            print(f"[INFO] Web app with fake backends at {base_url} (image API {args.image_latency:g}s, "
+                  f"Blender {args.blender_seconds:g}s; scratch dir {workdir})")
+        results = asyncio.run(run_load(args, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_workdir:
+            print(f"[INFO] Scratch directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {key: value for key, value in vars(args).items() if key not in ('serve_app', 'output', 'compare', 'keep_workdir')}
+    report = {'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'revision': git_revision(),
+              'target': args.url or 'fake backends', 'config': config, 'results': results}
+    print_results(results)
+    output = args.output or f"load_test_api_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[INFO] Results saved to: {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
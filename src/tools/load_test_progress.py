@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Load test for Socket.IO progress fan-out.
+
+Connects hundreds of in-process Socket.IO test clients to the web app,
+subscribes them to a handful of job rooms, fires bursts of progress updates
+and checks that every client can rebuild each job's final state from the
+deltas it received. Reports emits and payload bytes against what the old
+broadcast-everything scheme would have sent.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../web_app'))
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test Socket.IO job progress fan-out")
+    parser.add_argument("--clients", type=int, default=300, help="Number of simulated socket clients")
+    parser.add_argument("--jobs", type=int, default=5, help="Number of concurrent jobs")
+    parser.add_argument("--updates", type=int, default=200, help="Progress updates per job")
+    parser.add_argument("--rate", type=float, default=10.0, help="Max emits per second per room")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between update rounds")
+    return parser.parse_args()
+
+def apply_messages(received, job_id):
+    """Rebuild a job's state from a client's snapshot plus deltas. Returns (state, seq, gaps)."""
+    state, seq, gaps = None, 0, 0
+    for packet in received:
+        data = packet['args'][0]
+        if data.get('job_id') != job_id:
+            continue
+        if packet['name'] == 'job_snapshot':
+            state, seq = dict(data['state']), data['seq']
+        elif packet['name'] == 'job_update' and state is not None and data['seq'] > seq:
+            if data['base_seq'] != seq:
+                gaps += 1
+            state.update(data['delta'])
+            seq = data['seq']
+    return state, seq, gaps
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    import web_app
+    from progress_hub import ProgressHub
+
+    socketio = web_app.get_socketio()
+    web_app.progress_hub = ProgressHub(web_app.progress_hub._emit, max_rate_hz=args.rate)
+
+    print("=== Socket.IO Progress Fan-out Load Test ===")
+    print(f"[INFO] {args.clients} clients, {args.jobs} jobs, {args.updates} updates per job, {args.rate} emits/s per room")
+
+    job_ids = [web_app.create_job(f"load test prompt {i}") for i in range(args.jobs)]
+    clients = []
+    start = time.perf_counter()
+    for i in range(args.clients):
+        client = socketio.test_client(web_app.app)
+        job_id = job_ids[i % args.jobs]
+        client.emit('subscribe', {'job_id': job_id})
+        clients.append((client, job_id))
+    print(f"[INFO] Connected and subscribed in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for step in range(args.updates):
+        for job_id in job_ids:
+            web_app.update_job(job_id, progress=step * 100 // args.updates, current_step=f"Step {step // 20}")
+        time.sleep(args.interval)
+    for job_id in job_ids:
+        web_app.update_job(job_id, urgent=True, progress=100, current_step="Complete", is_running=False)
+    publish_time = time.perf_counter() - start
+
+    failures = 0
+    messages = 0
+    payload_bytes = 0
+    for client, job_id in clients:
+        received = client.get_received()
+        messages += len(received)
+        payload_bytes += sum(len(json.dumps(packet['args'][0])) for packet in received)
+        state, seq, gaps = apply_messages(received, job_id)
+        expected = web_app.progress_hub.snapshot(job_id)
+        if state != expected['state'] or seq != expected['seq'] or gaps:
+            failures += 1
+        client.disconnect()
+
+    state_events = args.jobs * (args.updates + 1)
+    full_payload = len(json.dumps(web_app.progress_hub.snapshot(job_ids[0])['state']))
+    broadcast_bytes = state_events * args.clients * full_payload
+
+    print(f"[INFO] Published {state_events} state changes in {publish_time:.2f}s")
+    print(f"[INFO] Room emits: {web_app.progress_hub.emit_count}")
+    print(f"[INFO] Messages delivered: {messages} ({messages / args.clients:.1f} per client)")
+    print(f"[INFO] Payload delivered: {payload_bytes / 1024:.1f} KB "
+          f"(broadcast of full status would be {broadcast_bytes / 1024:.1f} KB)")
+    if failures:
+        print(f"[ERROR] {failures} clients could not reconstruct their job's final state")
+        sys.exit(1)
+    print("[SUCCESS] All clients converged on the final job state")
+
+if __name__ == "__main__":
+    main()
@@ -9,48 +9,34 @@ import sys
 import time
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../pipeline'))
+from env_probe import get_probe
+
+NPM_PATH = "npm"
+NODE_PATH = "node"
+
 def check_node_installation():
     """Check if Node.js and npm are installed."""
     print("=== Checking Node.js Installation ===")
     
-    try:
-        # Check node version
-        result = subprocess.run(["node", "--version"], capture_output=True, text=True, check=True)
-        print(f"Node.js version: {result.stdout.strip()}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    # Probe both at once: PATH (and TOOL_SEARCH_PATH) first, then common install locations
+    results = get_probe().check(tools={"node": None, "npm": None})
+    node, npm = results["node"], results["npm"]
+    
+    if not node.ok:
         print("ERROR: Node.js not found. Please install Node.js from https://nodejs.org/")
         return False
+    print(f"Node.js version: {node.version} ({node.path})")
     
-    npm_path = None
-    try:
-        # Check npm version
-        result = subprocess.run(["npm", "--version"], capture_output=True, text=True, check=True)
-        print(f"npm version: {result.stdout.strip()}")
-        npm_path = "npm"  # npm is in PATH
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("ERROR: npm not found in PATH. Trying alternative locations...")
-        
-        # Try common npm locations on Windows
-        possible_npm_paths = [
-            r"C:\Program Files\nodejs\npm.cmd",
-            r"C:\Program Files (x86)\nodejs\npm.cmd",
-            os.path.expanduser(r"~\AppData\Roaming\npm\npm.cmd"),
-            os.path.expanduser(r"~\AppData\Local\Microsoft\WindowsApps\npm.exe")
-        ]
-        
-        for path in possible_npm_paths:
-            if os.path.exists(path):
-                print(f"Found npm at: {path}")
-                npm_path = path
-                break
-        
-        if not npm_path:
-            print("ERROR: npm not found. Please ensure npm is installed with Node.js.")
-            return False
+    if not npm.ok:
+        print(f"ERROR: npm not found. Please ensure npm is installed with Node.js. ({npm.detail})")
+        return False
+    print(f"npm version: {npm.version} ({npm.path})")
     
-    # Store npm path globally for use in other functions
-    global NPM_PATH
-    NPM_PATH = npm_path
+    # Store tool paths globally for use in other functions
+    global NPM_PATH, NODE_PATH
+    NPM_PATH = npm.path
+    NODE_PATH = node.path
     return True
 
 def check_web_app_files():
@@ -152,7 +138,7 @@ def test_server_start():
             # Try direct node execution
             print("Trying direct node execution...")
             process = subprocess.Popen(
-                ["node", "server.js"], 
+                [NODE_PATH, "server.js"], 
                 cwd=web_app_dir, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE
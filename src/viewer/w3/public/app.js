@@ -5,6 +5,61 @@ let clock = new THREE.Clock();
 let autoRotate = false;
 let wireframeMode = false;
 
+// Split delivery: geometry stays resident, only the label texture is swapped
+const MANIFEST_URL = '/models/label_manifest.json';
+const LEGACY_MODEL_URL = '/models/exported_label.glb';
+const MANIFEST_POLL_MS = 3000;
+// While a job's preview export is shown, its final export is expected soon
+const PREVIEW_POLL_MS = 1000;
+let labelMaterial = null;
+let currentGeometryUrl = null;
+let currentTextureUrl = null;
+
+// Progressive label texture: the smallest level is shown first and upgraded in
+// place up to the level the viewport needs (manifest.textures, smallest first)
+const TEXELS_PER_PIXEL = 1.2;
+let textureLevels = [];
+let loadedLevel = -1;
+let loadingLevel = -1;
+let pendingTexture = null;
+const loadStart = performance.now();
+
+// On-demand rendering: frames are drawn only when something changed
+let frameScheduled = false;
+let mainLight = null;
+
+// Adaptive quality: step down when frames run over budget, back up when well under
+const FRAME_BUDGET_MS = 1000 / 50;
+const ADAPT_WINDOW_FRAMES = 30;
+const QUALITY_TIERS = [
+    { pixelRatio: Math.min(window.devicePixelRatio, 2), shadowMapSize: 2048 },
+    { pixelRatio: Math.min(window.devicePixelRatio, 1.5), shadowMapSize: 1024 },
+    { pixelRatio: 1, shadowMapSize: 1024 },
+    { pixelRatio: 0.75, shadowMapSize: 512 }
+];
+const UPGRADE_AFTER_WINDOWS = 3;
+let qualityTier = 0;
+let goodWindows = 0;
+let adaptSamples = [];
+let lastFrameTime = null;
+
+// Frame-timing telemetry; set viewerTelemetry.onFrame to receive every frame,
+// or open the viewer with ?stats to show the overlay
+const viewerTelemetry = {
+    frames: 0,
+    lastFrameMs: 0,
+    avgFrameMs: 0,
+    renderMs: 0,
+    qualityTier: 0,
+    pixelRatio: 0,
+    shadowMapSize: 0,
+    textureWidth: 0,
+    firstTextureMs: null,
+    onFrame: null
+};
+window.viewerTelemetry = viewerTelemetry;
+let statsOverlay = null;
+
 // Initialize the 3D scene
 function init() {
     // Create scene
@@ -23,7 +78,7 @@ function init() {
     // Create renderer
     renderer = new THREE.WebGLRenderer({ antialias: true });
     renderer.setSize(window.innerWidth, window.innerHeight);
-    renderer.setPixelRatio(window.devicePixelRatio);
+    renderer.setPixelRatio(QUALITY_TIERS[0].pixelRatio);
     renderer.shadowMap.enabled = true;
     renderer.shadowMap.type = THREE.PCFSoftShadowMap;
     renderer.outputEncoding = THREE.sRGBEncoding;
@@ -41,9 +96,15 @@ function init() {
     controls.minDistance = 1;
     controls.maxDistance = 50;
     controls.maxPolarAngle = Math.PI;
+    controls.addEventListener('change', requestRender);
 
     // Add lighting
     setupLighting();
+    applyQualityTier(0);
+
+    if (new URLSearchParams(window.location.search).has('stats')) {
+        createStatsOverlay();
+    }
 
     // Load the 3D model
     loadModel();
@@ -51,8 +112,8 @@ function init() {
     // Handle window resize
     window.addEventListener('resize', onWindowResize);
 
-    // Start animation loop
-    animate();
+    // Draw the first frame; later frames are requested on demand
+    requestRender();
 }
 
 // Setup lighting for the scene
@@ -63,6 +124,7 @@ function setupLighting() {
 
     // Directional light (main light)
     const directionalLight = new THREE.DirectionalLight(0xffffff, 1);
+    mainLight = directionalLight;
     directionalLight.position.set(10, 10, 5);
     directionalLight.castShadow = true;
     directionalLight.shadow.mapSize.width = 2048;
@@ -85,55 +147,189 @@ function setupLighting() {
     scene.add(hemisphereLight);
 }
 
-// Load the 3D model
+// Load the 3D model: a catalog GLB if one is given (?catalog=<url>), else via
+// the label manifest if published, else the full GLB
 function loadModel() {
+    const catalogUrl = new URLSearchParams(window.location.search).get('catalog');
+    if (catalogUrl) {
+        loadGLB(catalogUrl, null, expandInstances);
+        return;
+    }
+    fetchManifest()
+        .then(function (manifest) {
+            if (manifest) {
+                applyManifest(manifest);
+                schedulePoll(manifest);
+            } else {
+                loadGLB(LEGACY_MODEL_URL);
+            }
+        })
+        .catch(function () {
+            loadGLB(LEGACY_MODEL_URL);
+        });
+}
+
+// Fetch the manifest, revalidating so an unchanged manifest costs a 304
+function fetchManifest() {
+    return fetch(MANIFEST_URL, { cache: 'no-cache' }).then(function (response) {
+        return response.ok ? response.json() : null;
+    });
+}
+
+function schedulePoll(manifest) {
+    const delay = manifest && manifest.stage === 'preview' ? PREVIEW_POLL_MS : MANIFEST_POLL_MS;
+    setTimeout(pollManifest, delay);
+}
+
+function pollManifest() {
+    fetchManifest()
+        .then(function (manifest) {
+            if (manifest) {
+                applyManifest(manifest);
+            }
+            schedulePoll(manifest);
+        })
+        .catch(function (error) {
+            console.warn('Manifest poll failed:', error);
+            schedulePoll(null);
+        });
+}
+
+// Load geometry only when its hash changes; otherwise just swap the texture.
+// The first texture level downloads alongside the geometry.
+function applyManifest(manifest) {
+    const levels = manifest.textures || [{ url: manifest.texture, width: Infinity }];
+    if (manifest.geometry !== currentGeometryUrl) {
+        currentGeometryUrl = manifest.geometry;
+        labelMaterial = null;
+        swapLabelTexture(levels);
+        loadGLB(manifest.geometry, function () {
+            labelMaterial = findMaterial(manifest.material);
+            if (pendingTexture && labelMaterial) {
+                setLabelMap(pendingTexture);
+                pendingTexture = null;
+            }
+        });
+    } else if (manifest.texture !== currentTextureUrl) {
+        swapLabelTexture(levels);
+    }
+}
+
+function findMaterial(name) {
+    let found = null;
+    model.traverse(function (child) {
+        if (!found && child.isMesh && child.material && child.material.name === name) {
+            found = child.material;
+        }
+    });
+    if (!found) {
+        console.warn('Label material not found in geometry: ' + name);
+    }
+    return found;
+}
+
+// Start showing a new label: its smallest level first, then larger ones
+function swapLabelTexture(levels) {
+    currentTextureUrl = levels[levels.length - 1].url;
+    textureLevels = levels;
+    loadedLevel = -1;
+    loadingLevel = -1;
+    if (pendingTexture) {
+        pendingTexture.dispose();
+        pendingTexture = null;
+    }
+    loadNextLevel();
+}
+
+// Largest level worth downloading for the current drawing-buffer width
+function targetLevel() {
+    const needed = renderer.domElement.width * TEXELS_PER_PIXEL;
+    for (let i = 0; i < textureLevels.length; i++) {
+        if (textureLevels[i].width >= needed) {
+            return i;
+        }
+    }
+    return textureLevels.length - 1;
+}
+
+// Fetch the next level up to the target; each one replaces the last as it lands
+function loadNextLevel() {
+    if (loadingLevel !== -1 || loadedLevel >= targetLevel()) return;
+    const level = loadedLevel + 1;
+    const labelUrl = currentTextureUrl;
+    loadingLevel = level;
+    new THREE.TextureLoader().load(
+        textureLevels[level].url,
+        function (texture) {
+            if (labelUrl !== currentTextureUrl) {
+                texture.dispose();
+                return;
+            }
+            loadingLevel = -1;
+            loadedLevel = level;
+            texture.flipY = false;
+            texture.encoding = THREE.sRGBEncoding;
+            if (labelMaterial) {
+                setLabelMap(texture);
+            } else {
+                // Geometry still loading: apply once the label material exists
+                if (pendingTexture) {
+                    pendingTexture.dispose();
+                }
+                pendingTexture = texture;
+            }
+            viewerTelemetry.textureWidth = texture.image.width;
+            console.log('Label texture level ' + level + ' loaded: ' + textureLevels[level].url);
+            loadNextLevel();
+        },
+        undefined,
+        function (error) {
+            if (labelUrl === currentTextureUrl) {
+                loadingLevel = -1;
+            }
+            console.error('Error loading label texture:', error);
+        }
+    );
+}
+
+// Replace the label material's map in place, keeping the glTF texture settings
+function setLabelMap(texture) {
+    const previous = labelMaterial.map;
+    if (previous) {
+        texture.wrapS = previous.wrapS;
+        texture.wrapT = previous.wrapT;
+        texture.minFilter = previous.minFilter;
+        texture.magFilter = previous.magFilter;
+    }
+    labelMaterial.map = texture;
+    labelMaterial.needsUpdate = true;
+    requestRender();
+    if (previous) {
+        previous.dispose();
+    }
+    if (viewerTelemetry.firstTextureMs === null) {
+        viewerTelemetry.firstTextureMs = performance.now() - loadStart;
+        console.log('First label texture shown after ' + viewerTelemetry.firstTextureMs.toFixed(0) + ' ms');
+    }
+}
+
+// Load a GLB, replacing any model already in the scene; prepare(gltf) may
+// return a promise and runs before the model is added
+function loadGLB(url, onLoaded, prepare) {
     const loader = new THREE.GLTFLoader();
     
     loader.load(
-        '/models/exported_label.glb',
+        url,
         function (gltf) {
-            model = gltf.scene;
-            
-            // Enable shadows for all meshes
-            model.traverse(function (child) {
-                if (child.isMesh) {
-                    child.castShadow = true;
-                    child.receiveShadow = true;
-                    
-                    // Improve material quality
-                    if (child.material) {
-                        child.material.needsUpdate = true;
-                    }
-                }
-            });
-
-            // Center and scale the model
-            const box = new THREE.Box3().setFromObject(model);
-            const center = box.getCenter(new THREE.Vector3());
-            const size = box.getSize(new THREE.Vector3());
-            
-            // Center the model
-            model.position.sub(center);
-            
-            // Scale to fit in view
-            const maxDim = Math.max(size.x, size.y, size.z);
-            const scale = 5 / maxDim;
-            model.scale.setScalar(scale);
-
-            scene.add(model);
-
-            // Setup animations if any
-            if (gltf.animations && gltf.animations.length) {
-                mixer = new THREE.AnimationMixer(model);
-                gltf.animations.forEach((clip) => {
-                    mixer.clipAction(clip).play();
-                });
+            if (!prepare) {
+                showModel(gltf, url, onLoaded);
+                return;
             }
-
-            // Hide loading screen
-            document.getElementById('loading').classList.add('hidden');
-            
-            console.log('Model loaded successfully!');
+            Promise.resolve(prepare(gltf)).then(function () {
+                showModel(gltf, url, onLoaded);
+            }).catch(function (error) {
+                console.error('Error preparing model:', error);
+            });
         },
         function (xhr) {
             // Progress callback
@@ -148,13 +344,183 @@ function loadModel() {
     );
 }
 
-// Animation loop
-function animate() {
-    requestAnimationFrame(animate);
+// Add a loaded GLB to the scene, centered and scaled to fit
+function showModel(gltf, url, onLoaded) {
+    if (model) {
+        scene.remove(model);
+        disposeModel(model);
+        mixer = null;
+    }
+    model = gltf.scene;
+    
+    // Enable shadows for all meshes
+    model.traverse(function (child) {
+        if (child.isMesh) {
+            child.castShadow = true;
+            child.receiveShadow = true;
+            
+            // Improve material quality
+            if (child.material) {
+                child.material.needsUpdate = true;
+                child.material.wireframe = wireframeMode;
+            }
+        }
+    });
+
+    // Center and scale the model
+    const box = modelBounds(model);
+    const center = box.getCenter(new THREE.Vector3());
+    const size = box.getSize(new THREE.Vector3());
+    
+    // Center the model
+    model.position.sub(center);
+    
+    // Scale to fit in view
+    const maxDim = Math.max(size.x, size.y, size.z);
+    const scale = 5 / maxDim;
+    model.scale.setScalar(scale);
+
+    scene.add(model);
+
+    // Setup animations if any
+    if (gltf.animations && gltf.animations.length) {
+        mixer = new THREE.AnimationMixer(model);
+        gltf.animations.forEach((clip) => {
+            mixer.clipAction(clip).play();
+        });
+    }
+
+    // Hide loading screen
+    document.getElementById('loading').classList.add('hidden');
+    requestRender();
+    
+    console.log('Model loaded successfully: ' + url);
+    if (onLoaded) {
+        onLoaded();
+    }
+}
+
+// Catalog GLBs draw one ball per label with EXT_mesh_gpu_instancing, which
+// r128's GLTFLoader leaves in userData: turn each instanced node's meshes
+// into InstancedMeshes, and shift the label material's UVs to each
+// instance's atlas cell (the per-instance _UV_OFFSET attribute)
+function expandInstances(gltf) {
+    const catalog = gltf.scene.userData.catalog;
+    const labelMaterialName = catalog ? catalog.material : null;
+    const nodes = [];
+    gltf.scene.traverse(function (object) {
+        const extensions = object.userData.gltfExtensions;
+        if (extensions && extensions.EXT_mesh_gpu_instancing) {
+            nodes.push(object);
+        }
+    });
+    return Promise.all(nodes.map(function (node) {
+        const attributes = node.userData.gltfExtensions.EXT_mesh_gpu_instancing.attributes;
+        return Promise.all([
+            gltf.parser.getDependency('accessor', attributes.TRANSLATION),
+            attributes._UV_OFFSET === undefined ? null : gltf.parser.getDependency('accessor', attributes._UV_OFFSET)
+        ]).then(function (accessors) {
+            const translations = accessors[0];
+            const uvOffsets = accessors[1];
+            const meshes = node.isMesh ? [node] : node.children.filter(function (child) { return child.isMesh; });
+            meshes.forEach(function (mesh) {
+                const instanced = new THREE.InstancedMesh(mesh.geometry, mesh.material, translations.count);
+                const matrix = new THREE.Matrix4();
+                for (let i = 0; i < translations.count; i++) {
+                    matrix.makeTranslation(translations.getX(i), translations.getY(i), translations.getZ(i));
+                    instanced.setMatrixAt(i, matrix);
+                }
+                if (uvOffsets && mesh.material.name === labelMaterialName) {
+                    mesh.geometry.setAttribute('instanceUvOffset',
+                        new THREE.InstancedBufferAttribute(new Float32Array(uvOffsets.array), 2));
+                    useInstanceUvOffset(mesh.material);
+                }
+                instanced.name = mesh.name;
+                instanced.position.copy(mesh.position);
+                instanced.quaternion.copy(mesh.quaternion);
+                instanced.scale.copy(mesh.scale);
+                // r128 culls instanced meshes by the first instance's bounds
+                instanced.frustumCulled = false;
+                mesh.children.slice().forEach(function (child) { instanced.add(child); });
+                mesh.parent.add(instanced);
+                mesh.parent.remove(mesh);
+            });
+        });
+    })).then(function () {
+        if (catalog) {
+            console.log('Catalog: ' + catalog.labels.length + ' labels, ' + nodes.length + ' instanced meshes');
+        }
+    });
+}
+
+function useInstanceUvOffset(material) {
+    if (material.userData.instanceUvOffset) return;
+    material.userData.instanceUvOffset = true;
+    material.onBeforeCompile = function (shader) {
+        shader.vertexShader = 'attribute vec2 instanceUvOffset;\n' + shader.vertexShader.replace(
+            '#include <uv_vertex>', '#include <uv_vertex>\n\tvUv += instanceUvOffset;');
+    };
+    material.customProgramCacheKey = function () { return 'instanceUvOffset'; };
+    material.needsUpdate = true;
+}
+
+// World-space bounds of a model, counting every instance of InstancedMeshes
+// (Box3.setFromObject only sees their base geometry)
+function modelBounds(root) {
+    const box = new THREE.Box3();
+    const part = new THREE.Box3();
+    const matrix = new THREE.Matrix4();
+    root.updateMatrixWorld(true);
+    root.traverse(function (child) {
+        if (!child.isMesh) return;
+        if (!child.geometry.boundingBox) {
+            child.geometry.computeBoundingBox();
+        }
+        const instances = child.isInstancedMesh ? child.count : 1;
+        for (let i = 0; i < instances; i++) {
+            if (child.isInstancedMesh) {
+                child.getMatrixAt(i, matrix);
+                matrix.premultiply(child.matrixWorld);
+            } else {
+                matrix.copy(child.matrixWorld);
+            }
+            box.union(part.copy(child.geometry.boundingBox).applyMatrix4(matrix));
+        }
+    });
+    return box;
+}
+
+// Free GPU resources held by a model that is being replaced
+function disposeModel(root) {
+    root.traverse(function (child) {
+        if (child.isMesh) {
+            child.geometry.dispose();
+            const materials = Array.isArray(child.material) ? child.material : [child.material];
+            materials.forEach(function (material) {
+                if (material.map) {
+                    material.map.dispose();
+                }
+                material.dispose();
+            });
+        }
+    });
+}
+
+// Schedule a frame if one is not already pending
+function requestRender() {
+    if (!frameScheduled) {
+        frameScheduled = true;
+        requestAnimationFrame(renderFrame);
+    }
+}
+
+// Render one frame; keep going only while something is moving
+function renderFrame(now) {
+    frameScheduled = false;
 
     const delta = clock.getDelta();
 
-    // Update controls
+    // Update controls (emits 'change', and so another frame, while damping settles)
     controls.update();
 
     // Update animations
@@ -168,7 +534,105 @@ function animate() {
     }
 
     // Render the scene
+    const renderStart = performance.now();
     renderer.render(scene, camera);
+    recordFrame(now, performance.now() - renderStart);
+
+    if (mixer || (autoRotate && model)) {
+        requestRender();
+    }
+}
+
+// Track frame time while frames are continuous and adapt quality to it
+function recordFrame(now, renderMs) {
+    const continuous = lastFrameTime !== null && now - lastFrameTime < 100;
+    const frameMs = continuous ? now - lastFrameTime : renderMs;
+    lastFrameTime = now;
+
+    viewerTelemetry.frames += 1;
+    viewerTelemetry.lastFrameMs = frameMs;
+    viewerTelemetry.renderMs = renderMs;
+    viewerTelemetry.avgFrameMs = viewerTelemetry.avgFrameMs
+        ? viewerTelemetry.avgFrameMs * 0.9 + frameMs * 0.1
+        : frameMs;
+
+    if (continuous) {
+        adaptSamples.push(frameMs);
+        if (adaptSamples.length >= ADAPT_WINDOW_FRAMES) {
+            adaptQuality(adaptSamples);
+            adaptSamples = [];
+        }
+    }
+
+    if (statsOverlay) {
+        updateStatsOverlay();
+    }
+    if (viewerTelemetry.onFrame) {
+        viewerTelemetry.onFrame({
+            frames: viewerTelemetry.frames,
+            frameMs: frameMs,
+            renderMs: renderMs,
+            qualityTier: qualityTier
+        });
+    }
+}
+
+function adaptQuality(samples) {
+    const sorted = samples.slice().sort(function (a, b) { return a - b; });
+    const median = sorted[Math.floor(sorted.length / 2)];
+    if (median > FRAME_BUDGET_MS * 1.2) {
+        goodWindows = 0;
+        if (qualityTier < QUALITY_TIERS.length - 1) {
+            applyQualityTier(qualityTier + 1);
+        }
+    } else if (median < FRAME_BUDGET_MS * 0.9) {
+        // Frame intervals are vsync-bound when fast, so require a run of
+        // good windows before stepping back up to avoid oscillating
+        goodWindows += 1;
+        if (goodWindows >= UPGRADE_AFTER_WINDOWS && qualityTier > 0) {
+            goodWindows = 0;
+            applyQualityTier(qualityTier - 1);
+        }
+    } else {
+        goodWindows = 0;
+    }
+}
+
+function applyQualityTier(tier) {
+    qualityTier = tier;
+    const settings = QUALITY_TIERS[tier];
+    renderer.setPixelRatio(settings.pixelRatio);
+    renderer.setSize(window.innerWidth, window.innerHeight);
+    if (mainLight && mainLight.shadow.mapSize.width !== settings.shadowMapSize) {
+        mainLight.shadow.mapSize.set(settings.shadowMapSize, settings.shadowMapSize);
+        // Drop the old shadow render target so it is recreated at the new size
+        if (mainLight.shadow.map) {
+            mainLight.shadow.map.dispose();
+            mainLight.shadow.map = null;
+        }
+    }
+    viewerTelemetry.qualityTier = tier;
+    viewerTelemetry.pixelRatio = settings.pixelRatio;
+    viewerTelemetry.shadowMapSize = settings.shadowMapSize;
+    requestRender();
+}
+
+function createStatsOverlay() {
+    statsOverlay = document.createElement('div');
+    statsOverlay.style.cssText = 'position:absolute;bottom:10px;left:10px;z-index:20;' +
+        'padding:6px 10px;background:rgba(0,0,0,0.6);font:12px monospace;pointer-events:none;';
+    document.body.appendChild(statsOverlay);
+    updateStatsOverlay();
+}
+
+function updateStatsOverlay() {
+    statsOverlay.textContent =
+        'frames ' + viewerTelemetry.frames +
+        ' | frame ' + viewerTelemetry.avgFrameMs.toFixed(1) + ' ms' +
+        ' | render ' + viewerTelemetry.renderMs.toFixed(1) + ' ms' +
+        ' | tier ' + viewerTelemetry.qualityTier +
+        ' (' + viewerTelemetry.pixelRatio + 'x, shadow ' + viewerTelemetry.shadowMapSize + ')' +
+        ' | label ' + viewerTelemetry.textureWidth + 'px';
 }
 
 // Handle window resize
@@ -176,12 +640,16 @@ function onWindowResize() {
     camera.aspect = window.innerWidth / window.innerHeight;
     camera.updateProjectionMatrix();
     renderer.setSize(window.innerWidth, window.innerHeight);
+    // A bigger viewport may warrant a larger texture level
+    loadNextLevel();
+    requestRender();
 }
 
 // Control functions
 function resetCamera() {
     camera.position.set(5, 5, 5);
     controls.reset();
+    requestRender();
 }
 
 function toggleWireframe() {
@@ -193,6 +661,7 @@ function toggleWireframe() {
             }
         });
     }
+    requestRender();
 }
 
 function toggleAutoRotate() {
@@ -203,6 +672,9 @@ function toggleAutoRotate() {
     } else {
         button.style.background = 'rgba(255, 255, 255, 0.1)';
     }
+    // Restart the clock so the first delta doesn't include the idle time
+    clock.getDelta();
+    requestRender();
 }
 
 // Initialize the application
@@ -7,8 +7,20 @@ const PORT = process.env.PORT || 3000;
 // Serve static files from the public directory
 app.use(express.static('public'));
 
+// Content-hashed assets (geometry-<hash>.glb, textures/label-<hash>.png) never change
+const HASHED_ASSET = /-[0-9a-f]{16}\.[a-z0-9]+$/;
+
 // Serve the 3D model file from assets/models directory
-app.use('/models', express.static(path.join(__dirname, '../../../assets/models')));
+app.use('/models', express.static(path.join(__dirname, '../../../assets/models'), {
+    setHeaders: (res, filePath) => {
+        if (HASHED_ASSET.test(filePath)) {
+            res.setHeader('Cache-Control', 'public, max-age=31536000, immutable');
+        } else {
+            // Manifest and legacy exported_label.glb: always revalidate (cheap 304 via ETag)
+            res.setHeader('Cache-Control', 'no-cache');
+        }
+    }
+}));
 
 // Main route
 app.get('/', (req, res) => {
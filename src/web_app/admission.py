@@ -0,0 +1,183 @@
+"""
+Resource-aware admission control for pipeline jobs.
+
+Jobs are admitted only while there is a free core and enough available
+memory for one more job's measured footprint, so a burst of submissions
+waits its turn instead of oversubscribing the host.
+
+Waiting jobs are ordered by priority class (interactive, then watcher, then
+batch), and within a class by weighted fair queuing across clients, so one
+client's bulk submission interleaves with everyone else's work instead of
+going first. A job moves up one class for every aging_seconds it waits, so
+low classes are never starved, and lower classes cannot take the last
+reserved_interactive_slots free slots.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+GIB = 1024 ** 3
+PRIORITY_CLASSES = ('interactive', 'watcher', 'batch')  # Highest first
+AGING_SECONDS = 120.0
+
+def available_memory_bytes():
+    """Memory the OS reports as available for new processes, or None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+class AdmissionController:
+    """Prioritized, fair admission of jobs sized from cores, available RAM and observed per-job footprint."""
+
+    def __init__(self, cores_per_job=1, initial_footprint_bytes=int(1.5 * GIB),
+                 memory_headroom=0.8, max_jobs=None, memory_probe=available_memory_bytes,
+                 aging_seconds=AGING_SECONDS, reserved_interactive_slots=1):
+        self.cpu_count = os.cpu_count() or 1
+        self.cores_per_job = cores_per_job
+        self.memory_headroom = memory_headroom
+        self.max_jobs = max_jobs
+        self.footprint_bytes = initial_footprint_bytes
+        self.aging_seconds = aging_seconds
+        self.reserved_interactive_slots = reserved_interactive_slots
+        self._memory_probe = memory_probe
+        self._condition = threading.Condition()
+        self._queue = []
+        self._running = {}  # job id -> priority class
+        self._queue_waits = deque(maxlen=100)
+        self._class_waits = {priority: deque(maxlen=100) for priority in PRIORITY_CLASSES}
+        self._admitted = dict.fromkeys(PRIORITY_CLASSES, 0)
+        # Weighted fair queuing: a virtual clock, and the virtual finish time of each client's last queued job
+        self._virtual_time = 0.0
+        self._client_finish = {}
+        self._sequence = 0
+
+    @property
+    def cpu_limit(self):
+        limit = max(1, self.cpu_count // self.cores_per_job)
+        return min(limit, self.max_jobs) if self.max_jobs else limit
+
+    def _rank(self, waiter, now):
+        """Class index of a waiting job after aging (0 is interactive)."""
+        rank = PRIORITY_CLASSES.index(waiter['priority'])
+        if self.aging_seconds:
+            rank -= int((now - waiter['enqueued']) // self.aging_seconds)
+        return max(rank, 0)
+
+    def _next_waiter(self, now):
+        """The job to admit next: highest class, then earliest virtual finish time, then arrival."""
+        return min(self._queue, key=lambda waiter: (self._rank(waiter, now), waiter['finish'], waiter['sequence']))
+
+    def _can_admit(self, rank=0):
+        """True if one more job of this class fits (condition lock held)."""
+        limit = self.cpu_limit
+        if rank > 0:
+            # Keep slots free for interactive work, but never all of them
+            limit -= min(self.reserved_interactive_slots, limit - 1)
+        if len(self._running) >= limit:
+            return False
+        if not self._running:
+            # Always let one job through, or a small host would never make progress
+            return True
+        available = self._memory_probe()
+        return available is None or available * self.memory_headroom >= self.footprint_bytes
+
+    def acquire(self, job_id, cancel_event=None, poll_interval=0.5, priority='interactive', client=None, weight=1.0):
+        """Block until the job is admitted. Returns seconds waited, or None if cancelled while queued.
+
+        Jobs of the same client share its weight: a client with weight 2 gets
+        twice the admissions of a weight-1 client while both have jobs queued.
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        start = time.monotonic()
+        with self._condition:
+            virtual_start = max(self._virtual_time, self._client_finish.get(client, 0.0))
+            self._sequence += 1
+            waiter = {'job_id': job_id, 'priority': priority, 'client': client, 'enqueued': start,
+                      'start': virtual_start, 'finish': virtual_start + 1.0 / weight, 'sequence': self._sequence}
+            self._client_finish[client] = waiter['finish']
+            self._queue.append(waiter)
+            admitted = False
+            try:
+                # Memory is re-probed and aging re-evaluated on every wakeup, so poll even without notifications
+                while True:
+                    now = time.monotonic()
+                    if self._next_waiter(now) is waiter and self._can_admit(self._rank(waiter, now)):
+                        break
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    self._condition.wait(poll_interval)
+                admitted = True
+            finally:
+                self._queue.remove(waiter)
+                if not admitted and self._client_finish.get(client) == waiter['finish']:
+                    # Withdrawn before it ran: don't charge the client for it
+                    self._client_finish[client] = waiter['start']
+                self._condition.notify_all()
+            self._running[job_id] = priority
+            self._virtual_time = max(self._virtual_time, waiter['start'])
+            if not any(queued['client'] == client for queued in self._queue):
+                self._client_finish.pop(client, None)
+            waited = time.monotonic() - start
+            self._queue_waits.append(waited)
+            self._class_waits[priority].append(waited)
+            self._admitted[priority] += 1
+        return waited
+
+    def release(self, job_id):
+        """Free a job's slot."""
+        with self._condition:
+            self._running.pop(job_id, None)
+            self._condition.notify_all()
+
+    def record_footprint(self, peak_bytes, weight=0.3):
+        """Fold a finished job's peak memory into the per-job estimate (EWMA, biased upward)."""
+        if not peak_bytes:
+            return
+        with self._condition:
+            blended = (1 - weight) * self.footprint_bytes + weight * peak_bytes
+            # Never estimate below the biggest job just seen
+            self.footprint_bytes = int(max(blended, peak_bytes))
+            self._condition.notify_all()
+
+    def stats(self):
+        """Current limits and load, for tuning under real traffic."""
+        with self._condition:
+            waits = list(self._queue_waits)
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                class_waits = sorted(self._class_waits[priority])
+                classes[priority] = {
+                    'queued': sum(1 for waiter in self._queue if waiter['priority'] == priority),
+                    'running': sum(1 for running in self._running.values() if running == priority),
+                    'admitted': self._admitted[priority],
+                    'mean_queue_wait_seconds': sum(class_waits) / len(class_waits) if class_waits else 0.0,
+                    'p95_queue_wait_seconds': class_waits[int(0.95 * (len(class_waits) - 1))] if class_waits else 0.0,
+                }
+            clients = {}
+            for waiter in self._queue:
+                clients[waiter['client']] = clients.get(waiter['client'], 0) + 1
+            return {
+                'cpu_count': self.cpu_count,
+                'cpu_limit': self.cpu_limit,
+                'available_memory_bytes': self._memory_probe(),
+                'memory_headroom': self.memory_headroom,
+                'footprint_bytes': self.footprint_bytes,
+                'running': len(self._running),
+                'queue_depth': len(self._queue),
+                'mean_queue_wait_seconds': sum(waits) / len(waits) if waits else 0.0,
+                'reserved_interactive_slots': self.reserved_interactive_slots,
+                'aging_seconds': self.aging_seconds,
+                'classes': classes,
+                'queued_by_client': {str(client): count for client, count in clients.items()},
+            }
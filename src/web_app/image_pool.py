@@ -0,0 +1,129 @@
+"""
+Process pool for CPU-bound image post-processing.
+
+PIL decode/crop/PNG encode runs in pre-started worker processes so it does not
+hold the GIL of the interpreter serving Flask and Socket.IO. Image bytes are
+passed through shared memory rather than pickled, and submissions block (up
+to a timeout) once every worker is busy and the small backlog is full. If a
+worker dies (OOM kill, crash in Pillow) the pool is rebuilt and the image
+retried once.
+"""
+
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '../../scripts')
+
+class PoolSaturated(RuntimeError):
+    """Raised when no pool slot frees up within the submit timeout."""
+
+def _warm_worker():
+    """Import the processing code in a fresh worker so the first job doesn't pay for it."""
+    _load_processor()
+    return os.getpid()
+
+def _load_processor():
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from generate_image_with_dalle import process_image_bytes
+    return process_image_bytes
+
+def _process_in_worker(input_name, input_size, size):
+    """Worker entry point: read input from shared memory, write the PNG to a new block."""
+    process_image_bytes = _load_processor()
+    block = shared_memory.SharedMemory(name=input_name)
+    try:
+        png_bytes = process_image_bytes(bytes(block.buf[:input_size]), size)
+    finally:
+        block.close()
+
+    output = shared_memory.SharedMemory(create=True, size=max(len(png_bytes), 1))
+    output.buf[:len(png_bytes)] = png_bytes
+    output.close()
+    # The parent attaches, copies and unlinks the output block
+    return output.name, len(png_bytes)
+
+class ImageProcessingPool:
+    """Bounded process pool exposing process(data, size) -> PNG bytes."""
+
+    def __init__(self, max_workers=None, max_backlog=None, submit_timeout=60.0):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.max_backlog = self.max_workers if max_backlog is None else max_backlog
+        self.submit_timeout = submit_timeout
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_backlog)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.restarts = 0
+
+    def _new_executor(self):
+        # spawn: forking a process that already runs server threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _replace_executor(self, broken):
+        """Swap in a fresh executor for one whose worker died, unless another caller already did."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+            self.restarts += 1
+        print(f"[WARN] Image pool worker died; restarted the pool ({self.restarts} restarts so far)")
+        broken.shutdown(wait=False)
+
+    def _submit(self, *args):
+        """Run _process_in_worker in the pool, rebuilding a broken pool and retrying once."""
+        executor = self._executor
+        try:
+            return executor.submit(_process_in_worker, *args).result()
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            return self._executor.submit(_process_in_worker, *args).result()
+
+    def prefork(self):
+        """Start every worker process now and have each import the processing code."""
+        futures = [self._executor.submit(_warm_worker) for _ in range(self.max_workers)]
+        return sorted({future.result() for future in futures})
+
+    def process(self, data, size="1792x1024"):
+        """Process one image in the pool, blocking while the pool is saturated."""
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            raise PoolSaturated(f"Image pool saturated ({self.max_workers} workers, backlog {self.max_backlog})")
+        with self._lock:
+            self.in_flight += 1
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        try:
+            block.buf[:len(data)] = data
+            output_name, output_size = self._submit(block.name, len(data), size)
+        finally:
+            block.close()
+            block.unlink()
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+        output = shared_memory.SharedMemory(name=output_name)
+        try:
+            return bytes(output.buf[:output_size])
+        finally:
+            output.close()
+            output.unlink()
+
+    def stats(self):
+        """Current pool sizing and load."""
+        return {
+            'workers': self.max_workers,
+            'max_backlog': self.max_backlog,
+            'in_flight': self.in_flight,
+            'restarts': self.restarts,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,193 @@
+"""
+Cancellation handles for pipeline jobs.
+
+A JobHandle owns a job's cancel event and whatever it is currently waiting
+on: a subprocess (run in its own process group so Blender and anything it
+spawns can be killed together) or an in-process step running on a helper
+thread. Cancelling sets the event and kills the process group; waits return
+promptly by raising JobCancelled so the worker can clean up and free its slot.
+Stages can also be given a deadline and, on POSIX, rlimit memory/CPU caps,
+and background jobs run their subprocesses at a lower CPU priority.
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import subprocess
+import threading
+
+POLL_INTERVAL = 0.25
+KILL_GRACE_SECONDS = 3.0
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker once the job has been cancelled."""
+
+class StageTimeout(JobCancelled):
+    """Raised when a stage runs past its deadline; the job is cancelled with it."""
+
+# Applies the limits in a fresh interpreter, then execs the real command in its place. preexec_fn would
+# do this between fork and exec, which can deadlock the child while the server has other threads running.
+_LIMITS_WRAPPER = (
+    "import os, sys, resource\n"
+    "memory, cpu, niceness = (int(value) for value in sys.argv[1:4])\n"
+    "if memory: resource.setrlimit(resource.RLIMIT_AS, (memory, memory))\n"
+    "if cpu: resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))\n"
+    "if niceness: os.nice(niceness)\n"
+    "os.execv(sys.argv[4], sys.argv[4:])\n"
+)
+
+def _with_limits(command, memory_bytes=None, cpu_seconds=None, niceness=0):
+    """Wrap a command so it caps its address space and CPU time and lowers its priority before it starts."""
+    executable = shutil.which(command[0])
+    if executable is None:
+        # What Popen would raise for the unwrapped command
+        raise FileNotFoundError(2, "No such file or directory", command[0])
+    return [sys.executable, "-I", "-c", _LIMITS_WRAPPER,
+            str(int(memory_bytes or 0)), str(int(cpu_seconds or 0)), str(int(niceness)), executable, *command[1:]]
+
+def popen_in_group(command, memory_limit=None, cpu_limit=None, niceness=0, **kwargs):
+    """Start a subprocess in a new process group/session so the whole tree can be killed.
+
+    memory_limit (bytes) and cpu_limit (seconds) are applied with setrlimit on
+    POSIX and ignored on Windows. A positive niceness lowers the child's CPU
+    priority (nice on POSIX, a below-normal priority class on Windows). On
+    POSIX the limits are set by a small wrapper that then execs command, so
+    the child keeps the pid and process group and command must be a list.
+    """
+    if os.name == 'nt':
+        flags = subprocess.CREATE_NEW_PROCESS_GROUP
+        if niceness:
+            flags |= subprocess.IDLE_PRIORITY_CLASS if niceness >= 19 else subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        kwargs.setdefault('creationflags', flags)
+    else:
+        kwargs.setdefault('start_new_session', True)
+        if memory_limit or cpu_limit or niceness:
+            command = _with_limits(command, memory_limit, cpu_limit, niceness)
+    return subprocess.Popen(command, **kwargs)
+
+def peak_rss_bytes(pid):
+    """High-water resident memory of a running process (Linux only), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def kill_process_group(process, grace=KILL_GRACE_SECONDS):
+    """Terminate a process started with popen_in_group() and everything it spawned."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=grace)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    process.wait()
+
+class JobHandle:
+    """Cancellation state for one job."""
+
+    def __init__(self, job_id, session_id=None, niceness=0):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.niceness = niceness
+        self.cancel_event = threading.Event()
+        self.reason = None
+        self.peak_rss_bytes = 0
+        self._lock = threading.Lock()
+        self._process = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self, reason="Cancelled"):
+        """Cancel the job and kill its running subprocess, if any. Returns False if already cancelled."""
+        with self._lock:
+            if self.cancel_event.is_set():
+                return False
+            self.reason = reason
+            self.cancel_event.set()
+            process = self._process
+        if process is not None:
+            kill_process_group(process)
+        return True
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.reason)
+
+    def _timeout(self, stage, timeout):
+        self.cancel(f"{stage} timed out after {timeout:g}s")
+        raise StageTimeout(self.reason)
+
+    def run_process(self, command, stage="Stage", timeout=None, memory_limit=None, cpu_limit=None, env=None):
+        """Run a subprocess to completion unless cancelled or past its deadline.
+
+        Returns (returncode, stdout, stderr). Tracks the child's peak RSS in
+        peak_rss_bytes while it runs.
+        """
+        self.check()
+        process = popen_in_group(
+            command, memory_limit=memory_limit, cpu_limit=cpu_limit, niceness=self.niceness, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        with self._lock:
+            self._process = process
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            # Re-check: cancel() may have run before the process was registered
+            if self.cancel_event.is_set():
+                kill_process_group(process)
+            while True:
+                try:
+                    stdout, stderr = process.communicate(timeout=POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    self.peak_rss_bytes = max(self.peak_rss_bytes, peak_rss_bytes(process.pid) or 0)
+                    if deadline and time.monotonic() > deadline:
+                        with self._lock:
+                            self._process = None
+                        kill_process_group(process)
+                        process.communicate()
+                        self._timeout(stage, timeout)
+        finally:
+            with self._lock:
+                self._process = None
+        self.check()
+        return process.returncode, stdout, stderr
+
+    def run_in_thread(self, target, *args, stage="Stage", timeout=None, **kwargs):
+        """Run target on a helper thread and return its result, or raise JobCancelled without waiting for it."""
+        result = {}
+
+        def runner():
+            try:
+                result['value'] = target(*args, **kwargs)
+            except BaseException as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=runner, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + timeout if timeout else None
+        while thread.is_alive():
+            thread.join(POLL_INTERVAL)
+            self.check()
+            if deadline and thread.is_alive() and time.monotonic() > deadline:
+                self._timeout(stage, timeout)
+        self.check()
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
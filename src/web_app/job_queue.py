@@ -0,0 +1,464 @@
+"""
+Shared job queue and artifact store for distributed pipeline workers.
+
+The web app enqueues jobs; worker nodes (pipeline_node.py) lease them, keep
+the lease alive with heartbeats while they run, report status changes and
+upload their outputs to a shared artifact store. A lease that is not renewed
+before its visibility timeout makes the job visible again, so a crashed
+worker's job is picked up by another node. Every worker call after leasing
+is fenced by the lease token, so a worker that lost its lease cannot
+overwrite the new owner's status or result.
+
+SQLiteBroker and FileArtifactStore are the reference implementations: a
+SQLite file and a directory on storage every node can reach. The SQLite
+broker uses WAL journaling, which does not work over network filesystems, so
+it is for processes on one host; HTTPBroker gives nodes on other machines the
+same queue through a small HTTP server in front of it (serve_broker(), or
+`python job_queue.py serve`). Other brokers (Redis-like) and stores implement
+the same methods and are registered with register_broker()/register_store().
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Job states
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TERMINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# Heartbeat answers
+HEARTBEAT_OK = 'ok'
+HEARTBEAT_CANCELLED = 'cancelled'
+HEARTBEAT_LOST = 'lost'
+
+DEFAULT_LEASE_SECONDS = 30
+DEFAULT_MAX_ATTEMPTS = 3
+
+class Lease:
+    """A job leased to a worker until `expires_at` (epoch seconds)."""
+
+    def __init__(self, job_id, token, payload, attempts, expires_at):
+        self.job_id = job_id
+        self.token = token
+        self.payload = payload
+        self.attempts = attempts
+        self.expires_at = expires_at
+
+class JobRecord:
+    """A job's queue state as seen by the web app."""
+
+    def __init__(self, job_id, state, worker_id, status, result, error, version):
+        self.job_id = job_id
+        self.state = state
+        self.worker_id = worker_id
+        self.status = status
+        self.result = result
+        self.error = error
+        self.version = version
+
+class JobBroker(ABC):
+    """Interface every queue backend implements."""
+
+    @abstractmethod
+    def enqueue(self, job_id, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Add a job. payload is JSON-serializable."""
+
+    @abstractmethod
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Take the oldest visible job, or return None. Returns a Lease."""
+
+    @abstractmethod
+    def heartbeat(self, job_id, token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend a lease. Returns HEARTBEAT_OK, HEARTBEAT_CANCELLED or HEARTBEAT_LOST."""
+
+    @abstractmethod
+    def report(self, job_id, token, changes):
+        """Merge status changes into the job's status. Returns False if the lease was lost."""
+
+    @abstractmethod
+    def complete(self, job_id, token, result):
+        """Finish a leased job successfully. Returns False if the lease was lost."""
+
+    @abstractmethod
+    def fail(self, job_id, token, error):
+        """Finish a leased job with an error (or as cancelled, if cancellation was requested)."""
+
+    @abstractmethod
+    def cancel(self, job_id):
+        """Cancel a queued job now, or ask the leasing worker to stop at its next heartbeat."""
+
+    @abstractmethod
+    def changes_since(self, version):
+        """JobRecords changed after `version`, oldest change first."""
+
+    @abstractmethod
+    def stats(self):
+        """Job counts per state, active workers and oldest queued job's age."""
+
+class SQLiteBroker(JobBroker):
+    """Job queue in a SQLite database shared by every process on one host.
+
+    Not for network filesystems: WAL needs shared memory between the
+    processes, so leases and fencing tokens are only safe on local disk.
+    Serve it with serve_broker() to reach it from other machines.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._transaction() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    version INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_version ON jobs (version)")
+
+    def _connection(self):
+        # One connection per thread; transactions are explicit
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    class _Transaction:
+        def __init__(self, db):
+            self.db = db
+
+        def __enter__(self):
+            # IMMEDIATE takes the write lock up front, so lease() cannot hand one job to two workers
+            self.db.execute("BEGIN IMMEDIATE")
+            return self.db
+
+        def __exit__(self, exc_type, exc, tb):
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    @staticmethod
+    def _next_version(db):
+        return db.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM jobs").fetchone()[0]
+
+    def enqueue(self, job_id, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, payload, state, max_attempts, version, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), QUEUED, max_attempts, self._next_version(db), now, now))
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        with self._transaction() as db:
+            version = self._next_version(db)
+            # Expired leases: retire jobs that were cancelled or used up their attempts
+            db.execute(
+                "UPDATE jobs SET state = ?, error = 'Cancelled', lease_token = NULL, version = ?, updated_at = ? "
+                "WHERE state = ? AND lease_expires < ? AND cancel_requested = 1",
+                (CANCELLED, version, now, LEASED, now))
+            db.execute(
+                "UPDATE jobs SET state = ?, error = 'Worker lease expired after ' || attempts || ' attempts', "
+                "lease_token = NULL, version = ?, updated_at = ? "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, version, now, LEASED, now))
+            row = db.execute(
+                "SELECT job_id, payload, attempts FROM jobs "
+                "WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts = row
+            token = uuid.uuid4().hex
+            expires_at = now + lease_seconds
+            db.execute(
+                "UPDATE jobs SET state = ?, worker_id = ?, lease_token = ?, lease_expires = ?, "
+                "attempts = attempts + 1, version = ?, updated_at = ? WHERE job_id = ?",
+                (LEASED, worker_id, token, expires_at, version, now, job_id))
+        return Lease(job_id, token, json.loads(payload), attempts + 1, expires_at)
+
+    def heartbeat(self, job_id, token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT cancel_requested FROM jobs WHERE job_id = ? AND state = ? AND lease_token = ?",
+                (job_id, LEASED, token)).fetchone()
+            if row is None:
+                return HEARTBEAT_LOST
+            db.execute("UPDATE jobs SET lease_expires = ? WHERE job_id = ?", (now + lease_seconds, job_id))
+        return HEARTBEAT_CANCELLED if row[0] else HEARTBEAT_OK
+
+    def report(self, job_id, token, changes):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT status FROM jobs WHERE job_id = ? AND state = ? AND lease_token = ?",
+                (job_id, LEASED, token)).fetchone()
+            if row is None:
+                return False
+            status = json.loads(row[0])
+            status.update(changes)
+            db.execute("UPDATE jobs SET status = ?, version = ?, updated_at = ? WHERE job_id = ?",
+                       (json.dumps(status), self._next_version(db), time.time(), job_id))
+        return True
+
+    def _finish(self, job_id, token, state, result=None, error=None):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT cancel_requested FROM jobs WHERE job_id = ? AND state = ? AND lease_token = ?",
+                (job_id, LEASED, token)).fetchone()
+            if row is None:
+                return False
+            if state == FAILED and row[0]:
+                state = CANCELLED
+            db.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, lease_token = NULL, version = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (state, json.dumps(result) if result is not None else None, error,
+                 self._next_version(db), time.time(), job_id))
+        return True
+
+    def complete(self, job_id, token, result):
+        return self._finish(job_id, token, DONE, result=result)
+
+    def fail(self, job_id, token, error):
+        return self._finish(job_id, token, FAILED, error=error)
+
+    def cancel(self, job_id):
+        now = time.time()
+        with self._transaction() as db:
+            version = self._next_version(db)
+            db.execute("UPDATE jobs SET state = ?, error = 'Cancelled', version = ?, updated_at = ? "
+                       "WHERE job_id = ? AND state = ?", (CANCELLED, version, now, job_id, QUEUED))
+            cursor = db.execute("UPDATE jobs SET cancel_requested = 1, version = ?, updated_at = ? "
+                                "WHERE job_id = ? AND state = ?", (version, now, job_id, LEASED))
+        return cursor.rowcount > 0
+
+    def changes_since(self, version):
+        rows = self._connection().execute(
+            "SELECT job_id, state, worker_id, status, result, error, version FROM jobs "
+            "WHERE version > ? ORDER BY version", (version,)).fetchall()
+        return [
+            JobRecord(job_id, state, worker_id, json.loads(status), json.loads(result) if result else None,
+                      error, row_version)
+            for job_id, state, worker_id, status, result, error, row_version in rows
+        ]
+
+    def stats(self):
+        now = time.time()
+        db = self._connection()
+        counts = dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        workers = db.execute("SELECT COUNT(DISTINCT worker_id) FROM jobs WHERE state = ? AND lease_expires >= ?",
+                             (LEASED, now)).fetchone()[0]
+        oldest = db.execute("SELECT MIN(created_at) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+        return {
+            'counts': {state: counts.get(state, 0) for state in (QUEUED, LEASED) + TERMINAL_STATES},
+            'active_workers': workers,
+            'oldest_queued_seconds': round(now - oldest, 3) if oldest else 0.0,
+        }
+
+class ArtifactStore(ABC):
+    """Interface for the store workers upload job outputs to."""
+
+    @abstractmethod
+    def put(self, job_id, name, path):
+        """Upload a local file. Returns the artifact key."""
+
+    @abstractmethod
+    def fetch(self, key, destination):
+        """Download an artifact to a local path."""
+
+class FileArtifactStore(ArtifactStore):
+    """Artifacts as files under a directory shared by all nodes (local disk, NFS, SMB...)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, job_id, name, path):
+        key = f"{job_id}/{name}"
+        destination = os.path.join(self.root, job_id, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, destination)
+        return key
+
+    def fetch(self, key, destination):
+        tmp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.copyfile(os.path.join(self.root, *key.split('/')), tmp_path)
+        os.replace(tmp_path, destination)
+
+# Broker methods the HTTP server exposes to HTTPBroker clients
+BROKER_METHODS = ('enqueue', 'lease', 'heartbeat', 'report', 'complete', 'fail', 'cancel', 'changes_since', 'stats')
+HTTP_TIMEOUT_SECONDS = 30
+
+class HTTPBroker(JobBroker):
+    """Client for a broker served over HTTP by serve_broker(), for worker nodes on other machines."""
+
+    def __init__(self, location):
+        self.url = f"http://{location.rstrip('/')}"
+
+    def _call(self, method, **kwargs):
+        request = urllib.request.Request(f"{self.url}/{method}", data=json.dumps(kwargs).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT_SECONDS) as response:
+                return json.loads(response.read())['result']
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Broker {method} failed: {e.read().decode(errors='replace')}") from e
+
+    def enqueue(self, job_id, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self._call('enqueue', job_id=job_id, payload=payload, max_attempts=max_attempts)
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        lease = self._call('lease', worker_id=worker_id, lease_seconds=lease_seconds)
+        return Lease(**lease) if lease else None
+
+    def heartbeat(self, job_id, token, lease_seconds=DEFAULT_LEASE_SECONDS):
+        return self._call('heartbeat', job_id=job_id, token=token, lease_seconds=lease_seconds)
+
+    def report(self, job_id, token, changes):
+        return self._call('report', job_id=job_id, token=token, changes=changes)
+
+    def complete(self, job_id, token, result):
+        return self._call('complete', job_id=job_id, token=token, result=result)
+
+    def fail(self, job_id, token, error):
+        return self._call('fail', job_id=job_id, token=token, error=error)
+
+    def cancel(self, job_id):
+        return self._call('cancel', job_id=job_id)
+
+    def changes_since(self, version):
+        return [JobRecord(**record) for record in self._call('changes_since', version=version)]
+
+    def stats(self):
+        return self._call('stats')
+
+class _BrokerHandler(BaseHTTPRequestHandler):
+    # Set by serve_broker()
+    broker = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        method = self.path.strip('/')
+        if method not in BROKER_METHODS:
+            self._send(404, {'error': f"Unknown broker method '{method}'"})
+            return
+        try:
+            kwargs = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            result = getattr(self.broker, method)(**kwargs)
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        if isinstance(result, (Lease, JobRecord)):
+            result = vars(result)
+        elif isinstance(result, list):
+            result = [vars(record) for record in result]
+        self._send(200, {'result': result})
+
+def serve_broker(broker, host="0.0.0.0", port=5100):
+    """Serve a broker to HTTPBroker clients on a background thread. Returns the server.
+
+    There is no authentication: only expose it on a network the worker
+    nodes and the web app share.
+    """
+    handler = type("BrokerHandler", (_BrokerHandler,), {"broker": broker})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+BROKERS = {'sqlite': SQLiteBroker, 'http': HTTPBroker}
+STORES = {'file': FileArtifactStore}
+
+def register_broker(scheme, factory):
+    """Make open_broker() accept URLs like '<scheme>://...'; factory receives the part after '://'."""
+    BROKERS[scheme] = factory
+
+def register_store(scheme, factory):
+    """Make open_store() accept URLs like '<scheme>://...'."""
+    STORES[scheme] = factory
+
+def _open(url, registry, default_scheme):
+    scheme, separator, location = url.partition('://')
+    if not separator:
+        scheme, location = default_scheme, url
+    if scheme not in registry:
+        raise ValueError(f"Unknown scheme '{scheme}' (known: {', '.join(sorted(registry))})")
+    return registry[scheme](location)
+
+def open_broker(url):
+    """Open a broker from a URL such as 'sqlite:///srv/golf/queue.db' or 'http://queue-host:5100'.
+
+    A bare path means SQLite.
+    """
+    return _open(url, BROKERS, 'sqlite')
+
+def open_store(url):
+    """Open an artifact store from a URL such as 'file:///srv/golf/artifacts' (a bare path means file)."""
+    return _open(url, STORES, 'file')
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Serve a SQLite job queue to worker nodes on other machines")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--db", required=True, help="SQLite queue database on this host's local disk")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on (default: all interfaces)")
+    parser.add_argument("--port", type=int, default=5100, help="Port to listen on (default: 5100)")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    server = serve_broker(SQLiteBroker(args.db), args.host, args.port)
+    print(f"[INFO] Serving job queue {args.db} on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Pipeline worker node.
+
+Leases jobs from the shared queue (see job_queue.py), runs the image
+generation, Blender export and inspection stages with the web app's own
+stage runners and settings, streams status changes back through the queue
+and uploads the outputs to the shared artifact store. The web app publishes
+them once the job completes. Capacity scales by starting more nodes, on this
+host (SQLite queue) or others that can reach an HTTP-served queue and the store.
+
+    python pipeline_node.py --queue sqlite:///srv/golf/queue.db --store /srv/golf/artifacts
+    python pipeline_node.py --queue http://queue-host:5100 --store /mnt/golf/artifacts
+"""
+
+import os
+import sys
+import time
+import socket
+import shutil
+import argparse
+import threading
+
+import web_app
+from job_control import JobCancelled
+from job_queue import open_broker, open_store, HEARTBEAT_OK, HEARTBEAT_CANCELLED, DEFAULT_LEASE_SECONDS
+from progress_hub import ProgressHub
+
+IDLE_POLL_SECONDS = 1.0
+# Status updates are coalesced before they are written to the queue
+REPORT_RATE_HZ = 2.0
+
+class PipelineNode:
+    """Runs up to `concurrency` leased jobs at a time."""
+
+    def __init__(self, broker, store, worker_id, concurrency=1, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.broker = broker
+        self.store = store
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.stop_event = threading.Event()
+        self._tokens = {}
+        # Own scratch space, so a node sharing a host with the web app never touches its job directories
+        web_app.JOBS_DIR = os.path.join(web_app.JOBS_DIR, 'nodes', worker_id)
+        # Route the stage runners' status updates to the queue instead of Socket.IO rooms
+        web_app.progress_hub = ProgressHub(self._forward_status, max_rate_hz=REPORT_RATE_HZ)
+
+    def _forward_status(self, event, data, room):
+        token = self._tokens.get(room)
+        if token is not None:
+            try:
+                self.broker.report(room, token, data['delta'])
+            except OSError as e:
+                # An HTTP broker that is briefly unreachable; the final result still goes through
+                print(f"[WARN] {self.worker_id}: could not report status of job {room}: {e}")
+
+    def run(self):
+        """Lease and run jobs until stopped."""
+        threads = [threading.Thread(target=self._lease_loop, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print(f"[INFO] {self.worker_id}: stopping, cancelling running jobs")
+            self.stop_event.set()
+            for job_id in list(self._tokens):
+                web_app.job_handles[job_id].cancel("Worker node stopped")
+            for thread in threads:
+                thread.join()
+
+    def _lease_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                lease = self.broker.lease(self.worker_id, self.lease_seconds)
+            except OSError as e:
+                print(f"[WARN] {self.worker_id}: could not reach the job queue: {e}")
+                lease = None
+            if lease is None:
+                self.stop_event.wait(IDLE_POLL_SECONDS)
+                continue
+            try:
+                self.run_job(lease)
+            except Exception as e:
+                print(f"[ERROR] {self.worker_id}: job {lease.job_id} crashed: {e}")
+                self.broker.fail(lease.job_id, lease.token, str(e))
+
+    def _heartbeat(self, job_id, token, done):
+        """Renew the lease until the job finishes; cancel the job if asked to or if the lease is lost."""
+        handle = web_app.job_handles[job_id]
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                answer = self.broker.heartbeat(job_id, token, self.lease_seconds)
+            except OSError as e:
+                # Retried at the next beat; if the queue stays unreachable the lease expires
+                print(f"[WARN] {self.worker_id}: heartbeat for job {job_id} failed: {e}")
+                continue
+            if answer == HEARTBEAT_CANCELLED:
+                handle.cancel("Cancelled by user")
+            elif answer != HEARTBEAT_OK:
+                handle.cancel("Lease lost to another worker")
+                return
+
+    def run_job(self, lease):
+        """Run one leased job end to end."""
+        job_id, token = lease.job_id, lease.token
+        print(f"[INFO] {self.worker_id}: running job {job_id} (attempt {lease.attempts})")
+        web_app.create_job(lease.payload['prompt'], job_id=job_id, profile=lease.payload.get('profile', False))
+        self._tokens[job_id] = token
+        handle = web_app.job_handles[job_id]
+        paths = web_app.job_paths(job_id)
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, token, done), daemon=True)
+        heartbeat.start()
+        start = time.monotonic()
+        error, result = None, None
+        try:
+            success, error = web_app.run_dalle_generation(job_id, lease.payload['prompt'])
+            if success:
+                success, error = web_app.run_blender_export(job_id)
+            if success:
+                violations, fail_on_budget = web_app.inspect_export(job_id)
+                if violations and fail_on_budget:
+                    error = f"Export over budget: {'; '.join(violations)}"
+            if error is None:
+                handle.check()
+                web_app.update_job(job_id, current_step="Uploading artifacts", progress=85)
+                artifacts = {}
+                for name in ('image.png', 'exported_label.glb', 'inspection.json'):
+                    artifacts[name] = self.store.put(job_id, name, os.path.join(paths['dir'], name))
+                if os.path.isdir(paths['profiles']):
+                    for name in os.listdir(paths['profiles']):
+                        artifacts[f"profiles/{name}"] = self.store.put(
+                            job_id, f"profiles/{name}", os.path.join(paths['profiles'], name))
+                result = {'artifacts': artifacts, 'worker_id': self.worker_id,
+                          'seconds': round(time.monotonic() - start, 3), 'peak_rss_bytes': handle.peak_rss_bytes}
+        except JobCancelled as e:
+            error = str(e) or "Cancelled"
+        finally:
+            done.set()
+            # Send the last coalesced status before the job leaves the leased state
+            web_app.progress_hub.close(job_id)
+            self._tokens.pop(job_id, None)
+            web_app.jobs.pop(job_id, None)
+            web_app.job_handles.pop(job_id, None)
+            web_app.job_profilers.pop(job_id, None)
+            shutil.rmtree(paths['dir'], ignore_errors=True)
+
+        if result is not None:
+            accepted = self.broker.complete(job_id, token, result)
+        else:
+            accepted = self.broker.fail(job_id, token, error)
+        outcome = "done" if result is not None else f"failed: {error}"
+        if not accepted:
+            outcome += " (lease was lost, result discarded)"
+        print(f"[INFO] {self.worker_id}: job {job_id} {outcome} in {time.monotonic() - start:.1f}s")
+
+def run_node(queue_url, store_url, worker_id, concurrency, lease_seconds):
+    """Entry point for one node process."""
+    node = PipelineNode(open_broker(queue_url), open_store(store_url), worker_id, concurrency, lease_seconds)
+    print(f"[INFO] {worker_id}: pulling from {queue_url} ({concurrency} slot(s))")
+    node.run()
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run pipeline jobs from the shared job queue")
+    parser.add_argument("--queue", default=web_app.JOB_QUEUE_URL, help="Job queue URL (default: $JOB_QUEUE_URL)")
+    parser.add_argument("--store", default=web_app.ARTIFACT_STORE_URL,
+                        help="Artifact store URL (default: $ARTIFACT_STORE_URL)")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}", help="Name of this node")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at once by each process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start on this host")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="Visibility timeout; heartbeats renew it every third of this")
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_arguments()
+    if not args.queue:
+        print("[ERROR] No job queue given; use --queue or set JOB_QUEUE_URL")
+        sys.exit(1)
+    if args.processes <= 1:
+        run_node(args.queue, args.store, args.worker_id, args.concurrency, args.lease_seconds)
+        return
+
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=run_node, args=(args.queue, args.store, f"{args.worker_id}-{index}",
+                                               args.concurrency, args.lease_seconds))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
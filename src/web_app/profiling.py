@@ -0,0 +1,129 @@
+"""
+Opt-in per-job profiling.
+
+A JobProfiler writes, for each profiled stage, a cProfile dump (`.prof`,
+readable with pstats or snakeviz), a text summary of the top functions and
+a collapsed-stack file (`.folded`, for flamegraph.pl or speedscope) from a
+stack sampler that also catches time spent blocked on the network or locks.
+Stage wall times, including ones measured elsewhere such as inside Blender,
+are collected in summary.json next to them.
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+SUMMARY_NAME = 'summary.json'
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+
+def write_stats(profile, path_base, title):
+    """Dump a cProfile.Profile to <path_base>.prof and a top-functions summary to <path_base>.txt."""
+    profile.dump_stats(f"{path_base}.prof")
+    with open(f"{path_base}.txt", 'w') as f:
+        f.write(f"{title}\n\n")
+        stats = pstats.Stats(profile, stream=f)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        stats.sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+
+def list_profiles(directory):
+    """Names and sizes of the profile artifacts in a directory (empty if there are none)."""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        {'name': name, 'bytes': os.path.getsize(os.path.join(directory, name))}
+        for name in sorted(os.listdir(directory))
+    ]
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+class JobProfiler:
+    """Collects profiles and stage timings for one job in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.timings = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, name, seconds, **details):
+        """Add a stage timing to summary.json."""
+        with self._lock:
+            self.timings[name] = dict(seconds=round(seconds, 4), **details)
+            with open(os.path.join(self.directory, SUMMARY_NAME), 'w') as f:
+                json.dump(self.timings, f, indent=2)
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the calling thread for the duration of the block."""
+        sampler = StackSampler(threading.get_ident())
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile at a time per process; keep the sampler
+            profile = None
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            sampler.stop()
+            path_base = os.path.join(self.directory, name)
+            if profile is not None:
+                write_stats(profile, path_base, f"Stage '{name}': {elapsed:.3f}s wall")
+            sampler.write(f"{path_base}.folded")
+            self.record(name, elapsed, samples=sampler.samples, cprofile=profile is not None)
+
+    def wrap(self, name, target):
+        """Return target wrapped so each call is profiled as a stage (on whichever thread runs it)."""
+        def profiled(*args, **kwargs):
+            with self.stage(name):
+                return target(*args, **kwargs)
+        return profiled
+
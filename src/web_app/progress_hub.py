@@ -0,0 +1,121 @@
+"""
+Per-job progress fan-out for the web app.
+
+Each job gets a Socket.IO room. Status changes are sent as deltas carrying
+sequence numbers so clients can detect gaps and resync from a snapshot, and
+high-frequency updates are coalesced to at most `max_rate_hz` emits per room.
+"""
+
+import threading
+import time
+
+UPDATE_EVENT = 'job_update'
+
+class _Room:
+    """State for one job room."""
+
+    def __init__(self, state):
+        self.state = dict(state)
+        self.seq = 0
+        # State as clients see it after applying every emitted delta
+        self.emitted_state = dict(state)
+        self.emitted_seq = 0
+        self.pending = {}
+        self.last_emit = 0.0
+        self.timer = None
+
+class ProgressHub:
+    """Tracks per-job status and emits rate-limited delta updates to job rooms."""
+
+    def __init__(self, emit, max_rate_hz=10.0):
+        # emit(event, data, room) -- normally a bound SocketIO.emit
+        self._emit = emit
+        self._interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self._lock = threading.Lock()
+        self._rooms = {}
+        self.emit_count = 0
+
+    def open(self, job_id, state):
+        """Register a job with its initial state."""
+        with self._lock:
+            self._rooms[job_id] = _Room(state)
+
+    def close(self, job_id):
+        """Flush anything pending and forget the job's room."""
+        self.flush(job_id)
+        with self._lock:
+            room = self._rooms.pop(job_id, None)
+            if room and room.timer:
+                room.timer.cancel()
+
+    def publish(self, job_id, changes, urgent=False):
+        """Apply changes to a job's state and emit them, coalescing bursts.
+
+        Only keys whose values actually changed are sent. Urgent updates
+        (errors, completion) bypass the rate limit.
+        """
+        with self._lock:
+            room = self._rooms.get(job_id)
+            if room is None:
+                return
+            delta = {key: value for key, value in changes.items() if room.state.get(key) != value}
+            if not delta:
+                return
+            room.state.update(delta)
+            room.seq += 1
+            room.pending.update(delta)
+
+            wait = room.last_emit + self._interval - time.monotonic()
+            if urgent or wait <= 0:
+                message = self._take_pending(job_id, room)
+            else:
+                message = None
+                if room.timer is None:
+                    room.timer = threading.Timer(wait, self.flush, args=(job_id,))
+                    room.timer.daemon = True
+                    room.timer.start()
+        if message:
+            self._send(job_id, message)
+
+    def flush(self, job_id):
+        """Emit any coalesced changes for a job immediately."""
+        with self._lock:
+            room = self._rooms.get(job_id)
+            message = self._take_pending(job_id, room) if room else None
+        if message:
+            self._send(job_id, message)
+
+    def snapshot(self, job_id):
+        """Return a job's state as of its last emitted delta, or None.
+
+        Coalesced changes that have not been emitted yet are left out, so the
+        next delta's base_seq matches the snapshot's seq.
+        """
+        with self._lock:
+            room = self._rooms.get(job_id)
+            if room is None:
+                return None
+            return {'job_id': job_id, 'seq': room.emitted_seq, 'state': dict(room.emitted_state)}
+
+    def _take_pending(self, job_id, room):
+        """Build the next delta message and reset the room's pending state (lock held)."""
+        if room.timer is not None:
+            room.timer.cancel()
+            room.timer = None
+        if not room.pending:
+            return None
+        message = {
+            'job_id': job_id,
+            'base_seq': room.emitted_seq,
+            'seq': room.seq,
+            'delta': room.pending,
+        }
+        room.emitted_state.update(room.pending)
+        room.pending = {}
+        room.emitted_seq = room.seq
+        room.last_emit = time.monotonic()
+        return message
+
+    def _send(self, job_id, message):
+        self.emit_count += 1
+        self._emit(UPDATE_EVENT, message, room=job_id)
@@ -0,0 +1,154 @@
+"""
+Similar-prompt lookup over finished labels.
+
+Prompts are reduced to sets of normalized tokens and compared by cosine
+similarity of their TF-IDF vectors, so rewordings of the same design
+("elegant gold script logo" / "gold elegant script logo design") score close
+to 1 while prompts sharing only common words score low. Token postings are
+kept in growable int32 arrays, so a lookup only touches the documents that
+share a token with the query and costs a few NumPy operations even with
+100k stored prompts.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import threading
+from array import array
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(("a", "an", "and", "the", "of", "for", "with", "in", "on", "to", "by", "at", "is", "it", "its"))
+# Document norms use the IDF weights from the last rebuild; rebuild once the collection grows by this much
+REWEIGHT_GROWTH = 0.1
+
+def prompt_tokens(prompt):
+    """The normalized token set of a prompt: lowercase words and numbers, minus stopwords and plural 's'."""
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(prompt.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token)
+    return frozenset(tokens)
+
+class PromptIndex:
+    """Finished prompts and where their outputs live, searchable by TF-IDF cosine similarity.
+
+    Prompts with the same token set share one entry, pointing at the most
+    recent outputs. Entries are appended to a JSON-lines file and replayed on
+    start-up.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._vocabulary = {}      # token -> column
+        self._postings = []        # column -> array('i') of entry ids
+        self._entries = []         # entry id -> details ({'prompt', 'dir', ...})
+        self._entry_tokens = []    # entry id -> tuple of columns
+        self._by_tokens = {}       # token set -> entry id
+        self._norms = array("d")
+        self._idf = []
+        self._weighted_count = 0
+        if path and os.path.exists(path):
+            self._replay()
+        elif path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _replay(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._add(entry)
+        self._reweight()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _idf_of(self, column):
+        # Smoothed, so a token in every prompt still counts a little
+        return math.log((1 + len(self._entries)) / (1 + len(self._postings[column]))) + 1.0
+
+    def _reweight(self):
+        """Recompute IDF weights and every entry's norm (lock held)."""
+        self._idf = [self._idf_of(column) for column in range(len(self._postings))]
+        self._norms = array("d", (math.sqrt(sum(self._idf[column] ** 2 for column in columns))
+                                  for columns in self._entry_tokens))
+        self._weighted_count = len(self._entries)
+
+    def _weight(self, column):
+        return self._idf[column] if column < len(self._idf) else self._idf_of(column)
+
+    def _add(self, entry):
+        """Index one entry (lock held). Returns its id."""
+        tokens = prompt_tokens(entry["prompt"])
+        if not tokens:
+            return None
+        existing = self._by_tokens.get(tokens)
+        if existing is not None:
+            self._entries[existing] = entry
+            return existing
+        entry_id = len(self._entries)
+        columns = []
+        for token in sorted(tokens):
+            column = self._vocabulary.get(token)
+            if column is None:
+                column = self._vocabulary[token] = len(self._postings)
+                self._postings.append(array("i"))
+            self._postings[column].append(entry_id)
+            columns.append(column)
+        self._entries.append(entry)
+        self._entry_tokens.append(tuple(columns))
+        self._by_tokens[tokens] = entry_id
+        self._norms.append(math.sqrt(sum(self._weight(column) ** 2 for column in columns)))
+        return entry_id
+
+    def add(self, prompt, directory, **details):
+        """Record a finished prompt and the directory holding its outputs."""
+        entry = dict(details, prompt=prompt, dir=directory, created_at=time.time())
+        with self._lock:
+            if self._add(entry) is None:
+                return
+            if len(self._entries) > self._weighted_count * (1 + REWEIGHT_GROWTH):
+                self._reweight()
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    # Still searchable until a restart; publishing the job must not fail over it
+                    print(f"[WARN] Could not record prompt in {self.path}: {e}")
+
+    def search(self, prompt, k=5, min_score=0.0):
+        """Up to k (score, entry) pairs most similar to the prompt, best first."""
+        import numpy as np
+
+        tokens = prompt_tokens(prompt)
+        with self._lock:
+            columns = [self._vocabulary[token] for token in tokens if token in self._vocabulary]
+            if not columns:
+                return []
+            # Unknown query tokens still count towards the query's norm
+            unknown = len(tokens) - len(columns)
+            unknown_weight = math.log(1 + len(self._entries)) + 1.0
+            query_norm = math.sqrt(sum(self._weight(column) ** 2 for column in columns) + unknown * unknown_weight ** 2)
+            ids = np.concatenate([np.frombuffer(self._postings[column], dtype=np.int32) for column in columns])
+            weights = np.concatenate([np.full(len(self._postings[column]), self._weight(column) ** 2)
+                                      for column in columns])
+            dots = np.bincount(ids, weights=weights, minlength=len(self._entries))
+            norms = np.frombuffer(self._norms, dtype=np.float64)
+            candidates = np.flatnonzero(dots)
+            scores = dots[candidates] / (norms[candidates] * query_norm)
+            keep = scores >= min_score
+            candidates, scores = candidates[keep], scores[keep]
+            if len(candidates) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                candidates, scores = candidates[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+            return [(min(float(scores[i]), 1.0), dict(self._entries[candidates[i]])) for i in order]
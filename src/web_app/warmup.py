@@ -0,0 +1,215 @@
+"""
+Result cache and background warm-up for standard prompts.
+
+The warm-up runs the image and Blender stages for a configured list of
+prompts while the pipeline is otherwise idle and stores the outputs in a
+result cache keyed by the normalized prompt, so the first customer request
+for one of those designs is served from the cache instead of paying for
+generation and export.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+CACHED_FILES = ('image.png', 'exported_label.glb', 'inspection.json')
+REQUIRED_FILES = ('image.png', 'exported_label.glb')
+META_NAME = 'meta.json'
+IDLE_POLL_SECONDS = 1.0
+MAX_PREEMPTIONS = 3
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a prompt, used as its cache key."""
+    return ' '.join(prompt.lower().split()).rstrip('.')
+
+def load_prompts(path):
+    """Prompts from a JSON list or a text file with one prompt per line ('#' starts a comment line)."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            prompts = json.load(f)
+        else:
+            prompts = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    unique = {}
+    for prompt in prompts:
+        unique.setdefault(normalize_prompt(prompt), prompt)
+    return list(unique.values())
+
+class ResultCache:
+    """Finished pipeline outputs on disk, one directory per normalized prompt."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_dir(self, prompt):
+        key = hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, key)
+
+    def _load(self, prompt):
+        entry_dir = self._entry_dir(prompt)
+        try:
+            with open(os.path.join(entry_dir, META_NAME)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(os.path.join(entry_dir, name)) for name in REQUIRED_FILES):
+            return None
+        meta['dir'] = entry_dir
+        return meta
+
+    def get(self, prompt):
+        """The cache entry for a prompt ({'dir', 'prompt', 'created_at', ...}) or None, counting hits."""
+        entry = self._load(prompt)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def age(self, prompt):
+        """Seconds since the prompt's entry was stored, or None if it isn't cached."""
+        entry = self._load(prompt)
+        return None if entry is None else time.time() - entry['created_at']
+
+    def put(self, prompt, source_dir, **details):
+        """Copy a job's outputs into the cache, replacing any previous entry for the prompt."""
+        entry_dir = self._entry_dir(prompt)
+        staging = f"{entry_dir}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(staging)
+        try:
+            for name in CACHED_FILES:
+                source = os.path.join(source_dir, name)
+                if os.path.exists(source):
+                    shutil.copyfile(source, os.path.join(staging, name))
+            with open(os.path.join(staging, META_NAME), 'w') as f:
+                json.dump(dict(details, prompt=prompt, created_at=time.time()), f, indent=2)
+            # Directories can't be swapped atomically everywhere; a reader in the gap just sees a miss
+            retired = None
+            if os.path.exists(entry_dir):
+                retired = f"{entry_dir}.old-{uuid.uuid4().hex[:8]}"
+                os.replace(entry_dir, retired)
+            os.replace(staging, entry_dir)
+            if retired:
+                shutil.rmtree(retired, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return entry_dir
+
+    def stats(self):
+        entries = sum(1 for name in os.listdir(self.directory) if '.' not in name)
+        lookups = self.hits + self.misses
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+class WarmupScheduler:
+    """Warms the result cache from a prompt list, once at start-up and/or on an interval.
+
+    run_prompt(prompt) runs one low-priority job and stores its outputs,
+    returning 'done', 'preempted' or an error message. Prompts are only
+    started while is_idle() is true, one at a time; a job preempted by
+    interactive work is retried once the pipeline is idle again.
+    """
+
+    def __init__(self, run_prompt, load_prompt_list, cache, is_idle, interval=None, refresh_after=None,
+                 on_progress=None):
+        self.run_prompt = run_prompt
+        self.load_prompt_list = load_prompt_list
+        self.cache = cache
+        self.is_idle = is_idle
+        self.interval = interval
+        self.refresh_after = refresh_after
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._trigger = threading.Event()
+        self._thread = None
+        self.status = {'running': False, 'total': 0, 'completed': 0, 'skipped': 0, 'failed': 0,
+                       'current_prompt': None, 'started_at': None, 'finished_at': None,
+                       'next_run_at': None, 'errors': []}
+
+    def _update(self, **changes):
+        with self._lock:
+            self.status.update(changes)
+            snapshot = dict(self.status, errors=list(self.status['errors']))
+        if self.on_progress:
+            self.on_progress(snapshot)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.status, errors=list(self.status['errors']))
+
+    def _needs_warming(self, prompt):
+        age = self.cache.age(prompt)
+        return age is None or (self.refresh_after is not None and age > self.refresh_after)
+
+    def _wait_for_idle(self):
+        while not self.is_idle():
+            time.sleep(IDLE_POLL_SECONDS)
+
+    def run_once(self):
+        """Warm every listed prompt that isn't cached (or is older than refresh_after)."""
+        try:
+            prompts = self.load_prompt_list()
+        except (OSError, ValueError) as e:
+            self._update(errors=[f"Could not load warm-up prompts: {e}"])
+            print(f"[ERROR] Could not load warm-up prompts: {e}")
+            return
+        self._update(running=True, total=len(prompts), completed=0, skipped=0, failed=0, errors=[],
+                     started_at=time.time(), finished_at=None, next_run_at=None)
+        print(f"[INFO] Warm-up started: {len(prompts)} prompts")
+        for index, prompt in enumerate(prompts, 1):
+            if not self._needs_warming(prompt):
+                self._update(skipped=self.status['skipped'] + 1)
+                continue
+            self._update(current_prompt=prompt)
+            result = 'preempted'
+            for _ in range(MAX_PREEMPTIONS + 1):
+                self._wait_for_idle()
+                result = self.run_prompt(prompt)
+                if result != 'preempted':
+                    break
+            if result == 'done':
+                self._update(completed=self.status['completed'] + 1)
+                print(f"[INFO] Warm-up {index}/{len(prompts)} cached: {prompt[:60]}")
+            else:
+                error = "Preempted too many times" if result == 'preempted' else result
+                self._update(failed=self.status['failed'] + 1,
+                             errors=self.status['errors'] + [{'prompt': prompt, 'error': error}])
+                print(f"[WARN] Warm-up {index}/{len(prompts)} failed: {error}")
+        self._update(running=False, current_prompt=None, finished_at=time.time())
+        print(f"[INFO] Warm-up finished: {self.status['completed']} generated, "
+              f"{self.status['skipped']} already cached, {self.status['failed']} failed")
+
+    def _loop(self, run_now):
+        while True:
+            if run_now:
+                self.run_once()
+            if self.interval:
+                self._update(next_run_at=time.time() + self.interval)
+            # Wait for the next scheduled run, or an explicit trigger
+            run_now = self._trigger.wait(self.interval) or bool(self.interval)
+            self._trigger.clear()
+
+    def start(self, run_now=True):
+        """Start the background thread (once). With run_now, warm immediately; otherwise wait for the schedule."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._loop, args=(run_now,), daemon=True)
+            self._thread.start()
+        return True
+
+    def trigger(self):
+        """Start a warm-up pass now (no-op while one is running)."""
+        if self.start(run_now=True):
+            return True
+        if self.snapshot()['running']:
+            return False
+        self._trigger.set()
+        return True
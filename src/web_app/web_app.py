@@ -5,11 +5,17 @@ import threading
 import time
 import json
 import uuid
+import shutil
+import hashlib
+import contextlib
 from pathlib import Path
 from flask import Flask, render_template, request, jsonify, send_from_directory
-from flask_socketio import SocketIO, emit
-import webbrowser
-import requests
+from progress_hub import ProgressHub
+from job_control import JobHandle, JobCancelled, StageTimeout
+from admission import AdmissionController, PRIORITY_CLASSES, GIB
+
+# flask_socketio, requests and webbrowser are imported on first use so that
+# importing this module (tools, benchmarks, spawned helpers) stays cheap.
 
 app = Flask(
     __name__,
@@ -17,18 +23,116 @@ app = Flask(
     static_folder=os.path.join(os.path.dirname(__file__), "static")
 )
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-socketio = SocketIO(app, cors_allowed_origins="*")
+_socketio = None
+
+def get_socketio():
+    """Create the Socket.IO server on first use and register its handlers."""
+    global _socketio
+    if _socketio is None:
+        from flask_socketio import SocketIO
+        _socketio = SocketIO(app, cors_allowed_origins="*")
+        _socketio.on_event('connect', handle_connect)
+        _socketio.on_event('disconnect', handle_disconnect)
+        _socketio.on_event('subscribe', handle_subscribe)
+        _socketio.on_event('unsubscribe', handle_unsubscribe)
+    return _socketio
 
 # --- CONFIG ---
 IMAGE_PATH = os.path.join(os.path.dirname(__file__), '../../assets/images/image.png')
 GLB_OUTPUT_PATH = os.path.join(os.path.dirname(__file__), '../../assets/models/exported_label.glb')
 BLEND_FILE = os.path.join(os.path.dirname(__file__), '../../assets/blend_files/Golf.blend')
+GENERATE_GLB_SCRIPT = os.path.join(os.path.dirname(__file__), '../blender/generate_label_glb.py')
 BLENDER_DIR = r"C:\Program Files\Blender Foundation\Blender 4.4"
 BLENDER_EXE = os.path.join(BLENDER_DIR, "blender.exe")
 WEB_APP_DIR = os.path.join(os.path.dirname(__file__), '../viewer/w3')
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '../../scripts')
+PIPELINE_DIR = os.path.join(os.path.dirname(__file__), '../pipeline')
+JOBS_DIR = os.path.join(os.path.dirname(__file__), '../../assets/jobs')
+DEBUG = True
+# Start the Node viewer and open a browser when a job completes (off for headless/load-test runs)
+LAUNCH_VIEWER = True
+# A new job from the same browser session replaces that session's running job
+PREEMPT_SAME_SESSION = True
+# Running jobs are cancelled when their session has had no socket for this long
+DISCONNECT_CANCEL_GRACE_SECONDS = 15
+# Finished jobs keep their status and progress room for FINISHED_JOB_TTL_SECONDS. After that only jobs that
+# produced a label stay listed (for /api/labels and catalogs), the newest MAX_FINISHED_LABELS of them
+FINISHED_JOB_TTL_SECONDS = 3600
+MAX_FINISHED_LABELS = 1000
+# Per-stage deadlines in seconds
+STAGE_TIMEOUTS = {
+    'generate': 180,
+    'blender': 600,
+}
+# GLB budget profile checked after export (see src/pipeline/glb_inspect.py)
+EXPORT_PROFILE = 'default'
+# rlimit caps for spawned Blender processes (POSIX only)
+BLENDER_MEMORY_LIMIT_BYTES = 8 * GIB
+BLENDER_CPU_LIMIT_SECONDS = 900
+# CPU-rendered thumbnails of exported GLBs, cached by GLB content hash
+THUMBNAILS_DIR = os.path.join(os.path.dirname(__file__), '../../assets/thumbnails')
+THUMBNAIL_SIZE = 256
+THUMBNAIL_WORKERS = 1
+# Shared job queue for distributed workers (pipeline_node.py), e.g. sqlite:///srv/golf/queue.db on one host
+# or http://queue-host:5100 (job_queue.py serve) across machines.
+# When unset, jobs run in this process.
+JOB_QUEUE_URL = os.environ.get('JOB_QUEUE_URL')
+ARTIFACT_STORE_URL = os.environ.get('ARTIFACT_STORE_URL',
+                                    os.path.join(os.path.dirname(__file__), '../../assets/artifacts'))
+QUEUE_POLL_INTERVAL = 0.5
+# Profile every job (PROFILE_JOBS=1); single jobs can opt in with "profile": true in /api/generate
+PROFILE_JOBS = os.environ.get('PROFILE_JOBS') == '1'
+# Result cache warm-up: prompts from WARMUP_PROMPTS_FILE (one per line, or a JSON list; defaults to the
+# generator's DEFAULT_PROMPT) run in the background while the pipeline is idle, at or after start-up
+# and every WARMUP_INTERVAL_SECONDS, and /api/generate serves those prompts from the cache.
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '../../assets/result_cache')
+WARMUP_PROMPTS_FILE = os.environ.get('WARMUP_PROMPTS_FILE')
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START') == '1'
+WARMUP_INTERVAL_SECONDS = float(os.environ.get('WARMUP_INTERVAL_SECONDS', 0)) or None
+# Re-generate cached prompts older than this on later passes; None keeps them until deleted
+WARMUP_REFRESH_SECONDS = None
+# CPU priority for warm-up subprocesses (nice value; below-normal/idle priority class on Windows)
+WARMUP_NICENESS = 19
+# Variants mode ("variants": k in /api/generate): k images are generated concurrently and previewed; only
+# the one the user selects is exported, or the first ready one speculatively while the pipeline is idle
+MAX_VARIANTS = 4
+VARIANT_PREVIEW_WIDTH = 384
+SPECULATIVE_EXPORT = True
+VARIANT_SELECTION_TIMEOUT_SECONDS = 3600
+# Reuse the GLB exported for a perceptually identical label image (dHash within PHASH_MAX_DISTANCE of
+# 64 bits, same scene and export script, confirmed on a 128x128 downscale) instead of running Blender
+# again; hit rates in /api/reuse
+EXPORT_INDEX_DIR = os.path.join(os.path.dirname(__file__), '../../assets/export_index')
+PHASH_REUSE = True
+PHASH_MAX_DISTANCE = 0
+PHASH_MAX_ENTRIES = 500
+# Catalog GLBs (POST /api/catalog): finished labels instanced on one shared ball, atlas pixels per label
+CATALOG_MAX_LABELS = 256
+CATALOG_CELL_WIDTH = 512
+# Scheduling: /api/generate jobs are 'interactive' unless the request asks for "priority": "watcher" or
+# "batch"; warm-ups and speculative exports run as 'batch'. Within a class, clients (X-API-Key header, else
+# browser session, else address) are admitted in turn, weighted by CLIENT_WEIGHTS (API key -> weight).
+# A waiting job moves up a class every AGING_SECONDS; lower classes leave RESERVED_INTERACTIVE_SLOTS free.
+AGING_SECONDS = 120
+RESERVED_INTERACTIVE_SLOTS = 1
+CLIENT_WEIGHTS = {}
+# Similar prompts: finished prompts are indexed by token set (TF-IDF cosine). /api/generate serves the outputs
+# of a previous prompt scoring at least SIMILAR_PROMPT_SERVE_THRESHOLD instead of generating (unless "fresh"),
+# and otherwise lists up to SIMILAR_PROMPT_OFFERS matches scoring at least SIMILAR_PROMPT_OFFER_THRESHOLD
+PROMPT_INDEX_PATH = os.path.join(os.path.dirname(__file__), '../../assets/prompt_index.jsonl')
+SIMILAR_PROMPT_SERVE_THRESHOLD = 0.9
+SIMILAR_PROMPT_OFFER_THRESHOLD = 0.5
+SIMILAR_PROMPT_OFFERS = 3
+# Two-phase export for interactive jobs: Blender first writes a low-poly preview with a downscaled label, which
+# the viewer shows while the full-quality export finishes and replaces it (job status 'preview' and 'final')
+PREVIEW_EXPORT = True
+# Budget profile a preview must meet to be published (see src/pipeline/glb_inspect.py)
+PREVIEW_PROFILE = 'preview'
+PREVIEW_POLL_SECONDS = 0.1
 
-# Global variables for pipeline status
+# Global variables for pipeline status (mirrors the most recent job)
 pipeline_status = {
+    'job_id': None,
     'is_running': False,
     'current_step': None,
     'progress': 0,
@@ -36,60 +140,568 @@ pipeline_status = {
     'web_viewer_url': None
 }
 
-def check_dependencies():
-    """Check if all required dependencies exist."""
+# Per-job status, keyed by job id
+jobs = {}
+job_handles = {}
+job_profilers = {}
+# Coarse color grid of each job's image, kept until its export is indexed
+job_image_colors = {}
+# Manifest each job's published preview replaced, kept until its final export replaces the preview
+job_preview_manifests = {}
+# Socket ids per browser session, and pending disconnect cancellations
+session_sids = {}
+sid_sessions = {}
+disconnect_timers = {}
+sessions_lock = threading.Lock()
+_image_pool = None
+_thumbnail_executor = None
+_broker = None
+_artifact_store = None
+_queue_monitor = None
+_result_cache = None
+_warmup = None
+_export_index = None
+_prompt_index = None
+# Speculative exports of variants, keyed by job id
+speculative_exports = {}
+variants_lock = threading.Lock()
+progress_hub = ProgressHub(lambda event, data, room: get_socketio().emit(event, data, room=room))
+admission = AdmissionController(aging_seconds=AGING_SECONDS, reserved_interactive_slots=RESERVED_INTERACTIVE_SLOTS)
+
+def job_paths(job_id):
+    """Per-job working files; published to IMAGE_PATH/GLB_OUTPUT_PATH only on success."""
+    job_dir = os.path.join(JOBS_DIR, job_id)
+    return {
+        'dir': job_dir,
+        'image': os.path.join(job_dir, 'image.png'),
+        'glb': os.path.join(job_dir, 'exported_label.glb'),
+        'preview': os.path.join(job_dir, 'preview_label.glb'),
+        'profiles': os.path.join(job_dir, 'profiles'),
+    }
+
+def variant_paths(job_id, index):
+    """Working files of one candidate in a variants job."""
+    variant_dir = os.path.join(JOBS_DIR, job_id, 'variants', str(index))
+    return {
+        'dir': variant_dir,
+        'image': os.path.join(variant_dir, 'image.png'),
+        'preview': os.path.join(variant_dir, 'preview.jpg'),
+        'glb': os.path.join(variant_dir, 'exported_label.glb'),
+    }
+
+def publish_artifact(source, destination):
+    """Atomically replace destination with a copy of source.
+
+    The copy goes to a temporary name of its own, since concurrent jobs may publish to the same destination.
+    """
+    tmp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+def inspect_export(job_id):
+    """Inspect the job's GLB, record the report next to it and check the export budget.
+
+    Returns the list of budget violations and whether they should fail the job.
+    """
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from glb_inspect import inspect_glb, check_budgets, EXPORT_PROFILES
+    paths = job_paths(job_id)
+    report = inspect_glb(paths['glb'])
+    violations = check_budgets(report, EXPORT_PROFILE)
+    with open(os.path.join(paths['dir'], 'inspection.json'), 'w') as f:
+        json.dump({'profile': EXPORT_PROFILE, 'violations': violations, 'report': report}, f, indent=2)
+    update_job(job_id, inspection={
+        'profile': EXPORT_PROFILE,
+        'file_bytes': report['file_bytes'],
+        'triangles': report['scene_triangles'],
+        'textures': [f"{image['width']}x{image['height']} {image['mime_type']}" for image in report['images']],
+        'violations': violations
+    })
+    return violations, EXPORT_PROFILES[EXPORT_PROFILE]['action'] == 'fail'
+
+def publish_split_label(job_id):
+    """Publish the job's hashed geometry/texture assets and manifest for the viewer."""
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from label_delivery import publish_split_assets
+    paths = job_paths(job_id)
+    return publish_split_assets(paths['glb'], paths['image'], os.path.dirname(GLB_OUTPUT_PATH), job_id=job_id)
+
+def get_thumbnail_executor():
+    """Create the thumbnail rendering pool on first use."""
+    global _thumbnail_executor
+    if _thumbnail_executor is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Spawned workers inherit sys.path, so the pipeline modules must be importable first
+        if PIPELINE_DIR not in sys.path:
+            sys.path.insert(0, PIPELINE_DIR)
+        _thumbnail_executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+    return _thumbnail_executor
+
+def request_thumbnail(job_id):
+    """Render the job's thumbnail in the background; its URL is published when ready."""
+    executor = get_thumbnail_executor()
+    from thumbnail import render_thumbnail_cached
+    start = time.monotonic()
+    future = executor.submit(render_thumbnail_cached, job_paths(job_id)['glb'], THUMBNAILS_DIR, THUMBNAIL_SIZE)
+
+    def on_done(done):
+        try:
+            name = done.result()
+        except Exception as e:
+            print(f"[WARN] Thumbnail for job {job_id} failed: {e}")
+            return
+        update_job(job_id, thumbnail_url=f"/thumbnails/{name}",
+                   thumbnail_seconds=round(time.monotonic() - start, 3))
+
+    future.add_done_callback(on_done)
+    return future
+
+def create_job(prompt, session_id=None, job_id=None, profile=False, warmup=False, variants=None,
+               priority='interactive', client=None, client_weight=1.0):
+    """Register a new job, its working directory and cancel handle, and open its progress room."""
+    prune_finished_jobs()
+    job_id = job_id or uuid.uuid4().hex[:12]
+    os.makedirs(job_paths(job_id)['dir'], exist_ok=True)
+    job_handles[job_id] = JobHandle(job_id, session_id, niceness=WARMUP_NICENESS if warmup else 0)
+    if profile:
+        from profiling import JobProfiler
+        job_profilers[job_id] = JobProfiler(job_paths(job_id)['profiles'])
+    state = {
+        'job_id': job_id,
+        'prompt': prompt,
+        'is_running': True,
+        'current_step': None,
+        'progress': 0,
+        'error': None,
+        'cancelled': False,
+        'web_viewer_url': pipeline_status['web_viewer_url'],
+        'created_at': time.time(),
+        'profiles_url': f"/api/jobs/{job_id}/profiles" if profile else None,
+        'warmup': warmup,
+        'variants': [{'index': index, 'status': 'pending', 'preview_url': None} for index in range(variants)]
+                    if variants else None,
+        'awaiting_selection': False,
+        'selected_variant': None,
+        'priority': priority,
+        'client': client,
+        'client_weight': client_weight
+    }
+    jobs[job_id] = state
+    progress_hub.open(job_id, state)
+    return job_id
+
+def is_label_job(job):
+    """True for a finished job that produced a label."""
+    return not job['is_running'] and not job['error'] and not job['cancelled'] and not job['warmup']
+
+def forget_job(job_id, keep_label=False):
+    """Close a finished job's progress room and drop its handle; with keep_label, its status stays listed."""
+    progress_hub.close(job_id)
+    job_handles.pop(job_id, None)
+    if not keep_label:
+        jobs.pop(job_id, None)
+        job_profilers.pop(job_id, None)
+
+def prune_finished_jobs():
+    """Forget jobs finished more than FINISHED_JOB_TTL_SECONDS ago, and labels beyond MAX_FINISHED_LABELS."""
+    cutoff = time.time() - FINISHED_JOB_TTL_SECONDS
+    labels = []
+    for job_id, job in list(jobs.items()):
+        if job['is_running'] or job['awaiting_selection']:
+            continue
+        if is_label_job(job):
+            labels.append(job)
+        if job.get('finished_at', job['created_at']) < cutoff and job_id in job_handles:
+            forget_job(job_id, keep_label=is_label_job(job))
+    labels.sort(key=lambda job: job['created_at'], reverse=True)
+    for job in labels[MAX_FINISHED_LABELS:]:
+        forget_job(job['job_id'])
+
+def admission_class(job_id):
+    """The job's scheduling arguments for admission.acquire()."""
+    job = jobs[job_id]
+    return {'priority': job['priority'], 'client': job['client'], 'weight': job['client_weight']}
+
+def request_client(data):
+    """(client id, weight) of a request: its API key, else its browser session, else its address.
+
+    Keys and sessions are hashed, since the id is published with the job's status.
+    """
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        return f"key-{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]}", CLIENT_WEIGHTS.get(api_key, 1.0)
+    session_id = data.get('session_id')
+    if session_id:
+        return f"session-{hashlib.sha256(str(session_id).encode('utf-8')).hexdigest()[:12]}", 1.0
+    return f"addr-{request.remote_addr}", 1.0
+
+def update_job(job_id, urgent=False, **changes):
+    """Update a job's status and publish the change to its room."""
+    job = jobs.get(job_id)
+    if job is None:
+        # Already forgotten (a late thumbnail of a pruned job)
+        return
+    if changes.get('is_running') is False and job['is_running']:
+        changes['finished_at'] = time.time()
+    job.update(changes)
+    if pipeline_status['job_id'] == job_id:
+        pipeline_status.update({key: value for key, value in changes.items() if key in pipeline_status})
+    progress_hub.publish(job_id, changes, urgent=urgent)
+
+def is_job_id(value):
+    """True for strings shaped like the ids create_job() hands out (safe to use in paths)."""
+    return len(value) == 12 and all(c in '0123456789abcdef' for c in value)
+
+def profile_stage(job_id, name):
+    """Profile a block as one of the job's stages if the job is profiled; a no-op otherwise."""
+    profiler = job_profilers.get(job_id)
+    return profiler.stage(name) if profiler else contextlib.nullcontext()
+
+def discard_job_files(job_id):
+    """Drop a stopped job's partial artifacts, keeping its profiles for diagnosing slow jobs."""
+    paths = job_paths(job_id)
+    if job_id not in job_profilers:
+        shutil.rmtree(paths['dir'], ignore_errors=True)
+        return
+    for name in os.listdir(paths['dir']):
+        path = os.path.join(paths['dir'], name)
+        if path == paths['profiles']:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+def cancel_job(job_id, reason="Cancelled by user"):
+    """Cancel a job: kill its subprocesses, stop waiting on its steps and free its slot."""
+    handle = job_handles.get(job_id)
+    if handle is None or not jobs[job_id]['is_running']:
+        return False
+    if not handle.cancel(reason):
+        return False
+    if JOB_QUEUE_URL:
+        get_broker().cancel(job_id)
+    with variants_lock:
+        speculative = speculative_exports.pop(job_id, None)
+    if speculative:
+        speculative['handle'].cancel(reason)
+    update_job(job_id, urgent=True, is_running=False, cancelled=True, current_step="Cancelled", error=None)
+    if jobs[job_id]['awaiting_selection']:
+        # No worker is left to clean up after a job that was waiting for the user's pick
+        update_job(job_id, awaiting_selection=False)
+        discard_job_files(job_id)
+    print(f"[INFO] Job {job_id} cancelled: {reason}")
+    return True
+
+def running_jobs_for_session(session_id):
+    """Ids of running jobs started by a browser session."""
+    return [
+        job_id for job_id, handle in job_handles.items()
+        if session_id and handle.session_id == session_id and jobs[job_id]['is_running']
+    ]
+
+def cancel_abandoned_session(session_id):
+    """Cancel a session's jobs if none of its sockets came back."""
+    with sessions_lock:
+        disconnect_timers.pop(session_id, None)
+        if session_sids.get(session_id):
+            return
+    for job_id in running_jobs_for_session(session_id):
+        cancel_job(job_id, "Client disconnected")
+
+def get_env_probe():
+    """Shared, cached toolchain probe (see src/pipeline/env_probe.py)."""
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from env_probe import get_probe
+    return get_probe()
+
+def resolve_blender():
+    """BLENDER_EXE if it exists, otherwise Blender found on PATH or TOOL_SEARCH_PATH."""
+    return get_env_probe().tool('blender', BLENDER_EXE).path or BLENDER_EXE
+
+def probe_environment():
+    """Probe tools and required files concurrently. Tool results are cached between calls."""
+    tools = {'blender': BLENDER_EXE}
+    if LAUNCH_VIEWER:
+        tools.update({'node': None, 'npm': None})
+    files = {
+        'env_file': '.env',
+        'blend_file': BLEND_FILE,
+        'generate_script': os.path.join(SCRIPTS_DIR, 'generate_image_with_dalle.py'),
+        'blender_script': os.path.join(os.path.dirname(__file__), '../blender/generate_label_glb.py'),
+        'viewer_dir': WEB_APP_DIR,
+    }
+    return get_env_probe().check(tools, files)
+
+def dependency_issues(results):
+    """Human-readable problems from probe_environment() results."""
+    messages = {
+        'env_file': "Missing .env file with OpenAI API key",
+        'blender': f"Blender not found at: {BLENDER_EXE} (or on PATH)",
+        'blend_file': f"Blender file not found: {BLEND_FILE}",
+        'viewer_dir': f"Web app directory not found: {WEB_APP_DIR}",
+    }
     issues = []
-    
-    # Check .env file
-    if not os.path.exists(".env"):
-        issues.append("Missing .env file with OpenAI API key")
-    
-    # Check Blender
-    if not os.path.exists(BLENDER_EXE):
-        issues.append(f"Blender not found at: {BLENDER_EXE}")
-    
-    # Check .blend file
-    if not os.path.exists(BLEND_FILE):
-        issues.append(f"Blender file not found: {BLEND_FILE}")
-    
-    # Check required scripts
-    required_scripts = [os.path.join(os.path.dirname(__file__), '../../scripts/generate_image_with_dalle.py'), os.path.join(os.path.dirname(__file__), '../blender/generate_label_glb.py')]
-    for script in required_scripts:
-        if not os.path.exists(script):
-            issues.append(f"Required script not found: {script}")
-    
-    # Check web app directory
-    if not os.path.exists(WEB_APP_DIR):
-        issues.append(f"Web app directory not found: {WEB_APP_DIR}")
-    
+    for name, result in results.items():
+        if result.ok:
+            continue
+        if name.endswith('_script'):
+            issues.append(f"Required script not found: {result.path}")
+        elif name == 'blender' and result.path:
+            issues.append(f"Blender at {result.path} does not run: {result.detail}")
+        else:
+            issues.append(messages.get(name, result.detail))
     return issues
 
-def run_pipeline_step(step_name, command, step_progress):
+def check_dependencies():
+    """Check if all required dependencies exist."""
+    return dependency_issues(probe_environment())
+
+def run_pipeline_step(job_id, step_name, command, step_progress, timeout=None, memory_limit=None, cpu_limit=None,
+                      env=None):
     """Run a pipeline step and emit progress updates."""
+    update_job(job_id, current_step=step_name, progress=step_progress)
+    
+    returncode, stdout, stderr = job_handles[job_id].run_process(
+        command, stage=step_name, timeout=timeout, memory_limit=memory_limit, cpu_limit=cpu_limit, env=env
+    )
+    if returncode != 0:
+        return False, f"{step_name} failed: {stderr}"
+    return True, None
+
+def get_image_pool():
+    """Create the image post-processing pool on first use."""
+    global _image_pool
+    if _image_pool is None:
+        from image_pool import ImageProcessingPool
+        _image_pool = ImageProcessingPool()
+    return _image_pool
+
+def pool_processor(busy):
+    """The image pool's process(), setting the busy event if it gave up because the pool stayed saturated.
+
+    The generator only reports success or failure, so this is how a job
+    learns that it failed for lack of capacity rather than a bad image.
+    """
+    from image_pool import PoolSaturated
+    pool = get_image_pool()
+
+    def process(data, size):
+        try:
+            return pool.process(data, size)
+        except PoolSaturated:
+            busy.set()
+            raise
+    return process
+
+def run_dalle_generation(job_id, prompt):
+    """Run DALL-E image generation in-process, with image post-processing in the pool."""
+    update_job(job_id, current_step="Generating Image with DALL-E", progress=25)
+    handle = job_handles[job_id]
+    busy = threading.Event()
     try:
-        pipeline_status['current_step'] = step_name
-        pipeline_status['progress'] = step_progress
-        socketio.emit('pipeline_update', pipeline_status)
-        
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return True, None
-    except subprocess.CalledProcessError as e:
-        return False, f"{step_name} failed: {e.stderr}"
-
-def run_dalle_generation(prompt):
-    """Run DALL-E image generation."""
-    command = [sys.executable, os.path.join(os.path.dirname(__file__), '../../scripts/generate_image_with_dalle.py'), '--prompt', prompt]
-    return run_pipeline_step("Generating Image with DALL-E", command, 25)
-
-def run_blender_export():
-    """Run Blender export process."""
-    command = [
-        BLENDER_EXE, BLEND_FILE,
+        if SCRIPTS_DIR not in sys.path:
+            sys.path.insert(0, SCRIPTS_DIR)
+        import generate_image_with_dalle
+        generate = generate_image_with_dalle.generate_custom_label
+        if job_id in job_profilers:
+            # Profiled on the helper thread that runs it; post-processing shows up as time waiting on the pool
+            generate = job_profilers[job_id].wrap('generate', generate)
+        # Runs on a helper thread so cancellation returns immediately; the
+        # generator aborts its download and skips writing once the event is set
+        success = handle.run_in_thread(
+            generate, prompt,
+            processor=pool_processor(busy),
+            image_path=job_paths(job_id)['image'],
+            cancel_event=handle.cancel_event,
+            stage="Generating Image with DALL-E",
+            timeout=STAGE_TIMEOUTS['generate']
+        )
+        if success:
+            return True, None
+        if busy.is_set():
+            return False, "Server busy: image processing is at capacity, try again shortly"
+        return False, "Generating Image with DALL-E failed: see server log"
+    except JobCancelled:
+        raise
+    except Exception as e:
+        return False, f"Generating Image with DALL-E failed: {e}"
+
+def blender_export_command(image_path, glb_path, preview_path=None):
+    """Blender command line that exports a label image to a GLB (after a fast preview, if given a path)."""
+    return [
+        resolve_blender(), BLEND_FILE,
         "--background",
-        "--python", os.path.join(os.path.dirname(__file__), '../blender/generate_label_glb.py'),
-        "--", IMAGE_PATH, GLB_OUTPUT_PATH
-    ]
-    return run_pipeline_step("Updating 3D Model in Blender", command, 75)
+        "--python", GENERATE_GLB_SCRIPT,
+        "--", image_path, glb_path
+    ] + ([preview_path] if preview_path else [])
+
+def run_blender_export(job_id, preview=False):
+    """Run Blender export process.
+
+    With preview, Blender writes a fast preview GLB first; it is published to
+    the viewer as soon as it appears while the full-quality export carries on.
+    """
+    paths = job_paths(job_id)
+    command = blender_export_command(paths['image'], paths['glb'], paths['preview'] if preview else None)
+    profiler = job_profilers.get(job_id)
+    # The Blender script profiles its own steps when given a directory to write to
+    env = dict(os.environ, LABEL_PROFILE_DIR=paths['profiles']) if profiler else None
+    start = time.perf_counter()
+    finished = threading.Event()
+    watcher = None
+    if preview:
+        watcher = threading.Thread(target=watch_preview_export, args=(job_id, finished, start), daemon=True)
+        watcher.start()
+    try:
+        return run_pipeline_step(
+            job_id, "Updating 3D Model in Blender", command, 75,
+            timeout=STAGE_TIMEOUTS['blender'],
+            memory_limit=BLENDER_MEMORY_LIMIT_BYTES,
+            cpu_limit=BLENDER_CPU_LIMIT_SECONDS,
+            env=env
+        )
+    finally:
+        # A preview being published finishes before the final outputs can replace it
+        finished.set()
+        if watcher:
+            watcher.join()
+        update_job(job_id, export_seconds=round(time.perf_counter() - start, 3))
+        if profiler:
+            record_blender_timings(profiler, time.perf_counter() - start)
+
+def watch_preview_export(job_id, finished, start):
+    """Publish the job's preview GLB once Blender has written it, unless the export finishes first."""
+    path = job_paths(job_id)['preview']
+    while not finished.wait(PREVIEW_POLL_SECONDS):
+        if os.path.exists(path):
+            publish_preview(job_id, time.perf_counter() - start)
+            return
+
+def publish_preview(job_id, export_seconds):
+    """Show the job's preview in the viewer until its final export is published."""
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from glb_inspect import inspect_glb, check_budgets
+    from label_delivery import publish_split_assets, read_manifest
+    models_dir = os.path.dirname(GLB_OUTPUT_PATH)
+    preview_path = job_paths(job_id)['preview']
+    try:
+        report = inspect_glb(preview_path)
+        # Every viewer downloads the preview, so it must stay small; the final export still follows
+        violations = check_budgets(report, PREVIEW_PROFILE)
+        if violations:
+            print(f"[WARN] Not publishing preview of job {job_id}: {'; '.join(violations)}")
+            update_job(job_id, preview={'skipped': True, 'violations': violations})
+            return
+        previous = read_manifest(models_dir)
+        manifest = publish_split_assets(preview_path, None, models_dir, job_id=job_id, stage='preview')
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not publish preview of job {job_id}: {e}")
+        return
+    job_preview_manifests[job_id] = previous
+    seconds = time.time() - jobs[job_id]['created_at']
+    print(f"[INFO] Job {job_id} preview published after {seconds:.2f}s ({report['scene_triangles']} triangles)")
+    update_job(job_id, urgent=True, current_step="Preview ready, finishing full-quality model", preview={
+        'geometry_url': manifest['geometry'],
+        'texture_url': manifest['texture'],
+        'triangles': report['scene_triangles'],
+        'file_bytes': report['file_bytes'],
+        'seconds': round(seconds, 3),
+        'export_seconds': round(export_seconds, 3)
+    })
+
+def withdraw_preview(job_id):
+    """Put the viewer back on what it showed before the job's preview, if the final export never replaced it."""
+    if job_id not in job_preview_manifests:
+        return
+    from label_delivery import retract_preview
+    if retract_preview(os.path.dirname(GLB_OUTPUT_PATH), job_id, job_preview_manifests.pop(job_id)):
+        print(f"[INFO] Withdrew the preview of job {job_id}")
+
+def get_export_index():
+    """Open the perceptual-hash index of previous exports on first use."""
+    global _export_index
+    if _export_index is None:
+        if PIPELINE_DIR not in sys.path:
+            sys.path.insert(0, PIPELINE_DIR)
+        from perceptual_hash import ExportIndex
+        _export_index = ExportIndex(EXPORT_INDEX_DIR, max_distance=PHASH_MAX_DISTANCE, max_entries=PHASH_MAX_ENTRIES)
+    return _export_index
+
+def export_build_key():
+    """Identifies what an export was produced with; GLBs are only reused for the same scene and script."""
+    parts = []
+    for path in (BLEND_FILE, GENERATE_GLB_SCRIPT):
+        try:
+            parts.append(f"{os.path.basename(path)}@{int(os.path.getmtime(path))}")
+        except OSError:
+            parts.append(os.path.basename(path))
+    return ';'.join(parts)
+
+def reuse_similar_export(job_id):
+    """Copy in the GLB of a previous export whose image looks the same. Returns True if one was reused."""
+    if not PHASH_REUSE:
+        return False
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from perceptual_hash import fingerprint
+    paths = job_paths(job_id)
+    try:
+        image_hash, colors = fingerprint(paths['image'])
+    except Exception as e:
+        print(f"[WARN] Could not hash image for job {job_id}: {e}")
+        return False
+    update_job(job_id, image_hash=f"{image_hash:016x}")
+    job_image_colors[job_id] = colors
+    try:
+        match = get_export_index().lookup(image_hash, colors, export_build_key(), paths['image'])
+    except Exception as e:
+        print(f"[WARN] Could not look up similar exports for job {job_id}: {e}")
+        return False
+    if match is None:
+        return False
+    entry, distance = match
+    try:
+        shutil.copyfile(entry['path'], paths['glb'])
+    except OSError as e:
+        # Evicted by a concurrent add() since the lookup: export as usual
+        print(f"[WARN] Could not reuse the export of job {entry.get('job_id')}: {e}")
+        return False
+    print(f"[INFO] Job {job_id} reuses the export of job {entry.get('job_id')} ({distance} bits apart)")
+    update_job(job_id, current_step="Reusing matching 3D model", progress=75,
+               reused_export={'job_id': entry.get('job_id'), 'distance': distance})
+    return True
+
+def remember_export(job_id):
+    """Add the job's freshly exported GLB to the perceptual-hash index."""
+    image_hash = jobs[job_id].get('image_hash')
+    colors = job_image_colors.pop(job_id, None)
+    if image_hash is None or colors is None:
+        return
+    try:
+        paths = job_paths(job_id)
+        get_export_index().add(int(image_hash, 16), colors, paths['glb'], export_build_key(), paths['image'],
+                               job_id=job_id)
+    except OSError as e:
+        print(f"[WARN] Could not index export of job {job_id}: {e}")
+
+def record_blender_timings(profiler, wall_seconds):
+    """Add Blender's in-script step timings to the job's summary, and the rest as startup/.blend load."""
+    timings = {}
+    try:
+        with open(os.path.join(profiler.directory, 'blender_timings.json')) as f:
+            timings = json.load(f)
+    except (OSError, ValueError):
+        pass
+    for name, seconds in timings.items():
+        profiler.record(f"blender_{name}", seconds)
+    profiler.record('blender', wall_seconds, startup_and_load_seconds=round(wall_seconds - sum(timings.values()), 4))
 
 def start_web_viewer():
     """Start the web viewer server."""
@@ -107,27 +719,12 @@ def start_web_viewer():
             print(f"[ERROR] package.json not found in: {WEB_APP_DIR}")
             return False
         
-        # Find npm path
-        npm_path = "npm"
-        try:
-            subprocess.run(["npm", "--version"], capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # Try common npm locations on Windows
-            possible_npm_paths = [
-                r"C:\Program Files\nodejs\npm.cmd",
-                r"C:\Program Files (x86)\nodejs\npm.cmd",
-                os.path.expanduser(r"~\AppData\Roaming\npm\npm.cmd"),
-                os.path.expanduser(r"~\AppData\Local\Microsoft\WindowsApps\npm.exe")
-            ]
-            
-            for path in possible_npm_paths:
-                if os.path.exists(path):
-                    print(f"[INFO] Found npm at: {path}")
-                    npm_path = path
-                    break
-            else:
-                print("[ERROR] npm not found. Please install Node.js and npm.")
-                return False
+        # Find npm (cached probe: PATH first, then common install locations)
+        npm = get_env_probe().tool('npm')
+        if not npm.ok:
+            print(f"[ERROR] npm not found. Please install Node.js and npm. ({npm.detail})")
+            return False
+        npm_path = npm.path
         
         # Install dependencies if needed
         node_modules_path = os.path.join(WEB_APP_DIR, "node_modules")
@@ -166,7 +763,7 @@ def start_web_viewer():
                 # Process died, try direct node execution
                 print("[INFO] npm start failed, trying direct node execution...")
                 server_process = subprocess.Popen(
-                    ["node", "server.js"], 
+                    [get_env_probe().tool('node').path or "node", "server.js"], 
                     cwd=WEB_APP_DIR, 
                     stdout=subprocess.PIPE, 
                     stderr=subprocess.PIPE
@@ -174,6 +771,7 @@ def start_web_viewer():
                 time.sleep(3)
             
             # Check if server is running
+            import requests
             try:
                 response = requests.get("http://localhost:3000", timeout=10)
                 if response.status_code == 200:
@@ -197,54 +795,492 @@ def start_web_viewer():
         print(f"[ERROR] Unexpected error in start_web_viewer: {e}")
         return False
 
-def pipeline_worker(prompt):
-    """Background worker for running the pipeline."""
-    global pipeline_status
+def publish_job_outputs(job_id):
+    """Publish a finished job's outputs where the viewer and watchers expect them, then start the viewer."""
+    paths = job_paths(job_id)
+    publish_artifact(paths['image'], IMAGE_PATH)
+    publish_artifact(paths['glb'], GLB_OUTPUT_PATH)
+    get_prompt_index().add(jobs[job_id]['prompt'], paths['dir'], job_id=job_id)
+    try:
+        manifest = publish_split_label(job_id)
+        job_preview_manifests.pop(job_id, None)
+        update_job(job_id, texture_url=manifest['texture'], geometry_url=manifest['geometry'],
+                   texture_levels=manifest['textures'], final={
+                       'geometry_url': manifest['geometry'],
+                       'texture_url': manifest['texture'],
+                       'seconds': round(time.time() - jobs[job_id]['created_at'], 3),
+                       'export_seconds': jobs[job_id].get('export_seconds')
+                   })
+    except ValueError as e:
+        # The full GLB is still published; the viewer falls back to it
+        print(f"[WARN] Could not split label assets: {e}")
+        withdraw_preview(job_id)
+    # Thumbnail renders off the critical path; clients get thumbnail_url as a later update
+    request_thumbnail(job_id)
+    
+    if not LAUNCH_VIEWER:
+        update_job(job_id, urgent=True, progress=100, current_step="Complete", is_running=False)
+        return
     
+    # Step 3: Start web viewer
+    update_job(job_id, current_step="Starting Web Viewer", progress=90)
+    
+    if start_web_viewer():
+        update_job(job_id, progress=100, current_step="Complete", web_viewer_url=pipeline_status['web_viewer_url'])
+        
+        # Open browser
+        import webbrowser
+        webbrowser.open("http://localhost:3000")
+    else:
+        update_job(job_id, error="Failed to start web viewer")
+    
+    update_job(job_id, urgent=True, is_running=False)
+
+def pipeline_worker(job_id, prompt, variant=None):
+    """Background worker for running the pipeline.
+
+    Warm-up jobs stop after inspection and store their outputs in the result
+    cache instead of publishing them. For a variants job, variant is the
+    selected candidate: generation is skipped, and so is the export if it was
+    already done speculatively.
+    """
+    handle = job_handles[job_id]
+    paths = job_paths(job_id)
+    warmup = jobs[job_id]['warmup']
+    admitted = False
     try:
-        pipeline_status['is_running'] = True
-        pipeline_status['error'] = None
-        pipeline_status['progress'] = 0
-        socketio.emit('pipeline_update', pipeline_status)
+        exported = use_variant(job_id, variant) if variant is not None else False
+        if jobs[job_id]['priority'] == 'interactive':
+            preempt_background_work()
+        update_job(job_id, current_step="Waiting for capacity")
+        queue_wait = admission.acquire(job_id, handle.cancel_event, **admission_class(job_id))
+        if queue_wait is None:
+            raise JobCancelled(handle.reason)
+        admitted = True
+        update_job(job_id, is_running=True, error=None, progress=0, queue_wait=round(queue_wait, 3))
+        if job_id in job_profilers:
+            job_profilers[job_id].record('queue_wait', queue_wait)
         
-        # Step 1: Generate image
-        success, error = run_dalle_generation(prompt)
-        if not success:
-            pipeline_status['error'] = error
-            pipeline_status['is_running'] = False
-            socketio.emit('pipeline_update', pipeline_status)
-            return
+        # Step 1: Generate image (a variants job already has it)
+        if variant is None:
+            success, error = run_dalle_generation(job_id, prompt)
+            if not success:
+                update_job(job_id, urgent=True, error=error, is_running=False)
+                return
         
-        # Step 2: Update 3D model
-        success, error = run_blender_export()
-        if not success:
-            pipeline_status['error'] = error
-            pipeline_status['is_running'] = False
-            socketio.emit('pipeline_update', pipeline_status)
-            return
+        # Step 2: Update 3D model, unless an export of a visually identical image can be reused
+        if not exported and not reuse_similar_export(job_id):
+            preview = PREVIEW_EXPORT and jobs[job_id]['priority'] == 'interactive' and not warmup
+            success, error = run_blender_export(job_id, preview=preview)
+            if not success:
+                update_job(job_id, urgent=True, error=error, is_running=False)
+                return
+            remember_export(job_id)
         
-        # Step 3: Start web viewer
-        pipeline_status['current_step'] = "Starting Web Viewer"
-        pipeline_status['progress'] = 90
-        socketio.emit('pipeline_update', pipeline_status)
+        # Check what went into the GLB before anyone downloads it
+        with profile_stage(job_id, 'inspect'):
+            violations, fail_on_budget = inspect_export(job_id)
+        if violations and fail_on_budget:
+            update_job(job_id, urgent=True, error=f"Export over budget: {'; '.join(violations)}", is_running=False)
+            return
         
-        if start_web_viewer():
-            pipeline_status['progress'] = 100
-            pipeline_status['current_step'] = "Complete"
-            socketio.emit('pipeline_update', pipeline_status)
-            
-            # Open browser
-            webbrowser.open("http://localhost:3000")
-        else:
-            pipeline_status['error'] = "Failed to start web viewer"
+        handle.check()
+        if warmup:
+            entry_dir = get_result_cache().put(prompt, paths['dir'], job_id=job_id, export_profile=EXPORT_PROFILE)
+            get_prompt_index().add(prompt, entry_dir, job_id=job_id)
+            update_job(job_id, urgent=True, progress=100, current_step="Cached", is_running=False)
+            discard_job_files(job_id)
+            return
         
-        pipeline_status['is_running'] = False
-        socketio.emit('pipeline_update', pipeline_status)
+        # Publish the job's outputs where the viewer and watchers expect them
+        with profile_stage(job_id, 'publish'):
+            publish_job_outputs(job_id)
         
+    except StageTimeout as e:
+        discard_job_files(job_id)
+        update_job(job_id, urgent=True, error=str(e), is_running=False, cancelled=False)
+    except JobCancelled:
+        # cancel_job() already reported the job as stopped; drop partial artifacts
+        discard_job_files(job_id)
+        print(f"[INFO] Job {job_id} stopped and cleaned up")
+    except Exception as e:
+        update_job(job_id, urgent=True, error=str(e), is_running=False)
+    finally:
+        job_image_colors.pop(job_id, None)
+        withdraw_preview(job_id)
+        if admitted:
+            admission.record_footprint(handle.peak_rss_bytes)
+            admission.release(job_id)
+            retry_speculative_exports()
+
+def get_result_cache():
+    """Open the result cache on first use."""
+    global _result_cache
+    if _result_cache is None:
+        from warmup import ResultCache
+        _result_cache = ResultCache(RESULT_CACHE_DIR)
+    return _result_cache
+
+def get_prompt_index():
+    """Load the similar-prompt index on first use."""
+    global _prompt_index
+    if _prompt_index is None:
+        from prompt_index import PromptIndex
+        _prompt_index = PromptIndex(PROMPT_INDEX_PATH)
+    return _prompt_index
+
+def has_label_outputs(directory):
+    """True if a job or cache directory still holds a servable label."""
+    from warmup import REQUIRED_FILES
+    return all(os.path.exists(os.path.join(directory, name)) for name in REQUIRED_FILES)
+
+def find_similar_prompts(prompt):
+    """Previous prompts similar to this one whose outputs still exist, best first."""
+    matches = get_prompt_index().search(prompt, k=SIMILAR_PROMPT_OFFERS, min_score=SIMILAR_PROMPT_OFFER_THRESHOLD)
+    return [dict(entry, score=round(score, 3)) for score, entry in matches if has_label_outputs(entry['dir'])]
+
+def public_match(match):
+    """A similar-prompt match as shown to clients (without server paths)."""
+    return {'prompt': match['prompt'], 'job_id': match.get('job_id'), 'score': match.get('score')}
+
+def serve_cached_result(job_id, entry):
+    """Complete a job from a cached result: copy the cached outputs into the job and publish them."""
+    paths = job_paths(job_id)
+    try:
+        from warmup import CACHED_FILES
+        for name in CACHED_FILES:
+            if os.path.exists(os.path.join(entry['dir'], name)):
+                shutil.copyfile(os.path.join(entry['dir'], name), os.path.join(paths['dir'], name))
+        changes = {'cached': True, 'cached_at': entry['created_at'], 'current_step': "Served from cache"}
+        try:
+            with open(os.path.join(paths['dir'], 'inspection.json')) as f:
+                inspection = json.load(f)
+            changes['inspection'] = {
+                'profile': inspection['profile'],
+                'file_bytes': inspection['report']['file_bytes'],
+                'triangles': inspection['report']['scene_triangles'],
+                'violations': inspection['violations']
+            }
+        except (OSError, ValueError, KeyError):
+            pass
+        update_job(job_id, **changes)
+        publish_job_outputs(job_id)
     except Exception as e:
-        pipeline_status['error'] = str(e)
-        pipeline_status['is_running'] = False
-        socketio.emit('pipeline_update', pipeline_status)
+        update_job(job_id, urgent=True, error=f"Serving cached result failed: {e}", is_running=False)
+
+def preempt_background_work():
+    """Cancel warm-up jobs and speculative exports when an interactive job would otherwise queue behind them."""
+    stats = admission.stats()
+    if stats['running'] < stats['cpu_limit']:
+        return
+    for job_id, job in list(jobs.items()):
+        if job['warmup'] and job['is_running']:
+            cancel_job(job_id, "Preempted by an interactive job")
+    for entry in list(speculative_exports.values()):
+        if not entry['done'].is_set():
+            entry['handle'].cancel("Preempted by an interactive job")
+
+def pipeline_idle():
+    """True while no job is running or waiting for a slot (jobs waiting for the user's pick don't count)."""
+    if any(job['is_running'] and not job['awaiting_selection'] for job in list(jobs.values())):
+        return False
+    return all(entry['done'].is_set() for entry in list(speculative_exports.values()))
+
+def run_warmup_prompt(prompt):
+    """Run one warm-up job to completion. Returns 'done', 'preempted' or an error message."""
+    job_id = create_job(prompt, warmup=True, priority='batch', client='warmup')
+    pipeline_worker(job_id, prompt)
+    job = jobs[job_id]
+    if job['cancelled']:
+        return 'preempted'
+    return job['error'] or 'done'
+
+def warmup_prompt_list():
+    """The configured warm-up prompts, re-read on every pass so edits apply without a restart."""
+    from warmup import load_prompts
+    if WARMUP_PROMPTS_FILE:
+        return load_prompts(WARMUP_PROMPTS_FILE)
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from generate_image_with_dalle import DEFAULT_PROMPT
+    return [DEFAULT_PROMPT]
+
+def get_warmup():
+    """Create the warm-up scheduler on first use."""
+    global _warmup
+    if _warmup is None:
+        from warmup import WarmupScheduler
+        _warmup = WarmupScheduler(
+            run_warmup_prompt, warmup_prompt_list, get_result_cache(), pipeline_idle,
+            interval=WARMUP_INTERVAL_SECONDS, refresh_after=WARMUP_REFRESH_SECONDS,
+            on_progress=lambda status: get_socketio().emit('warmup_progress', status)
+        )
+    return _warmup
+
+def write_variant_preview(job_id, index):
+    """Save a small JPEG of a generated variant for the picker."""
+    from PIL import Image
+    paths = variant_paths(job_id, index)
+    with Image.open(paths['image']) as image:
+        preview = image.convert('RGB')
+    preview.thumbnail((VARIANT_PREVIEW_WIDTH, VARIANT_PREVIEW_WIDTH))
+    preview.save(paths['preview'], 'JPEG', quality=80)
+
+def run_variant_generation(job_id, prompt, count):
+    """Generate a job's variants concurrently, publishing each preview as soon as it lands."""
+    update_job(job_id, current_step=f"Generating {count} variants", progress=25)
+    handle = job_handles[job_id]
+    for index in range(count):
+        os.makedirs(variant_paths(job_id, index)['dir'], exist_ok=True)
+    
+    def on_variant(index, success):
+        if success:
+            try:
+                write_variant_preview(job_id, index)
+            except Exception as e:
+                print(f"[WARN] Preview for variant {index} of job {job_id} failed: {e}")
+                success = False
+        with variants_lock:
+            variants = [dict(entry) for entry in jobs[job_id]['variants']]
+            variants[index].update(status='ready' if success else 'failed', ready_at=time.time(),
+                                   preview_url=f"/api/jobs/{job_id}/variants/{index}/preview" if success else None)
+            finished = sum(entry['status'] != 'pending' for entry in variants)
+            update_job(job_id, variants=variants, progress=25 + 25 * finished // count)
+    
+    busy = threading.Event()
+    try:
+        if SCRIPTS_DIR not in sys.path:
+            sys.path.insert(0, SCRIPTS_DIR)
+        import generate_image_with_dalle
+        results = handle.run_in_thread(
+            generate_image_with_dalle.generate_label_variants, prompt,
+            [variant_paths(job_id, index)['image'] for index in range(count)],
+            processor=pool_processor(busy),
+            cancel_event=handle.cancel_event,
+            on_variant=on_variant,
+            stage="Generating variants",
+            timeout=STAGE_TIMEOUTS['generate']
+        )
+        if any(results):
+            return True, None
+        if busy.is_set():
+            return False, "Server busy: image processing is at capacity, try again shortly"
+        return False, "Generating variants failed: see server log"
+    except JobCancelled:
+        raise
+    except Exception as e:
+        return False, f"Generating variants failed: {e}"
+
+def variants_worker(job_id, prompt, count):
+    """Generate a variants job's candidates, then leave it waiting for the user's pick (see select_variant)."""
+    handle = job_handles[job_id]
+    admitted = False
+    try:
+        if jobs[job_id]['priority'] == 'interactive':
+            preempt_background_work()
+        update_job(job_id, current_step="Waiting for capacity")
+        queue_wait = admission.acquire(job_id, handle.cancel_event, **admission_class(job_id))
+        if queue_wait is None:
+            raise JobCancelled(handle.reason)
+        admitted = True
+        update_job(job_id, queue_wait=round(queue_wait, 3))
+        success, error = run_variant_generation(job_id, prompt, count)
+        if not success:
+            update_job(job_id, urgent=True, error=error, is_running=False)
+            return
+        handle.check()
+    except StageTimeout as e:
+        discard_job_files(job_id)
+        update_job(job_id, urgent=True, error=str(e), is_running=False, cancelled=False)
+        return
+    except JobCancelled:
+        discard_job_files(job_id)
+        print(f"[INFO] Job {job_id} stopped and cleaned up")
+        return
+    except Exception as e:
+        update_job(job_id, urgent=True, error=str(e), is_running=False)
+        return
+    finally:
+        if admitted:
+            admission.release(job_id)
+            retry_speculative_exports()
+    
+    # The generation slot is free again; nothing more runs until the user picks
+    update_job(job_id, urgent=True, awaiting_selection=True, current_step="Choose a variant", progress=50)
+    timer = threading.Timer(VARIANT_SELECTION_TIMEOUT_SECONDS, expire_variant_selection, args=(job_id,))
+    timer.daemon = True
+    timer.start()
+    retry_speculative_exports()
+
+def expire_variant_selection(job_id):
+    """Drop a variants job nobody picked from."""
+    if jobs[job_id]['awaiting_selection']:
+        cancel_job(job_id, "No variant selected")
+
+def start_speculative_export(job_id):
+    """Export the first variant that landed ahead of the user's pick, if the pipeline is otherwise idle."""
+    job = jobs[job_id]
+    if not SPECULATIVE_EXPORT or job_handles[job_id].cancelled or not pipeline_idle():
+        return
+    ready = [entry for entry in job['variants'] if entry['status'] == 'ready']
+    if not ready:
+        return
+    index = min(ready, key=lambda entry: entry['ready_at'])['index']
+    entry = {'variant': index, 'handle': JobHandle(job_id, niceness=WARMUP_NICENESS),
+             'done': threading.Event(), 'admitted': False, 'ok': False}
+    with variants_lock:
+        if job_id in speculative_exports or not job['awaiting_selection']:
+            return
+        speculative_exports[job_id] = entry
+    threading.Thread(target=speculative_export_worker, args=(job_id, entry), daemon=True).start()
+
+def retry_speculative_exports():
+    """Start speculative exports for jobs still waiting for a pick, oldest first, now that a slot is free.
+
+    Called whenever a job releases its slot, so exports that could not start
+    (or were preempted) run once the pipeline is idle again.
+    """
+    if not SPECULATIVE_EXPORT:
+        return
+    for job_id, job in list(jobs.items()):
+        if job['awaiting_selection'] and job_id not in speculative_exports:
+            start_speculative_export(job_id)
+
+def speculative_export_worker(job_id, entry):
+    """Run a speculative export at low priority; interactive work preempts it."""
+    handle = entry['handle']
+    slot = f"{job_id}-speculative"
+    paths = variant_paths(job_id, entry['variant'])
+    admitted = False
+    try:
+        if admission.acquire(slot, handle.cancel_event, **dict(admission_class(job_id), priority='batch')) is None:
+            return
+        admitted = entry['admitted'] = True
+        update_job(job_id, speculative_variant=entry['variant'])
+        returncode, stdout, stderr = handle.run_process(
+            blender_export_command(paths['image'], paths['glb']), stage="Speculative export",
+            timeout=STAGE_TIMEOUTS['blender'], memory_limit=BLENDER_MEMORY_LIMIT_BYTES,
+            cpu_limit=BLENDER_CPU_LIMIT_SECONDS
+        )
+        entry['ok'] = returncode == 0 and os.path.exists(paths['glb'])
+        if not entry['ok']:
+            print(f"[WARN] Speculative export for job {job_id} failed: {stderr}")
+    except JobCancelled:
+        pass
+    except Exception as e:
+        print(f"[WARN] Speculative export for job {job_id} failed: {e}")
+    finally:
+        if admitted:
+            admission.record_footprint(handle.peak_rss_bytes)
+            admission.release(slot)
+        if handle.cancelled:
+            # Preempted: forget the attempt so retry_speculative_exports() can start it again
+            with variants_lock:
+                if speculative_exports.get(job_id) is entry:
+                    del speculative_exports[job_id]
+        entry['done'].set()
+
+def use_variant(job_id, index):
+    """Make the selected variant the job's image. Returns True if its GLB was already exported speculatively.
+
+    A speculative export of the selected variant that is already running is
+    waited for; the entry stays registered meanwhile so cancel_job() and
+    preemption can still reach it. One that is still queued at batch priority
+    is cancelled, and the job exports the variant itself.
+    """
+    handle = job_handles[job_id]
+    paths = job_paths(job_id)
+    selected = variant_paths(job_id, index)
+    shutil.copyfile(selected['image'], paths['image'])
+    with variants_lock:
+        entry = speculative_exports.get(job_id)
+        if entry is None:
+            return False
+        stale = entry['variant'] != index or not entry['admitted']
+        if stale:
+            del speculative_exports[job_id]
+    if stale:
+        entry['handle'].cancel("Another variant was selected" if entry['variant'] != index
+                               else "Variant selected before its speculative export started")
+        return False
+    update_job(job_id, current_step="Finishing speculative export")
+    while not entry['done'].wait(0.5):
+        if handle.cancelled:
+            entry['handle'].cancel(handle.reason)
+            raise JobCancelled(handle.reason)
+    with variants_lock:
+        if speculative_exports.get(job_id) is entry:
+            del speculative_exports[job_id]
+    if entry['ok']:
+        shutil.copyfile(selected['glb'], paths['glb'])
+    update_job(job_id, speculative_hit=entry['ok'])
+    return entry['ok']
+
+def get_broker():
+    """Open the shared job queue and artifact store on first use."""
+    global _broker, _artifact_store
+    if _broker is None:
+        from job_queue import open_broker, open_store
+        _artifact_store = open_store(ARTIFACT_STORE_URL)
+        _broker = open_broker(JOB_QUEUE_URL)
+    return _broker
+
+def enqueue_job(job_id, prompt):
+    """Hand a job to the shared queue; a worker node runs it and the queue monitor relays its progress."""
+    start_queue_monitor()
+    update_job(job_id, current_step="Queued")
+    get_broker().enqueue(job_id, {'prompt': prompt, 'profile': job_id in job_profilers})
+
+def finish_remote_job(job_id, result):
+    """Download a worker's artifacts into the job directory and publish them."""
+    paths = job_paths(job_id)
+    try:
+        for name, key in result['artifacts'].items():
+            destination = os.path.join(paths['dir'], *name.split('/'))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            _artifact_store.fetch(key, destination)
+        publish_job_outputs(job_id)
+    except Exception as e:
+        update_job(job_id, urgent=True, error=f"Publishing worker output failed: {e}", is_running=False)
+
+def apply_queue_record(record):
+    """Relay one queue change to the job's room."""
+    from job_queue import DONE, FAILED, CANCELLED
+    job = jobs.get(record.job_id)
+    if job is None or not job['is_running']:
+        # Enqueued by another web app instance, or already stopped here
+        return
+    changes = {key: value for key, value in record.status.items() if key != 'is_running'}
+    if record.worker_id:
+        changes['worker_id'] = record.worker_id
+    if record.state == DONE:
+        update_job(record.job_id, **changes)
+        threading.Thread(target=finish_remote_job, args=(record.job_id, record.result), daemon=True).start()
+    elif record.state in (FAILED, CANCELLED):
+        update_job(record.job_id, urgent=True, error=record.error if record.state == FAILED else None,
+                   is_running=False, cancelled=record.state == CANCELLED)
+    else:
+        update_job(record.job_id, **changes)
+
+def queue_monitor():
+    """Poll the shared queue for status changes made by worker nodes."""
+    version = 0
+    while True:
+        try:
+            for record in get_broker().changes_since(version):
+                version = record.version
+                apply_queue_record(record)
+        except Exception as e:
+            print(f"[WARN] Queue monitor: {e}")
+        time.sleep(QUEUE_POLL_INTERVAL)
+
+def start_queue_monitor():
+    """Start the queue monitor thread once."""
+    global _queue_monitor
+    with sessions_lock:
+        if _queue_monitor is None:
+            _queue_monitor = threading.Thread(target=queue_monitor, daemon=True)
+            _queue_monitor.start()
 
 @app.route('/')
 def index():
@@ -259,35 +1295,241 @@ def get_status():
 @app.route('/api/check-dependencies')
 def check_deps():
     """Check system dependencies."""
-    issues = check_dependencies()
+    results = probe_environment()
+    issues = dependency_issues(results)
     return jsonify({
         'issues': issues,
-        'ready': len(issues) == 0
+        'ready': len(issues) == 0,
+        'probes': {name: result.to_dict() for name, result in results.items()}
     })
 
 @app.route('/api/generate', methods=['POST'])
 def generate_label():
     """Start the label generation pipeline."""
-    if pipeline_status['is_running']:
-        return jsonify({'error': 'Pipeline already running'}), 400
-    
     data = request.get_json()
     prompt = data.get('prompt', '')
+    session_id = data.get('session_id')
+    profile = PROFILE_JOBS or bool(data.get('profile'))
+    variants = data.get('variants') or 1
+    priority = data.get('priority', 'interactive')
     
     if not prompt.strip():
         return jsonify({'error': 'Prompt is required'}), 400
+    if priority not in PRIORITY_CLASSES:
+        return jsonify({'error': f"priority must be one of: {', '.join(PRIORITY_CLASSES)}"}), 400
+    if not isinstance(variants, int) or not 1 <= variants <= MAX_VARIANTS:
+        return jsonify({'error': f'variants must be between 1 and {MAX_VARIANTS}'}), 400
+    if variants > 1 and JOB_QUEUE_URL:
+        return jsonify({'error': 'Variants mode runs only when jobs run in this process'}), 400
+    
+    reuse = data.get('reuse')
+    if reuse is not None and (not isinstance(reuse, str) or not is_job_id(reuse)
+                              or not has_label_outputs(job_paths(reuse)['dir'])):
+        return jsonify({'error': 'Label to reuse not found'}), 404
     
-    # Start pipeline in background thread
-    thread = threading.Thread(target=pipeline_worker, args=(prompt,))
-    thread.daemon = True
-    thread.start()
+    if PREEMPT_SAME_SESSION:
+        for running_job in running_jobs_for_session(session_id):
+            cancel_job(running_job, "Preempted by a newer job")
     
-    return jsonify({'message': 'Pipeline started'})
+    # Standard designs warmed at start-up are served without generating ("fresh": true skips the cache),
+    # as are rewordings of earlier prompts and labels the client picked from the offered matches ("reuse")
+    cached = similar_to = None
+    similar = []
+    if reuse is not None:
+        cached = {'dir': job_paths(reuse)['dir'], 'created_at': os.path.getmtime(job_paths(reuse)['glb'])}
+        similar_to = {'job_id': reuse}
+    elif not data.get('fresh') and variants == 1:
+        cached = get_result_cache().get(prompt)
+        if not cached:
+            similar = find_similar_prompts(prompt)
+            if similar and similar[0]['score'] >= SIMILAR_PROMPT_SERVE_THRESHOLD:
+                cached, similar_to = similar[0], public_match(similar[0])
+    client, client_weight = request_client(data)
+    job_id = create_job(prompt, session_id, profile=profile, variants=variants if variants > 1 else None,
+                        priority=priority, client=client, client_weight=client_weight)
+    pipeline_status.update({'job_id': job_id, 'is_running': True, 'error': None})
+    if cached:
+        if similar_to:
+            update_job(job_id, similar_to=similar_to)
+        threading.Thread(target=serve_cached_result, args=(job_id, cached), daemon=True).start()
+        return jsonify({'message': 'Served from cache', 'job_id': job_id, 'cached': True, 'similar_to': similar_to})
+    if variants > 1:
+        threading.Thread(target=variants_worker, args=(job_id, prompt, variants), daemon=True).start()
+    elif JOB_QUEUE_URL:
+        # A worker node picks it up from the shared queue
+        enqueue_job(job_id, prompt)
+    else:
+        # Start pipeline in background thread; it queues until admitted
+        thread = threading.Thread(target=pipeline_worker, args=(job_id, prompt))
+        thread.daemon = True
+        thread.start()
+    
+    return jsonify({'message': 'Pipeline started', 'job_id': job_id, 'similar': [public_match(m) for m in similar]})
+
+@app.route('/api/similar')
+def get_similar_prompts():
+    """Previous prompts similar to ?prompt=, with their similarity scores."""
+    prompt = request.args.get('prompt', '')
+    start = time.perf_counter()
+    matches = find_similar_prompts(prompt)
+    return jsonify({'matches': [public_match(match) for match in matches],
+                    'lookup_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'indexed_prompts': len(get_prompt_index())})
+
+@app.route('/api/jobs/<job_id>/variants/<int:index>/preview')
+def get_variant_preview(job_id, index):
+    """Preview image of one candidate in a variants job."""
+    job = jobs.get(job_id)
+    if job is None or not job['variants'] or not 0 <= index < len(job['variants']):
+        return jsonify({'error': 'Variant not found'}), 404
+    return send_from_directory(os.path.abspath(variant_paths(job_id, index)['dir']), 'preview.jpg', max_age=3600)
+
+@app.route('/api/jobs/<job_id>/select', methods=['POST'])
+def select_variant(job_id):
+    """Export and publish the variant the user picked."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    index = (request.get_json() or {}).get('variant')
+    with variants_lock:
+        if not job['awaiting_selection']:
+            return jsonify({'error': 'Job is not waiting for a variant selection'}), 409
+        if (not isinstance(index, int) or not 0 <= index < len(job['variants'])
+                or job['variants'][index]['status'] != 'ready'):
+            return jsonify({'error': 'No such variant'}), 400
+        update_job(job_id, awaiting_selection=False, selected_variant=index, current_step="Exporting selected variant")
+    threading.Thread(target=pipeline_worker, args=(job_id, job['prompt'], index), daemon=True).start()
+    return jsonify({'message': 'Variant selected', 'job_id': job_id, 'variant': index})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Snapshot of a job's status and sequence number, for late joiners and resyncs."""
+    snapshot = progress_hub.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(snapshot)
+
+@app.route('/api/labels')
+def list_labels():
+    """Finished labels, newest first, with their thumbnail URLs for a gallery page."""
+    labels = [
+        {'job_id': job['job_id'], 'prompt': job['prompt'], 'created_at': job['created_at'],
+         'thumbnail_url': job.get('thumbnail_url')}
+        for job in finished_label_jobs()
+    ]
+    return jsonify({'labels': labels})
+
+def finished_label_jobs():
+    """Jobs that produced a label, newest first."""
+    finished = [job for job in list(jobs.values()) if is_label_job(job)]
+    finished.sort(key=lambda job: job['created_at'], reverse=True)
+    return finished
+
+@app.route('/api/catalog', methods=['POST'])
+def create_catalog():
+    """Combine finished labels (all, or the given job_ids in order) into one instanced catalog GLB."""
+    data = request.get_json(silent=True) or {}
+    job_ids = data.get('job_ids')
+    if job_ids is None:
+        job_ids = [job['job_id'] for job in finished_label_jobs()][:CATALOG_MAX_LABELS]
+    if not isinstance(job_ids, list) or not all(isinstance(job_id, str) for job_id in job_ids):
+        return jsonify({'error': 'job_ids must be a list of job ids'}), 400
+    finished = {job['job_id'] for job in finished_label_jobs()}
+    unknown = [job_id for job_id in job_ids if job_id not in finished]
+    if unknown:
+        return jsonify({'error': f"Not finished labels: {', '.join(unknown)}"}), 400
+    if PIPELINE_DIR not in sys.path:
+        sys.path.insert(0, PIPELINE_DIR)
+    from label_catalog import publish_catalog, MAX_COLUMNS
+    columns = data.get('columns')
+    if columns is not None and (not isinstance(columns, int) or isinstance(columns, bool)
+                                or not 1 <= columns <= MAX_COLUMNS):
+        return jsonify({'error': f'columns must be an integer from 1 to {MAX_COLUMNS}'}), 400
+    if not job_ids or len(job_ids) > CATALOG_MAX_LABELS:
+        return jsonify({'error': f'A catalog needs 1 to {CATALOG_MAX_LABELS} labels'}), 400
+    start = time.perf_counter()
+    try:
+        name = publish_catalog(job_paths(job_ids[0])['glb'], [job_paths(job_id)['image'] for job_id in job_ids],
+                               os.path.dirname(GLB_OUTPUT_PATH), labels=job_ids, columns=columns,
+                               cell_width=CATALOG_CELL_WIDTH)
+    except (OSError, ValueError) as e:
+        return jsonify({'error': f'Building catalog failed: {e}'}), 500
+    url = f"/models/{name}"
+    print(f"[INFO] Catalog of {len(job_ids)} labels published: {name} ({time.perf_counter() - start:.1f}s)")
+    return jsonify({'url': url, 'labels': job_ids, 'viewer_url': f"http://localhost:3000/?catalog={url}"})
+
+@app.route('/thumbnails/<path:filename>')
+def get_thumbnail(filename):
+    """Serve a cached thumbnail. Names are content-hashed, so they never change."""
+    response = send_from_directory(os.path.abspath(THUMBNAILS_DIR), filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/api/admission')
+def get_admission():
+    """Current concurrency limits, per-job footprint estimate and queue depth."""
+    return jsonify(admission.stats())
+
+@app.route('/api/reuse')
+def get_export_reuse():
+    """Perceptual-hash export reuse: hit rate and how close the nearest previous export was per lookup."""
+    return jsonify(get_export_index().stats())
+
+@app.route('/api/jobs/<job_id>/profiles')
+def list_job_profiles(job_id):
+    """List a profiled job's profile artifacts with download URLs."""
+    from profiling import list_profiles
+    if not is_job_id(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    files = list_profiles(job_paths(job_id)['profiles'])
+    if not files:
+        return jsonify({'error': 'No profiles for this job'}), 404
+    for entry in files:
+        entry['url'] = f"/api/jobs/{job_id}/profiles/{entry['name']}"
+    return jsonify({'job_id': job_id, 'profiles': files})
+
+@app.route('/api/jobs/<job_id>/profiles/<name>')
+def download_job_profile(job_id, name):
+    """Download one profile artifact."""
+    if not is_job_id(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    return send_from_directory(os.path.abspath(job_paths(job_id)['profiles']), name, as_attachment=True)
+
+@app.route('/api/queue')
+def get_queue():
+    """Shared job queue depth and active worker nodes."""
+    if not JOB_QUEUE_URL:
+        return jsonify({'error': 'No shared job queue configured'}), 400
+    return jsonify(get_broker().stats())
+
+@app.route('/api/warmup')
+def get_warmup_status():
+    """Warm-up progress and result cache hit counts."""
+    return jsonify({'warmup': get_warmup().snapshot(), 'cache': get_result_cache().stats()})
+
+@app.route('/api/warmup', methods=['POST'])
+def start_warmup():
+    """Start a warm-up pass now."""
+    if JOB_QUEUE_URL:
+        return jsonify({'error': 'Warm-up runs only when jobs run in this process'}), 400
+    if not get_warmup().trigger():
+        return jsonify({'error': 'Warm-up already running'}), 409
+    return jsonify({'message': 'Warm-up started', 'warmup': get_warmup().snapshot()})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job_endpoint(job_id):
+    """Cancel a running job."""
+    if job_id not in jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    if not cancel_job(job_id):
+        return jsonify({'error': 'Job is not running'}), 409
+    return jsonify({'message': 'Job cancelled', 'job_id': job_id})
 
 @app.route('/api/viewer')
 def open_viewer():
     """Open the 3D viewer."""
     if pipeline_status['web_viewer_url']:
+        import webbrowser
         webbrowser.open(pipeline_status['web_viewer_url'])
         return jsonify({'message': 'Viewer opened'})
     else:
@@ -304,10 +1546,52 @@ def start_viewer():
     except Exception as e:
         return jsonify({'error': f'Error starting viewer: {str(e)}'}), 500
 
-@socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     """Handle client connection."""
-    emit('pipeline_update', pipeline_status)
+    # Clients fetch state through /api/jobs/<id> or subscribe; nothing is pushed on connect.
+    session_id = (auth or {}).get('session_id')
+    if not session_id:
+        return
+    with sessions_lock:
+        sid_sessions[request.sid] = session_id
+        session_sids.setdefault(session_id, set()).add(request.sid)
+        timer = disconnect_timers.pop(session_id, None)
+    if timer:
+        timer.cancel()
+
+def handle_disconnect(reason=None):
+    """Cancel the session's running jobs if it does not reconnect within the grace period."""
+    with sessions_lock:
+        session_id = sid_sessions.pop(request.sid, None)
+        if session_id is None:
+            return
+        sids = session_sids.get(session_id, set())
+        sids.discard(request.sid)
+        if sids:
+            return
+        session_sids.pop(session_id, None)
+        if not running_jobs_for_session(session_id):
+            return
+        timer = threading.Timer(DISCONNECT_CANCEL_GRACE_SECONDS, cancel_abandoned_session, args=(session_id,))
+        timer.daemon = True
+        disconnect_timers[session_id] = timer
+    timer.start()
+
+def handle_subscribe(data):
+    """Join a job's room and send the caller a snapshot to apply deltas against."""
+    from flask_socketio import emit, join_room
+    job_id = (data or {}).get('job_id')
+    snapshot = progress_hub.snapshot(job_id)
+    if snapshot is None:
+        emit('job_error', {'job_id': job_id, 'error': 'Job not found'})
+        return
+    join_room(job_id)
+    emit('job_snapshot', snapshot)
+
+def handle_unsubscribe(data):
+    """Leave a job's room."""
+    from flask_socketio import leave_room
+    leave_room((data or {}).get('job_id'))
 
 if __name__ == '__main__':
     print("=== Golf Ball Label Generator Web App ===")
@@ -322,4 +1606,15 @@ if __name__ == '__main__':
             print(f"  - {issue}")
         print("\nThe app will still start, but some features may not work.")
     
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    if JOB_QUEUE_URL:
+        # Worker nodes run the jobs; this process only enqueues and reports
+        print(f"[INFO] Using shared job queue: {JOB_QUEUE_URL}")
+    elif not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Pre-start image workers in the serving process (not the debug reloader's parent)
+        print(f"[INFO] Image pool workers started: {get_image_pool().prefork()}")
+        if WARMUP_ON_START or WARMUP_INTERVAL_SECONDS:
+            get_warmup().start(run_now=WARMUP_ON_START)
+            print(f"[INFO] Result cache warm-up scheduled (on start: {WARMUP_ON_START}, "
+                  f"every: {WARMUP_INTERVAL_SECONDS or 'never'}s)")
+    
+    get_socketio().run(app, host='0.0.0.0', port=5000, debug=DEBUG) 
\ No newline at end of file